@@ -0,0 +1,161 @@
+from typing import Callable, Tuple
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import instrumented
+
+# table_name: [(prefix, street_column, city_column, zip_column)] for every address in a table
+ADDRESS_FIELDS = {
+    "corp_agent": [("corp_agent", "corp_agent_street", "corp_agent_city", "corp_agent_zip")],
+    "ll_manager": [("ll_mm", "ll_mm_street", "ll_mm_city", "ll_mm_zip")],
+    "ll_master": [
+        ("ll_records_off", "ll_records_off_street", "ll_records_off_city", "ll_records_off_zip")
+    ],
+}
+
+# USPS (Publication 28) abbreviations for the street suffixes, unit designators and
+# directionals seen in the SOS files. Every token is abbreviated wherever it appears, so
+# "100 NORTH AVENUE" and "100 N AVE" get the same normalized street.
+STREET_ABBREVIATIONS = {
+    "ALLEY": "ALY",
+    "AVENUE": "AVE",
+    "AV": "AVE",
+    "AVEN": "AVE",
+    "BOULEVARD": "BLVD",
+    "BLV": "BLVD",
+    "CENTER": "CTR",
+    "CENTRE": "CTR",
+    "CIRCLE": "CIR",
+    "COURT": "CT",
+    "CROSSING": "XING",
+    "DRIVE": "DR",
+    "DRV": "DR",
+    "EXPRESSWAY": "EXPY",
+    "HIGHWAY": "HWY",
+    "HIWAY": "HWY",
+    "LANE": "LN",
+    "PARKWAY": "PKWY",
+    "PKY": "PKWY",
+    "PLACE": "PL",
+    "PLAZA": "PLZ",
+    "POINT": "PT",
+    "ROAD": "RD",
+    "ROUTE": "RTE",
+    "SQUARE": "SQ",
+    "STREET": "ST",
+    "STR": "ST",
+    "TERRACE": "TER",
+    "TRAIL": "TRL",
+    "TURNPIKE": "TPKE",
+    "APARTMENT": "APT",
+    "BUILDING": "BLDG",
+    "DEPARTMENT": "DEPT",
+    "FLOOR": "FL",
+    "ROOM": "RM",
+    "SUITE": "STE",
+    "STES": "STE",
+    "#": "STE",
+    "NORTH": "N",
+    "SOUTH": "S",
+    "EAST": "E",
+    "WEST": "W",
+    "NORTHEAST": "NE",
+    "NORTHWEST": "NW",
+    "SOUTHEAST": "SE",
+    "SOUTHWEST": "SW",
+}
+
+
+def clean_address_text(address_ser: pd.Series) -> pd.Series:
+    # Upper case, with periods and apostrophes dropped (ST. -> ST) and any other
+    # punctuation or run of whitespace collapsed to a single space. "#" is kept as a token
+    # of its own since it stands for a unit.
+    return (
+        address_ser.str.upper()
+        .str.replace(r"[.']", "", regex=True)
+        .str.replace("#", " # ", regex=False)
+        .str.replace(r"[^A-Z0-9#/&-]+", " ", regex=True)
+        .str.strip()
+    )
+
+
+def map_unique_values(
+    value_ser: pd.Series, normalize: Callable[[pd.Series], pd.Series]
+) -> pd.Series:
+    # Applies normalize to the distinct values of value_ser only and broadcasts the results
+    # back; the address fields repeat heavily (a registered agent's address appears on
+    # every entity it serves). Missing values become "".
+    codes, unique_values = pd.factorize(value_ser)
+    normalized_values = normalize(pd.Series(unique_values, dtype=object)).to_numpy(dtype=object)
+    normalized_values = np.append(normalized_values, "")
+    return pd.Series(normalized_values[codes], index=value_ser.index, name=value_ser.name)
+
+
+def abbreviate_streets(street_ser: pd.Series) -> pd.Series:
+    # A "#" right after a unit designator (SUITE #200) is just its number sign
+    street_ser = clean_address_text(street_ser).str.replace(
+        r"\b(APARTMENT|APT|SUITE|STE|UNIT|ROOM|RM|FLOOR|FL) # ", r"\1 ", regex=True
+    )
+    return street_ser.map(
+        lambda street: " ".join(STREET_ABBREVIATIONS.get(token, token) for token in street.split())
+    )
+
+
+def normalize_streets(street_ser: pd.Series) -> pd.Series:
+    return map_unique_values(value_ser=street_ser, normalize=abbreviate_streets)
+
+
+def normalize_cities(city_ser: pd.Series) -> pd.Series:
+    return map_unique_values(value_ser=city_ser, normalize=clean_address_text)
+
+
+def split_zips(zip_ser: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    # The 5-digit ZIP and the 4-digit +4 extension ("" where absent). All-zero parts are
+    # treated as missing.
+    codes, unique_zips = pd.factorize(zip_ser)
+    zip_digit_ser = pd.Series(unique_zips, dtype=object).str.replace(r"[^0-9]", "", regex=True)
+    zip5_ser = zip_digit_ser.str[:5]
+    zip5_ser = zip5_ser.where((zip5_ser.str.len() == 5) & (zip5_ser != "00000"), "")
+    zip4_ser = zip_digit_ser.str[5:]
+    zip4_ser = zip4_ser.where((zip4_ser.str.len() == 4) & (zip4_ser != "0000"), "")
+    return tuple(
+        pd.Series(
+            np.append(part_ser.to_numpy(dtype=object), "")[codes],
+            index=zip_ser.index,
+            name=zip_ser.name,
+        )
+        for part_ser in (zip5_ser, zip4_ser)
+    )
+
+
+def get_address_keys(street_ser: pd.Series, zip5_ser: pd.Series) -> pd.Series:
+    # 64-bit hash of the normalized street and 5-digit ZIP, for equality joins between any
+    # of the address fields. City is left out since it's the least consistently entered
+    # part (CHICAGO vs CHGO) and the ZIP pins the place down. <NA> where there's no street.
+    address_ser = street_ser.astype(object) + "|" + zip5_ser.astype(object)
+    codes, unique_addresses = pd.factorize(address_ser)
+    unique_keys = pd.util.hash_array(np.asarray(unique_addresses, dtype=object))
+    key_array = pd.arrays.IntegerArray(
+        np.append(unique_keys, np.uint64(0))[codes], mask=(street_ser == "").to_numpy()
+    )
+    return pd.Series(key_array, index=street_ser.index, name="address_key")
+
+
+@instrumented("normalize")
+def normalize_addresses(table_df: pd.DataFrame, table_name: str) -> pd.DataFrame:
+    # Adds {prefix}_norm_street, _norm_city, _zip5, _zip4 and _address_key columns for every
+    # address in the table (see ADDRESS_FIELDS); the source fields are left as they are.
+    if table_name not in ADDRESS_FIELDS.keys():
+        raise Exception(f"No address fields in {table_name}\n  - options: {list(ADDRESS_FIELDS)}")
+    for prefix, street_column, city_column, zip_column in ADDRESS_FIELDS[table_name]:
+        street_ser = normalize_streets(table_df[street_column].astype(object))
+        zip5_ser, zip4_ser = split_zips(table_df[zip_column].astype(object))
+        table_df[f"{prefix}_norm_street"] = street_ser
+        table_df[f"{prefix}_norm_city"] = normalize_cities(table_df[city_column].astype(object))
+        table_df[f"{prefix}_zip5"] = zip5_ser
+        table_df[f"{prefix}_zip4"] = zip4_ser
+        table_df[f"{prefix}_address_key"] = get_address_keys(
+            street_ser=street_ser, zip5_ser=zip5_ser
+        )
+    return table_df
@@ -0,0 +1,126 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from layouts import Field
+
+# Which implementation slices fixed-width fields and maps code tables:
+#   pandas: numpy string views, one Python str per value once they reach pandas
+#   arrow:  Arrow string buffers built straight from the record bytes, fields sliced in a
+#           thread pool, and code tables mapped with Arrow compute kernels
+# Either way the transforms return pandas DataFrames with the same values and dtypes.
+BACKENDS = ["pandas", "arrow"]
+BACKEND = "pandas"
+
+# Threads the arrow backend slices fields with (None for one per core)
+MAX_WORKERS: Optional[int] = None
+
+# pandas' default string dtype, which is backed by an Arrow array
+PANDAS_STRING_DTYPE = pd.StringDtype("pyarrow", na_value=np.nan)
+
+
+def set_backend(backend: str, max_workers: Optional[int] = None) -> None:
+    global BACKEND, MAX_WORKERS
+    if backend not in BACKENDS:
+        raise Exception(f"Unknown backend: {backend}\n  - options: {BACKENDS}")
+    BACKEND = backend
+    MAX_WORKERS = max_workers
+
+
+def get_backend() -> str:
+    return BACKEND
+
+
+def to_utf8(codes: np.ndarray) -> np.ndarray:
+    # UTF-8 bytes of a run of latin1 codes. Codes below 128 are their own UTF-8 byte; the
+    # rest take two bytes.
+    is_wide = codes >= 128
+    if not is_wide.any():
+        return codes
+    n_bytes = 1 + is_wide
+    utf8_bytes = np.repeat(codes, n_bytes)
+    wide_starts = (np.cumsum(n_bytes) - n_bytes)[is_wide]
+    utf8_bytes[wide_starts] = 0xC0 | (codes[is_wide] >> 6)
+    utf8_bytes[wide_starts + 1] = 0x80 | (codes[is_wide] & 0x3F)
+    return utf8_bytes
+
+
+def slice_arrow_field(char_matrix: np.ndarray, start: int, end: Optional[int]) -> pa.Array:
+    # Same values as extractors.slice_field (trailing NUL padding of short records dropped,
+    # blanks kept), as an Arrow string array with one data buffer for the whole field
+    n_records, record_width = char_matrix.shape
+    end = record_width if end is None else min(end, record_width)
+    start = min(start, end)
+    field_width = end - start
+    field_codes = np.ascontiguousarray(char_matrix[:, start:end], dtype=np.uint8)
+    if field_width > 0 and not field_codes[:, -1].all():
+        is_content = field_codes != 0
+        field_lengths = np.where(
+            is_content.any(axis=1), field_width - np.argmax(is_content[:, ::-1], axis=1), 0
+        )
+        is_in_field = np.arange(field_width) < field_lengths[:, None]
+        codes = field_codes[is_in_field]
+    else:
+        field_lengths = np.full(n_records, field_width)
+        is_in_field = None
+        codes = field_codes.ravel()
+    utf8_bytes = to_utf8(codes=codes)
+    if len(utf8_bytes) == field_codes.size:
+        offsets = np.arange(n_records + 1, dtype=np.int64) * field_width
+    else:
+        is_wide = field_codes >= 128
+        if is_in_field is not None:
+            is_wide &= is_in_field
+        utf8_lengths = field_lengths + is_wide.sum(axis=1)
+        offsets = np.concatenate([[0], np.cumsum(utf8_lengths)])
+    string_type = pa.string() if offsets[-1] < 2**31 else pa.large_string()
+    offset_dtype = np.int32 if string_type == pa.string() else np.int64
+    return pa.Array.from_buffers(
+        string_type,
+        n_records,
+        [None, pa.py_buffer(offsets.astype(offset_dtype)), pa.py_buffer(utf8_bytes)],
+    )
+
+
+def slice_arrow_fields(
+    char_matrix: np.ndarray, layout: List[Field], index: Optional[pd.Index] = None
+) -> pd.DataFrame:
+    # numpy releases the GIL for the copies that make up most of the work, so the fields
+    # are sliced in parallel threads
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS or os.cpu_count()) as executor:
+        field_arrays = executor.map(
+            lambda field: slice_arrow_field(char_matrix=char_matrix, start=field[1], end=field[2]),
+            layout,
+        )
+        fields = {
+            field_name: pd.Series(field_array, dtype=PANDAS_STRING_DTYPE, index=index)
+            for (field_name, _, _, _), field_array in zip(layout, field_arrays)
+        }
+    return pd.DataFrame(fields, index=index)
+
+
+def map_arrow_codes(
+    code_ser: pd.Series, code_map: Dict[str, str], as_category: bool = False
+) -> pd.Series:
+    # Same values as transformers.map_codes, looked up with Arrow's hash kernels
+    code_array = pa.array(code_ser.array, type=pa.string())
+    code_positions = pc.index_in(code_array, value_set=pa.array(list(code_map.keys())))
+    if not as_category:
+        descriptions = pc.take(pa.array(list(code_map.values()), type=pa.string()), code_positions)
+        return pd.Series(
+            descriptions, dtype=PANDAS_STRING_DTYPE, index=code_ser.index, name=code_ser.name
+        )
+    categories = pd.Index(list(dict.fromkeys(code_map.values())))
+    category_positions = categories.get_indexer(list(code_map.values()))
+    code_positions = code_positions.fill_null(-1).to_numpy(zero_copy_only=False)
+    category_codes = np.where(code_positions >= 0, category_positions[code_positions], -1)
+    return pd.Series(
+        pd.Categorical.from_codes(category_codes, categories=categories),
+        index=code_ser.index,
+        name=code_ser.name,
+    )
@@ -0,0 +1,236 @@
+from concurrent.futures import ProcessPoolExecutor
+import contextlib
+from datetime import datetime, timezone
+import io
+import json
+from pathlib import Path
+import platform
+import resource
+import subprocess
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from decoders import decode_dates, decode_ints
+from extractors import (
+    check__is_last_line_a_count_of,
+    parse_fixed_width_data,
+    read_file_lines,
+    unpack_member,
+)
+from synthetic import write_synthetic_file
+from transformers import CORP_TABLES, TABLES, clean_stock_class, transform_fused
+
+DEFAULT_HISTORY_PATH = Path(__file__).parents[1].joinpath("benchmarks", "history.jsonl")
+
+
+def get_peak_rss_mb() -> float:
+    # High-water mark of this process's resident set (ru_maxrss is in KiB on Linux)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def get_commit() -> str:
+    try:
+        git_result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return git_result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_stage(stage: str, n_rows: int, results: List[Dict[str, Any]], func: Callable) -> Any:
+    # The stages' own progress printing is swallowed so it doesn't end up in the timings
+    with contextlib.redirect_stdout(io.StringIO()):
+        start_time = time.perf_counter()
+        stage_output = func()
+        seconds = time.perf_counter() - start_time
+    results.append(
+        {
+            "stage": stage,
+            "n_rows": n_rows,
+            "seconds": seconds,
+            "rows_per_second": n_rows / seconds if seconds > 0 else None,
+            "peak_rss_mb": get_peak_rss_mb(),
+        }
+    )
+    return stage_output
+
+
+def type_convert(table_df: pd.DataFrame, table_name: str) -> pd.DataFrame:
+    # Just the layout-driven date and integer decoding, without any of the code mapping
+    # done in the table's convert function
+    for field_name, _, _, dtype in TABLES[table_name].layout:
+        if dtype == "date":
+            table_df[field_name] = decode_dates(table_df[field_name])
+        elif dtype == "int":
+            table_df[field_name] = decode_ints(table_df[field_name])
+    return table_df
+
+
+def benchmark_file(table_name: str, file_path: Path) -> List[Dict[str, Any]]:
+    # Runs one file through every stage of the line-based path, then through the whole fused
+    # transform, read in memory and then memory-mapped from a copy unpacked beforehand.
+    # file_path must be named as TABLES[table_name].file_name. Meant to run in a fresh
+    # process so peak_rss_mb reflects this file alone; it's the process high-water mark
+    # after each stage.
+    table_spec = TABLES[table_name]
+    results = []
+    lines = run_stage(
+        stage="decompress",
+        n_rows=0,
+        results=results,
+        func=lambda: read_file_lines(file_path=file_path),
+    )
+    n_rows = len(lines) - 2
+    results[-1]["n_rows"] = n_rows
+    results[-1]["rows_per_second"] = n_rows / results[-1]["seconds"]
+    decoded_lines = run_stage(
+        stage="decode",
+        n_rows=n_rows,
+        results=results,
+        func=lambda: [line.decode(encoding="latin1").replace("\r\n", "") for line in lines],
+    )
+    del lines
+    run_stage(
+        stage="trailer_check",
+        n_rows=n_rows,
+        results=results,
+        func=lambda: check__is_last_line_a_count_of(
+            last_line=decoded_lines[-1], n_data_lines=n_rows
+        ),
+    )
+    line_df = pd.DataFrame({"line": decoded_lines[1:-1]})
+    del decoded_lines
+    table_df = run_stage(
+        stage="slice",
+        n_rows=n_rows,
+        results=results,
+        func=lambda: parse_fixed_width_data(line_df=line_df, layout=table_spec.layout),
+    )
+    del line_df
+    run_stage(
+        stage="type_convert",
+        n_rows=n_rows,
+        results=results,
+        func=lambda: type_convert(table_df=table_df.copy(), table_name=table_name),
+    )
+    if table_spec.convert is not None:
+        run_stage(
+            stage="convert",
+            n_rows=n_rows,
+            results=results,
+            func=lambda: table_spec.convert(table_df.copy()),
+        )
+    if table_name == "corp_stock":
+        run_stage(
+            stage="clean_stock_class",
+            n_rows=n_rows,
+            results=results,
+            func=lambda: clean_stock_class(table_df.copy()),
+        )
+    del table_df
+    run_stage(
+        stage="fused",
+        n_rows=n_rows,
+        results=results,
+        func=lambda: transform_fused(table_name=table_name, DATA_DIR=file_path.parent),
+    )
+    with tempfile.TemporaryDirectory() as raw_dir:
+        run_stage(
+            stage="unpack",
+            n_rows=n_rows,
+            results=results,
+            func=lambda: unpack_member(file_path=file_path, raw_dir=Path(raw_dir)),
+        )
+        run_stage(
+            stage="fused_mmap",
+            n_rows=n_rows,
+            results=results,
+            func=lambda: transform_fused(
+                table_name=table_name,
+                DATA_DIR=file_path.parent,
+                use_mmap=True,
+                raw_dir=Path(raw_dir),
+            ),
+        )
+    return results
+
+
+def run_benchmarks(
+    DATA_DIR: Path,
+    n_synthetic_records: int = 100_000,
+    history_path: Optional[Path] = DEFAULT_HISTORY_PATH,
+) -> pd.DataFrame:
+    # Benchmarks every shipped file in DATA_DIR plus a synthetic file of n_synthetic_records
+    # for every corp table, each in its own process, and appends the results to the JSONL
+    # history at history_path (None to skip).
+    run_info = {
+        "commit": get_commit(),
+        "run_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+    }
+    results = []
+    with tempfile.TemporaryDirectory() as synthetic_dir:
+        file_paths = {}
+        for table_name, table_spec in TABLES.items():
+            if DATA_DIR.joinpath(table_spec.file_name).is_file():
+                file_paths[(table_name, "shipped")] = DATA_DIR.joinpath(table_spec.file_name)
+        for seed, (table_name, table_spec) in enumerate(CORP_TABLES.items()):
+            file_paths[(table_name, "synthetic")] = write_synthetic_file(
+                file_path=Path(synthetic_dir).joinpath(table_spec.file_name),
+                layout=table_spec.layout,
+                n_records=n_synthetic_records,
+                seed=seed,
+                table_name=table_name,
+            )
+        with ProcessPoolExecutor(max_workers=1, max_tasks_per_child=1) as executor:
+            futures = {
+                file_key: executor.submit(benchmark_file, table_name=file_key[0], file_path=path)
+                for file_key, path in file_paths.items()
+            }
+            for (table_name, source), future in futures.items():
+                for stage_result in future.result():
+                    results.append(
+                        {**run_info, "table": table_name, "source": source, **stage_result}
+                    )
+                    print(
+                        f"{table_name:<22} {source:<9} {stage_result['stage']:<17} "
+                        f"{stage_result['seconds']:>9.4f}s {stage_result['peak_rss_mb']:>8.1f} MB"
+                    )
+    if history_path is not None:
+        history_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(history_path, "a") as f:
+            for result in results:
+                f.write(json.dumps(result) + "\n")
+    return pd.DataFrame(results)
+
+
+def load_benchmark_history(history_path: Path = DEFAULT_HISTORY_PATH) -> pd.DataFrame:
+    return pd.read_json(history_path, lines=True, dtype={"commit": str})
+
+
+def compare_benchmarks(history_df: pd.DataFrame, baseline_commit: str, commit: str) -> pd.DataFrame:
+    # Median seconds per (table, source, stage) for the two commits and their ratio;
+    # a ratio above 1 means commit is slower than baseline_commit.
+    median_df = (
+        history_df.loc[history_df["commit"].isin([baseline_commit, commit])]
+        .groupby(["table", "source", "stage", "commit"])["seconds"]
+        .median()
+        .unstack("commit")
+    )
+    median_df["ratio"] = median_df[commit] / median_df[baseline_commit]
+    return median_df
+
+
+if __name__ == "__main__":
+    run_benchmarks(DATA_DIR=Path(__file__).parents[1].joinpath("data"))
@@ -0,0 +1,106 @@
+import hashlib
+import os
+from pathlib import Path
+from typing import List, Optional
+
+import pandas as pd
+import pyarrow.feather as feather
+
+from layouts import LAYOUT_VERSION
+from transformers import TABLES, Filter, get_filter_mask, transform_fused
+
+
+def hash_file(file_path: Path, block_size: int = 2**20) -> str:
+    file_hash = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            file_hash.update(block)
+    return file_hash.hexdigest()
+
+
+def get_cache_dir(DATA_DIR: Path, cache_dir: Optional[Path] = None) -> Path:
+    if cache_dir is None:
+        cache_dir = DATA_DIR.joinpath("cache")
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir
+
+
+def get_cache_path(table_name: str, file_path: Path, cache_dir: Path) -> Path:
+    file_hash = hash_file(file_path=file_path)
+    return cache_dir.joinpath(f"{table_name}__{file_hash[:16]}__v{LAYOUT_VERSION}.arrow")
+
+
+def find_cached_table(table_name: str, cache_dir: Path) -> Optional[Path]:
+    # The current-layout entry for table_name, whichever source drop it was built from.
+    cache_paths = sorted(cache_dir.glob(f"{table_name}__*__v{LAYOUT_VERSION}.arrow"))
+    return cache_paths[0] if len(cache_paths) > 0 else None
+
+
+def write_cached_table(df: pd.DataFrame, cache_path: Path) -> None:
+    # Uncompressed Arrow IPC so the file can be memory-mapped on load. Written to a temp
+    # file and renamed so a reader never sees a partially written table.
+    tmp_path = cache_path.with_suffix(".arrow.tmp")
+    feather.write_feather(df.reset_index(drop=True), tmp_path, compression="uncompressed")
+    os.replace(tmp_path, cache_path)
+    for stale_path in cache_path.parent.glob(f"{cache_path.name.split('__')[0]}__*.arrow"):
+        if stale_path != cache_path:
+            stale_path.unlink()
+
+
+def read_cached_table(
+    cache_path: Path,
+    columns: Optional[List[str]] = None,
+    filters: Optional[List[Filter]] = None,
+) -> pd.DataFrame:
+    # Only the columns asked for (and filtered on) are read from the memory-mapped file
+    read_columns = None
+    if columns is not None:
+        filter_columns = [column for column, _, _ in filters] if filters is not None else []
+        read_columns = list(dict.fromkeys(columns + filter_columns))
+    table = feather.read_table(cache_path, columns=read_columns, memory_map=True)
+    table_df = table.to_pandas()
+    if filters is not None and len(filters) > 0:
+        table_df = table_df.loc[get_filter_mask(table_df=table_df, filters=filters)]
+    return table_df if columns is None else table_df[columns]
+
+
+def build_cached_table(
+    table_name: str,
+    DATA_DIR: Path,
+    cache_dir: Optional[Path] = None,
+    refresh: bool = False,
+    use_mmap: bool = False,
+) -> Path:
+    # Tables are built with transform_fused; use_mmap parses from a memory-mapped, unpacked
+    # copy of the zip member (see unpack_member) rather than from it decompressed in memory.
+    if table_name not in TABLES.keys():
+        raise Exception(f"Unknown table_name: {table_name}\n  - options: {list(TABLES)}")
+    table_spec = TABLES[table_name]
+    file_path = DATA_DIR.joinpath(table_spec.file_name)
+    if not file_path.is_file():
+        raise Exception(f"No file found at the entered file_path\n  - {file_path}")
+    cache_dir = get_cache_dir(DATA_DIR=DATA_DIR, cache_dir=cache_dir)
+    cache_path = get_cache_path(table_name=table_name, file_path=file_path, cache_dir=cache_dir)
+    if refresh or not cache_path.is_file():
+        df = transform_fused(table_name=table_name, DATA_DIR=DATA_DIR, use_mmap=use_mmap)
+        write_cached_table(df=df, cache_path=cache_path)
+    return cache_path
+
+
+def load_table(
+    table_name: str,
+    DATA_DIR: Path,
+    cache_dir: Optional[Path] = None,
+    refresh: bool = False,
+    use_mmap: bool = False,
+    columns: Optional[List[str]] = None,
+    filters: Optional[List[Filter]] = None,
+) -> pd.DataFrame:
+    cache_path = build_cached_table(
+        table_name=table_name,
+        DATA_DIR=DATA_DIR,
+        cache_dir=cache_dir,
+        refresh=refresh,
+        use_mmap=use_mmap,
+    )
+    return read_cached_table(cache_path=cache_path, columns=columns, filters=filters)
@@ -0,0 +1,397 @@
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from cache import build_cached_table, get_cache_dir, read_cached_table
+from deltas import read_delta
+from transformers import Filter, get_filter_mask
+
+# Bumped whenever the facts, cells or buckets change shape, so older cubes are rebuilt
+CUBE_VERSION = 1
+
+# table_name: columns each table contributes to the capital cube's facts. There's one fact
+# per corporation in corp_master; corporations with several agent records take the first.
+CUBE_SOURCES = {
+    "corp_master": [
+        "corp_file_number",
+        "corp_incorp_date",
+        "corp_state_code",
+        "corp_status",
+        "corp_corp_intent",
+    ],
+    "corp_agent": ["corp_file_number", "corp_agent_county_code"],
+    "corp_other": ["corp_file_number", "corp_oth_total_cap", "corp_oth_ill_cap"],
+}
+CUBE_DIMENSIONS = [
+    "corp_agent_county_code",
+    "corp_state_code",
+    "corp_status",
+    "corp_corp_intent",
+    "corp_incorp_year",
+]
+CUBE_MEASURES = ["corp_oth_total_cap", "corp_oth_ill_cap"]
+CELL_VALUE_COLUMNS = ["n_corps"] + [
+    f"{measure}_{value}" for measure in CUBE_MEASURES for value in ("count", "sum")
+]
+
+# Quantiles come from counts of the measures' values in log-spaced buckets (as in
+# DDSketch), which add up across cells and data drops like the counts and sums do. Each
+# estimate is within QUANTILE_RELATIVE_ACCURACY of a value at that rank.
+QUANTILES = [0.25, 0.5, 0.75, 0.9, 0.99]
+QUANTILE_RELATIVE_ACCURACY = 0.01
+BUCKET_GAMMA = (1 + QUANTILE_RELATIVE_ACCURACY) / (1 - QUANTILE_RELATIVE_ACCURACY)
+
+# FNV-1a's 64-bit prime, for combining the value hashes of a cell into its key
+CELL_KEY_PRIME = np.uint64(0x100000001B3)
+
+
+class CapitalCube(NamedTuple):
+    # Cells and value buckets of every cuboid, keyed by grouping: a bitmask of the
+    # CUBE_DIMENSIONS the cuboid keeps (bit i for CUBE_DIMENSIONS[i]); the dimensions it
+    # rolls up are <NA> in its cells. Buckets refer to their cell by cell_key.
+    cells: Dict[int, pd.DataFrame]
+    buckets: Dict[int, pd.DataFrame]
+
+
+def get_grouping(dimensions: List[str]) -> int:
+    return sum(1 << CUBE_DIMENSIONS.index(dimension) for dimension in set(dimensions))
+
+
+def get_grouping_dimensions(grouping: int) -> List[str]:
+    return [dimension for i, dimension in enumerate(CUBE_DIMENSIONS) if grouping >> i & 1]
+
+
+def get_cube_facts(table_dfs: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    master_df = table_dfs["corp_master"]
+    fact_df = master_df[["corp_file_number", "corp_state_code", "corp_status", "corp_corp_intent"]]
+    fact_df = fact_df.assign(corp_incorp_year=master_df["corp_incorp_date"].dt.year.astype("Int16"))
+    for table_name in ["corp_agent", "corp_other"]:
+        table_df = table_dfs[table_name].drop_duplicates("corp_file_number")
+        fact_df = fact_df.merge(table_df, how="left", on="corp_file_number")
+    return fact_df[["corp_file_number"] + CUBE_DIMENSIONS + CUBE_MEASURES]
+
+
+def get_buckets(values: np.ndarray) -> np.ndarray:
+    # Bucket 0 holds zeros; bucket +-(i + 1) holds magnitudes in (gamma**(i - 1), gamma**i]
+    magnitudes = np.maximum(np.abs(values), 1).astype(np.float64)
+    indexes = np.ceil(np.log(magnitudes) / np.log(BUCKET_GAMMA)).astype(np.int32) + 1
+    return np.where(values == 0, 0, np.sign(values).astype(np.int32) * indexes)
+
+
+def get_bucket_values(buckets: np.ndarray) -> np.ndarray:
+    # The value every member of a bucket is estimated as: within the relative accuracy of
+    # both of the bucket's bounds
+    magnitudes = 2 * BUCKET_GAMMA ** (np.abs(buckets) - 1.0) / (BUCKET_GAMMA + 1)
+    return np.where(buckets == 0, 0.0, np.sign(buckets) * magnitudes)
+
+
+def get_value_hashes(values: pd.Index) -> np.ndarray:
+    return pd.util.hash_pandas_object(pd.Series(values), index=False).to_numpy()
+
+
+def get_cell_keys(
+    code_df: pd.DataFrame, grouping: int, dimension_hashes: Dict[str, np.ndarray]
+) -> np.ndarray:
+    # Keys of a cuboid's cells built from hashes of their dimension values, so they're
+    # stable across builds and the cells of a delta line up with the stored ones
+    cell_keys = np.full(len(code_df), grouping, dtype=np.uint64)
+    grouping_dimensions = get_grouping_dimensions(grouping=grouping)
+    for dimension in CUBE_DIMENSIONS:
+        if dimension in grouping_dimensions:
+            value_hashes = dimension_hashes[dimension][code_df[dimension].to_numpy()]
+            cell_keys = (cell_keys ^ value_hashes) * CELL_KEY_PRIME
+        else:
+            cell_keys = cell_keys * CELL_KEY_PRIME
+    return cell_keys
+
+
+def decode_cells(
+    code_df: pd.DataFrame, grouping: int, dimension_values: Dict[str, pd.Index]
+) -> pd.DataFrame:
+    # Swaps the dimension codes of a cuboid's cells for their values, with <NA> for the
+    # rolled up dimensions
+    cell_df = pd.DataFrame({"grouping": np.full(len(code_df), grouping, dtype=np.int8)})
+    grouping_dimensions = get_grouping_dimensions(grouping=grouping)
+    for dimension in CUBE_DIMENSIONS:
+        values = dimension_values[dimension]
+        if dimension in grouping_dimensions:
+            cell_df[dimension] = values.take(code_df[dimension].to_numpy())
+        else:
+            cell_df[dimension] = pd.Series(pd.NA, index=cell_df.index, dtype=values.dtype)
+    return cell_df
+
+
+def aggregate_facts(
+    fact_df: pd.DataFrame, weights: np.ndarray
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    # The cells and value buckets of every cuboid, with each fact counted weight times (-1
+    # takes a fact back out). The facts go to the base cuboid first, and every other
+    # cuboid is rolled up from its cells rather than from the facts.
+    dimension_values = {}
+    code_df = pd.DataFrame(index=fact_df.index)
+    for dimension in CUBE_DIMENSIONS:
+        codes, values = pd.factorize(fact_df[dimension], use_na_sentinel=False)
+        code_df[dimension] = codes
+        dimension_values[dimension] = pd.Index(values, dtype=fact_df[dimension].dtype)
+    dimension_hashes = {
+        dimension: get_value_hashes(values=values) for dimension, values in dimension_values.items()
+    }
+    value_df = code_df.assign(n_corps=weights)
+    measure_bucket_dfs = []
+    for measure in CUBE_MEASURES:
+        is_value = fact_df[measure].notna().to_numpy()
+        values = fact_df[measure].fillna(0).to_numpy(dtype=np.int64)
+        value_df[f"{measure}_count"] = np.where(is_value, weights, 0)
+        value_df[f"{measure}_sum"] = values * weights
+        measure_bucket_dfs.append(
+            code_df.loc[is_value].assign(
+                measure=measure, bucket=get_buckets(values[is_value]), count=weights[is_value]
+            )
+        )
+    base_cell_df = value_df.groupby(CUBE_DIMENSIONS, sort=False, as_index=False).sum()
+    base_bucket_df = pd.concat(measure_bucket_dfs, ignore_index=True)
+    base_bucket_df = base_bucket_df.groupby(
+        CUBE_DIMENSIONS + ["measure", "bucket"], sort=False, as_index=False
+    )["count"].sum()
+    cell_dfs, bucket_dfs = [], []
+    for grouping in range(2 ** len(CUBE_DIMENSIONS)):
+        grouping_dimensions = get_grouping_dimensions(grouping=grouping)
+        if len(grouping_dimensions) > 0:
+            cell_df = base_cell_df.groupby(grouping_dimensions, sort=False, as_index=False)[
+                CELL_VALUE_COLUMNS
+            ].sum()
+        else:
+            cell_df = base_cell_df[CELL_VALUE_COLUMNS].sum().to_frame().T
+        bucket_df = base_bucket_df.groupby(
+            grouping_dimensions + ["measure", "bucket"], sort=False, as_index=False
+        )["count"].sum()
+        grouping_cell_df = decode_cells(
+            code_df=cell_df, grouping=grouping, dimension_values=dimension_values
+        )
+        grouping_cell_df.insert(
+            0,
+            "cell_key",
+            get_cell_keys(code_df=cell_df, grouping=grouping, dimension_hashes=dimension_hashes),
+        )
+        cell_dfs.append(pd.concat([grouping_cell_df, cell_df[CELL_VALUE_COLUMNS]], axis=1))
+        bucket_dfs.append(
+            pd.DataFrame(
+                {
+                    "grouping": np.full(len(bucket_df), grouping, dtype=np.int8),
+                    "cell_key": get_cell_keys(
+                        code_df=bucket_df, grouping=grouping, dimension_hashes=dimension_hashes
+                    ),
+                    "measure": bucket_df["measure"],
+                    "bucket": bucket_df["bucket"].astype(np.int32),
+                    "count": bucket_df["count"],
+                }
+            )
+        )
+    return pd.concat(cell_dfs, ignore_index=True), pd.concat(bucket_dfs, ignore_index=True)
+
+
+def merge_cells(cell_df: pd.DataFrame, delta_cell_df: pd.DataFrame) -> pd.DataFrame:
+    # Adds the delta's values to the cells with the same key; cells left without any
+    # corporation are dropped
+    merged_df = pd.concat([cell_df, delta_cell_df], ignore_index=True)
+    value_df = merged_df.groupby("cell_key", sort=False)[CELL_VALUE_COLUMNS].sum()
+    merged_df = merged_df.drop_duplicates("cell_key").set_index("cell_key")
+    merged_df[CELL_VALUE_COLUMNS] = value_df
+    return merged_df.loc[merged_df["n_corps"] != 0].reset_index()
+
+
+def merge_buckets(bucket_df: pd.DataFrame, delta_bucket_df: pd.DataFrame) -> pd.DataFrame:
+    merged_df = pd.concat([bucket_df, delta_bucket_df], ignore_index=True)
+    merged_df = merged_df.groupby(
+        ["grouping", "cell_key", "measure", "bucket"], sort=False, as_index=False
+    )["count"].sum()
+    return merged_df.loc[merged_df["count"] != 0].reset_index(drop=True)
+
+
+def get_cube_path(part: str, cache_dir: Path) -> Path:
+    return cache_dir.joinpath(f"capital_cube__v{CUBE_VERSION}.{part}")
+
+
+def get_cube_source(cache_paths: List[Optional[Path]]) -> str:
+    return "|".join(str(None) if path is None else path.name for path in cache_paths)
+
+
+def write_cube_part(part_df: pd.DataFrame, part_path: Path, source: str) -> None:
+    part_table = pa.Table.from_pandas(part_df, preserve_index=False)
+    # kept beside the pandas metadata, which restores the nullable integer dtypes on read
+    part_table = part_table.replace_schema_metadata(
+        {**part_table.schema.metadata, b"source": source.encode()}
+    )
+    tmp_path = part_path.with_name(f"{part_path.name}.tmp")
+    feather.write_feather(part_table, tmp_path, compression="uncompressed")
+    tmp_path.replace(part_path)
+
+
+def read_cube_part(part_path: Path) -> Tuple[pd.DataFrame, str]:
+    part_table = feather.read_table(part_path, memory_map=True)
+    return part_table.to_pandas(), part_table.schema.metadata[b"source"].decode()
+
+
+def update_capital_cube(DATA_DIR: Path, cache_dir: Optional[Path] = None) -> CapitalCube:
+    # Brings the capital cube up to date with the tables cached for the drop in DATA_DIR.
+    # When the cube was built from the tables that update_table last stepped from, only
+    # the facts of file numbers in the tables' deltas (see read_delta) are taken back out
+    # and put in again; otherwise it's built from all the facts. New drops are ingested by
+    # update_tables, not here. The facts are written last, so a cube whose cells or buckets
+    # were only partly updated is rebuilt the next time.
+    cache_dir = get_cache_dir(DATA_DIR=DATA_DIR, cache_dir=cache_dir)
+    cache_paths = [
+        build_cached_table(table_name=table_name, DATA_DIR=DATA_DIR, cache_dir=cache_dir)
+        for table_name in CUBE_SOURCES
+    ]
+    source = get_cube_source(cache_paths=cache_paths)
+    facts_path = get_cube_path(part="facts", cache_dir=cache_dir)
+    fact_df, fact_source = None, None
+    if facts_path.is_file():
+        fact_df, fact_source = read_cube_part(part_path=facts_path)
+    if fact_source == source:
+        return load_capital_cube(cache_dir=cache_dir)
+    delta_dfs = None
+    if fact_source is not None and len(fact_source.split("|")) == len(CUBE_SOURCES):
+        delta_dfs = [
+            read_delta(
+                table_name=table_name,
+                previous_cache_name=previous_cache_name,
+                cache_name=cache_path.name,
+                cache_dir=cache_dir,
+            )
+            for table_name, previous_cache_name, cache_path in zip(
+                CUBE_SOURCES, fact_source.split("|"), cache_paths
+            )
+        ]
+    if delta_dfs is not None and all(delta_df is not None for delta_df in delta_dfs):
+        changed_file_numbers = pd.concat([delta_df["file_number"] for delta_df in delta_dfs])
+        changed_file_numbers = list(changed_file_numbers.unique())
+        table_dfs = {
+            table_name: read_cached_table(
+                cache_path=cache_path,
+                columns=columns,
+                filters=[("corp_file_number", "in", changed_file_numbers)],
+            )
+            for (table_name, columns), cache_path in zip(CUBE_SOURCES.items(), cache_paths)
+        }
+        changed_fact_df = get_cube_facts(table_dfs=table_dfs)
+        is_changed = fact_df["corp_file_number"].isin(changed_file_numbers).to_numpy()
+        delta_fact_df = pd.concat([fact_df.loc[is_changed], changed_fact_df], ignore_index=True)
+        weights = np.concatenate(
+            [np.full(is_changed.sum(), -1), np.ones(len(changed_fact_df), dtype=np.int64)]
+        )
+        delta_cell_df, delta_bucket_df = aggregate_facts(fact_df=delta_fact_df, weights=weights)
+        cell_df, _ = read_cube_part(part_path=get_cube_path(part="cells", cache_dir=cache_dir))
+        cell_df = merge_cells(cell_df=cell_df, delta_cell_df=delta_cell_df)
+        bucket_df, _ = read_cube_part(part_path=get_cube_path(part="buckets", cache_dir=cache_dir))
+        bucket_df = merge_buckets(bucket_df=bucket_df, delta_bucket_df=delta_bucket_df)
+        fact_df = pd.concat([fact_df.loc[~is_changed], changed_fact_df], ignore_index=True)
+        fact_df = fact_df.sort_values("corp_file_number", kind="stable", ignore_index=True)
+        print(f"Updated the capital cube with {len(changed_file_numbers)} changed file numbers")
+    else:
+        table_dfs = {
+            table_name: read_cached_table(cache_path=cache_path, columns=columns)
+            for (table_name, columns), cache_path in zip(CUBE_SOURCES.items(), cache_paths)
+        }
+        fact_df = get_cube_facts(table_dfs=table_dfs)
+        cell_df, bucket_df = aggregate_facts(
+            fact_df=fact_df, weights=np.ones(len(fact_df), dtype=np.int64)
+        )
+    for part, part_df in [("cells", cell_df), ("buckets", bucket_df), ("facts", fact_df)]:
+        write_cube_part(
+            part_df=part_df, part_path=get_cube_path(part=part, cache_dir=cache_dir), source=source
+        )
+    return load_capital_cube(cache_dir=cache_dir)
+
+
+def load_capital_cube(cache_dir: Path) -> CapitalCube:
+    cell_df, _ = read_cube_part(part_path=get_cube_path(part="cells", cache_dir=cache_dir))
+    bucket_df, _ = read_cube_part(part_path=get_cube_path(part="buckets", cache_dir=cache_dir))
+    return CapitalCube(
+        cells={
+            grouping: grouping_df.reset_index(drop=True)
+            for grouping, grouping_df in cell_df.groupby("grouping")
+        },
+        buckets={
+            grouping: grouping_df.reset_index(drop=True)
+            for grouping, grouping_df in bucket_df.groupby("grouping")
+        },
+    )
+
+
+def estimate_quantiles(
+    group_ids: np.ndarray,
+    buckets: np.ndarray,
+    counts: np.ndarray,
+    n_groups: int,
+    quantiles: List[float],
+) -> np.ndarray:
+    # (n_groups, n_quantiles) estimates of each group's quantiles from its bucketed values
+    # (NaN for groups without any). With the buckets in order within each group, the
+    # running count reaches a group's target rank inside the bucket holding the quantile.
+    order = np.lexsort((buckets, group_ids))
+    sorted_buckets = buckets[order]
+    running_counts = np.cumsum(counts[order])
+    group_counts = np.bincount(group_ids, weights=counts, minlength=n_groups).astype(np.int64)
+    group_starts = np.cumsum(group_counts) - group_counts
+    estimates = np.full((n_groups, len(quantiles)), np.nan)
+    if len(order) == 0:
+        return estimates
+    has_values = group_counts > 0
+    for i, q in enumerate(quantiles):
+        ranks = group_starts + np.floor(q * np.maximum(group_counts - 1, 0)).astype(np.int64)
+        positions = np.minimum(np.searchsorted(running_counts, ranks, side="right"), len(order) - 1)
+        estimates[has_values, i] = get_bucket_values(sorted_buckets[positions[has_values]])
+    return estimates
+
+
+def query_cube(
+    capital_cube: CapitalCube,
+    group_by: Optional[List[str]] = None,
+    filters: Optional[List[Filter]] = None,
+    quantiles: List[float] = QUANTILES,
+) -> pd.DataFrame:
+    # Corporation counts and the count, sum, mean and quantiles of each measure per
+    # combination of the group_by dimensions, over the corporations matching the filters
+    # (on dimensions too). Reads only the smallest cuboid holding those dimensions.
+    group_by = [] if group_by is None else group_by
+    filters = [] if filters is None else filters
+    dimensions = group_by + [column for column, _, _ in filters]
+    unknown_dimensions = [dimension for dimension in dimensions if dimension not in CUBE_DIMENSIONS]
+    if len(unknown_dimensions) > 0:
+        raise Exception(f"Unknown dimensions: {unknown_dimensions}\n  - options: {CUBE_DIMENSIONS}")
+    grouping = get_grouping(dimensions=dimensions)
+    cell_df = capital_cube.cells.get(grouping, pd.DataFrame(columns=["cell_key"] + CUBE_DIMENSIONS))
+    if len(filters) > 0:
+        cell_df = cell_df.loc[get_filter_mask(table_df=cell_df, filters=filters)]
+    if len(group_by) > 0:
+        cell_groups = cell_df.groupby(group_by, sort=True, dropna=False)
+        group_ids = cell_groups.ngroup().to_numpy()
+        result_df = cell_groups[CELL_VALUE_COLUMNS].sum().reset_index()
+    else:
+        group_ids = np.zeros(len(cell_df), dtype=np.int64)
+        result_df = cell_df[CELL_VALUE_COLUMNS].sum().to_frame().T.astype(np.int64)
+    bucket_df = capital_cube.buckets.get(grouping, pd.DataFrame(columns=["cell_key", "measure"]))
+    bucket_cells = pd.Index(cell_df["cell_key"]).get_indexer(bucket_df["cell_key"])
+    bucket_df = bucket_df.loc[bucket_cells >= 0]
+    bucket_group_ids = group_ids[bucket_cells[bucket_cells >= 0]]
+    for measure in CUBE_MEASURES:
+        result_df[f"{measure}_mean"] = result_df[f"{measure}_sum"] / result_df[
+            f"{measure}_count"
+        ].where(result_df[f"{measure}_count"] > 0)
+        is_measure = (bucket_df["measure"] == measure).to_numpy()
+        estimates = estimate_quantiles(
+            group_ids=bucket_group_ids[is_measure],
+            buckets=bucket_df["bucket"].to_numpy()[is_measure],
+            counts=bucket_df["count"].to_numpy()[is_measure],
+            n_groups=len(result_df),
+            quantiles=quantiles,
+        )
+        for i, q in enumerate(quantiles):
+            result_df[f"{measure}_p{q * 100:g}"] = estimates[:, i]
+    return result_df
@@ -0,0 +1,334 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from backends import PANDAS_STRING_DTYPE, slice_arrow_field
+from extractors import lines_to_char_matrix
+from instrumentation import instrumented, report_invalid_values
+from layouts import INT_FIELD_WIDTHS, Field
+
+# Earliest and latest years whose every date fits in datetime64[ns].
+MIN_DATE_YEAR = 1678
+MAX_DATE_YEAR = 2261
+
+DAYS_IN_MONTH = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+NS_PER_DAY = 86_400 * 10**9
+ALL_8_TRUE = np.frombuffer(np.ones(8, dtype=bool).tobytes(), dtype=np.uint64)[0]
+
+
+def all_8(mask: np.ndarray) -> np.ndarray:
+    # Row-wise .all() of an (n, 8) bool mask, done by reading each row as one uint64.
+    return np.ascontiguousarray(mask).view(np.uint64).ravel() == ALL_8_TRUE
+
+
+def days_since_epoch(year: np.ndarray, month: np.ndarray, day: np.ndarray) -> np.ndarray:
+    # Proleptic Gregorian day count relative to 1970-01-01 (Hinnant's days_from_civil).
+    shifted_year = year - (month <= 2)
+    era = shifted_year // 400
+    year_of_era = shifted_year - era * 400
+    day_of_year = (153 * ((month + 9) % 12) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146_097 + day_of_era - 719_468
+
+
+def decode_yyyymmdd(char_matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # Decodes an (n_records, 8) matrix of character codes holding YYYYMMDD dates with
+    # integer arithmetic. Blank and "00000000" sentinel dates become NaT; anything else that
+    # isn't a real calendar date also becomes NaT and is flagged in the returned mask.
+    n_records, field_width = char_matrix.shape
+    codes = np.zeros((n_records, 8), dtype=np.uint32)
+    codes[:, : min(field_width, 8)] = char_matrix[:, :8]
+    has_extra_chars = (char_matrix[:, 8:] != 0).any(axis=1)
+    # NUL pads short records, so treat it like a blank
+    is_missing = all_8((codes | ord(" ")) == ord(" ")) | all_8(codes == ord("0"))
+    # unsigned wraparound sends every code below "0" past 9 as well
+    digits = codes - np.uint32(ord("0"))
+    is_digits = all_8(digits <= 9) & ~has_extra_chars
+    digits = digits.astype(np.int32)
+    year = digits[:, 0] * 1000 + digits[:, 1] * 100 + digits[:, 2] * 10 + digits[:, 3]
+    month = digits[:, 4] * 10 + digits[:, 5]
+    day = digits[:, 6] * 10 + digits[:, 7]
+    is_leap_year = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    days_in_month = DAYS_IN_MONTH[np.clip(month, 0, 12)] + (is_leap_year & (month == 2))
+    is_valid = (
+        is_digits
+        & (year >= MIN_DATE_YEAR)
+        & (year <= MAX_DATE_YEAR)
+        & (month >= 1)
+        & (month <= 12)
+        & (day >= 1)
+        & (day <= days_in_month)
+    )
+    dates = days_since_epoch(year=year, month=month, day=day).astype(np.int64) * NS_PER_DAY
+    dates[~is_valid] = np.iinfo(np.int64).min
+    return dates.view("datetime64[ns]"), ~is_valid & ~is_missing
+
+
+def factorize_byte_rows(char_matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # pd.factorize for the rows of an (n_records, width) uint8 matrix: the unique row each
+    # record has, and the record where each unique row first appears. Rows are read 8 bytes
+    # at a time as uint64 words, so no str is created per record.
+    n_records, field_width = char_matrix.shape
+    n_words = max(1, -(-field_width // 8))
+    padded_matrix = np.zeros((n_records, n_words * 8), dtype=np.uint8)
+    padded_matrix[:, :field_width] = char_matrix
+    words = padded_matrix.view(np.uint64)
+    unique_positions = np.zeros(n_records, dtype=np.int64)
+    for word_position in range(n_words):
+        word_positions, unique_words = pd.factorize(words[:, word_position])
+        unique_positions, _ = pd.factorize(unique_positions * len(unique_words) + word_positions)
+    _, first_records = np.unique(unique_positions, return_index=True)
+    return unique_positions, first_records
+
+
+def broadcast_dates(
+    unique_positions: np.ndarray, unique_char_matrix: np.ndarray, name: str, index: pd.Index
+) -> pd.Series:
+    dates, is_invalid = decode_yyyymmdd(char_matrix=unique_char_matrix)
+    n_invalid = int(np.bincount(unique_positions, minlength=len(dates))[is_invalid].sum())
+    if n_invalid > 0:
+        report_invalid_values(kind="dates", column=name, n_invalid=n_invalid)
+    return pd.Series(dates[unique_positions], index=index, name=name)
+
+
+def decode_dates(date_ser: pd.Series) -> pd.Series:
+    # Dates repeat heavily, so only the distinct strings are decoded and then broadcast back.
+    # Columns the fused transform already decoded pass through.
+    if pd.api.types.is_datetime64_any_dtype(date_ser):
+        return date_ser
+    unique_positions, unique_dates = pd.factorize(date_ser, use_na_sentinel=False)
+    return broadcast_dates(
+        unique_positions=unique_positions,
+        unique_char_matrix=lines_to_char_matrix(lines=unique_dates),
+        name=date_ser.name,
+        index=date_ser.index,
+    )
+
+
+def decode_date_field(
+    char_matrix: np.ndarray, name: str, index: Optional[pd.Index] = None
+) -> pd.Series:
+    # decode_dates straight from the field's bytes
+    unique_positions, first_records = factorize_byte_rows(char_matrix=char_matrix)
+    return broadcast_dates(
+        unique_positions=unique_positions,
+        unique_char_matrix=char_matrix[first_records],
+        name=name,
+        index=index if index is not None else pd.RangeIndex(len(char_matrix)),
+    )
+
+
+# IBM zoned decimal "overpunch": the sign is folded into the last digit, so "12C" is +123
+# and "12L" is -123
+ZONED_POSITIVE_DIGITS = "{ABCDEFGHI"
+ZONED_NEGATIVE_DIGITS = "}JKLMNOPQR"
+
+NULLABLE_INT_DTYPES = [
+    (np.iinfo(np.int8).max, "Int8"),
+    (np.iinfo(np.int16).max, "Int16"),
+    (np.iinfo(np.int32).max, "Int32"),
+    (np.iinfo(np.int64).max, "Int64"),
+]
+# Digits that always fit in an int64, and so in a decimal128 of this precision
+MAX_DIGITS = 18
+
+
+def get_zoned_lookups() -> Tuple[np.ndarray, np.ndarray]:
+    # Per character code: the digit it stands for as a zoned last position (-1 if none),
+    # and whether it makes the number negative
+    zoned_digits = np.full(256, -1, dtype=np.int64)
+    is_negative_zone = np.zeros(256, dtype=bool)
+    for digit in range(10):
+        zoned_digits[ord(ZONED_POSITIVE_DIGITS[digit])] = digit
+        zoned_digits[ord(ZONED_NEGATIVE_DIGITS[digit])] = digit
+        is_negative_zone[ord(ZONED_NEGATIVE_DIGITS[digit])] = True
+    return zoned_digits, is_negative_zone
+
+
+ZONED_DIGITS, IS_NEGATIVE_ZONE = get_zoned_lookups()
+
+
+def decode_digit_matrix(char_matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Decodes signed integers from an (n_records, width) matrix of character codes. Blanks
+    # (or NUL) may pad the digits on either side; the sign may be a leading or trailing
+    # "+"/"-" or a zoned last digit. All-blank values are missing and anything else that
+    # isn't a number is flagged as invalid. Returns (values, is_missing, is_invalid).
+    n_records, field_width = char_matrix.shape
+    rows = np.arange(n_records)
+    char_matrix = np.array(char_matrix, dtype=np.uint32)
+    is_blank = (char_matrix == ord(" ")) | (char_matrix == 0)
+    is_missing = is_blank.all(axis=1)
+    is_negative = np.zeros(n_records, dtype=bool)
+    if field_width > 0:
+        first_position = np.argmax(~is_blank, axis=1)
+        last_position = field_width - 1 - np.argmax(~is_blank[:, ::-1], axis=1)
+        # a trailing sign or zoned last digit, then a leading sign
+        last_chars = char_matrix[rows, last_position]
+        is_trailing_sign = ~is_missing & ((last_chars == ord("-")) | (last_chars == ord("+")))
+        is_negative |= is_trailing_sign & (last_chars == ord("-"))
+        char_matrix[rows[is_trailing_sign], last_position[is_trailing_sign]] = ord(" ")
+        zoned_digits = ZONED_DIGITS[np.minimum(last_chars, 255)]
+        is_zoned = ~is_missing & (zoned_digits >= 0) & (last_chars < 256)
+        is_negative |= is_zoned & IS_NEGATIVE_ZONE[np.minimum(last_chars, 255)]
+        char_matrix[rows[is_zoned], last_position[is_zoned]] = ord("0") + zoned_digits[is_zoned]
+        first_chars = char_matrix[rows, first_position]
+        is_leading_sign = ~is_missing & ((first_chars == ord("-")) | (first_chars == ord("+")))
+        is_invalid_sign = is_leading_sign & (is_trailing_sign | is_zoned)
+        is_negative |= is_leading_sign & (first_chars == ord("-"))
+        char_matrix[rows[is_leading_sign], first_position[is_leading_sign]] = ord(" ")
+    else:
+        is_invalid_sign = np.zeros(n_records, dtype=bool)
+    digits = char_matrix - np.uint32(ord("0"))
+    is_digit = digits <= 9
+    is_blank = (char_matrix == ord(" ")) | (char_matrix == 0)
+    n_digits_before = np.cumsum(is_digit, axis=1)
+    n_digits_after = is_digit.sum(axis=1, keepdims=True) - n_digits_before
+    is_padding = is_blank & ((n_digits_before == 0) | (n_digits_after == 0))
+    has_digit = is_digit.any(axis=1)
+    is_valid = (
+        has_digit
+        & (is_digit | is_padding).all(axis=1)
+        & ~is_invalid_sign
+        & (is_digit.sum(axis=1) <= MAX_DIGITS)
+    )
+    values = np.zeros(n_records, dtype=np.int64)
+    for position in range(field_width):
+        column_is_digit = is_digit[:, position]
+        values = np.where(column_is_digit, values * 10 + digits[:, position], values)
+    values[is_negative] = -values[is_negative]
+    values[~is_valid] = 0
+    return values, is_missing, ~is_valid & ~is_missing
+
+
+def get_int_dtype(width: Optional[int]) -> str:
+    # The smallest nullable integer dtype that holds every number of width digits. It's set
+    # by the field's width rather than its values, so every drop, shard and delta of a field
+    # decodes to the same dtype; fields of unknown width get Int64.
+    if width is None:
+        return "Int64"
+    largest_magnitude = 10 ** min(width, MAX_DIGITS) - 1
+    for max_value, dtype in NULLABLE_INT_DTYPES:
+        if largest_magnitude <= max_value:
+            return dtype
+    return "Int64"
+
+
+def to_decimal_array(values: np.ndarray, is_null: np.ndarray, n_decimals: int) -> pa.Array:
+    # decimal128 values are 16-byte little-endian two's complement integers scaled by
+    # 10**n_decimals, so the decoded int64s become the low halves and their sign the high.
+    decimal_words = np.empty((len(values), 2), dtype=np.int64)
+    decimal_words[:, 0] = values
+    decimal_words[:, 1] = np.where(values < 0, -1, 0)
+    validity = np.packbits(~is_null, bitorder="little")
+    return pa.Array.from_buffers(
+        pa.decimal128(MAX_DIGITS, n_decimals),
+        len(values),
+        [pa.py_buffer(validity.tobytes()), pa.py_buffer(decimal_words.tobytes())],
+        null_count=int(is_null.sum()),
+    )
+
+
+def broadcast_ints(
+    unique_positions: np.ndarray,
+    unique_char_matrix: np.ndarray,
+    name: str,
+    index: pd.Index,
+    width: Optional[int] = None,
+    n_decimals: int = 0,
+) -> pd.Series:
+    unique_values, is_missing, is_invalid = decode_digit_matrix(char_matrix=unique_char_matrix)
+    n_invalid = int(np.bincount(unique_positions, minlength=len(unique_values))[is_invalid].sum())
+    if n_invalid > 0:
+        report_invalid_values(kind="integers", column=name, n_invalid=n_invalid)
+    values = unique_values[unique_positions]
+    is_null = (is_missing | is_invalid)[unique_positions]
+    if n_decimals > 0:
+        decimal_array = to_decimal_array(values=values, is_null=is_null, n_decimals=n_decimals)
+        return pd.Series(
+            decimal_array, dtype=pd.ArrowDtype(decimal_array.type), index=index
+        ).rename(name)
+    int_array = pd.arrays.IntegerArray(values, is_null)
+    return pd.Series(int_array, index=index, name=name).astype(get_int_dtype(width=width))
+
+
+def decode_ints(int_ser: pd.Series, n_decimals: int = 0, width: Optional[int] = None) -> pd.Series:
+    # Decodes a column of fixed-width numbers into the smallest nullable integer dtype that
+    # holds any number of the field's width (by default looked up by the column's name in
+    # INT_FIELD_WIDTHS), or with n_decimals > 0 into an exact decimal with that many implied
+    # decimal places ("12345" -> 123.45). Blank and invalid values become <NA>; invalid ones
+    # are counted and reported rather than failing the load. Amounts repeat heavily, so
+    # only the distinct strings are decoded and then broadcast back. Columns the fused
+    # transform already decoded pass through.
+    if pd.api.types.is_integer_dtype(int_ser):
+        return int_ser
+    if isinstance(int_ser.dtype, pd.ArrowDtype) and pa.types.is_decimal(
+        int_ser.dtype.pyarrow_dtype
+    ):
+        return int_ser
+    unique_positions, unique_numbers = pd.factorize(int_ser, use_na_sentinel=False)
+    return broadcast_ints(
+        unique_positions=unique_positions,
+        unique_char_matrix=lines_to_char_matrix(lines=unique_numbers),
+        name=int_ser.name,
+        index=int_ser.index,
+        width=width if width is not None else INT_FIELD_WIDTHS.get(int_ser.name),
+        n_decimals=n_decimals,
+    )
+
+
+def decode_int_field(
+    char_matrix: np.ndarray,
+    name: str,
+    index: Optional[pd.Index] = None,
+    width: Optional[int] = None,
+    n_decimals: int = 0,
+) -> pd.Series:
+    # decode_ints straight from the field's bytes. width is the field's width in its layout,
+    # which char_matrix can fall short of when records are cut short.
+    unique_positions, first_records = factorize_byte_rows(char_matrix=char_matrix)
+    return broadcast_ints(
+        unique_positions=unique_positions,
+        unique_char_matrix=char_matrix[first_records],
+        name=name,
+        index=index if index is not None else pd.RangeIndex(len(char_matrix)),
+        width=width,
+        n_decimals=n_decimals,
+    )
+
+
+@instrumented("parse")
+def parse_typed_fields(
+    char_matrix: np.ndarray, layout: List[Field], index: Optional[pd.Index] = None
+) -> pd.DataFrame:
+    # Slices the layout's fields from an (n_records, record_width) matrix of character codes
+    # straight into their final types: "date" and "int" fields are decoded from the bytes
+    # with decode_date_field and decode_int_field, and only the "str" fields are decoded
+    # from latin1, into Arrow string buffers with no Python str per value (see
+    # backends.slice_arrow_field). Fields are done one at a time so only one field's scratch
+    # arrays are alive at once.
+    if index is None:
+        index = pd.RangeIndex(len(char_matrix))
+    record_width = char_matrix.shape[1]
+    fields = {}
+    for field_name, start, end, dtype in layout:
+        width = None if end is None else end - start
+        end = record_width if end is None else min(end, record_width)
+        field_matrix = char_matrix[:, min(start, end) : end]
+        if dtype == "date":
+            fields[field_name] = decode_date_field(
+                char_matrix=field_matrix, name=field_name, index=index
+            )
+        elif dtype == "int":
+            fields[field_name] = decode_int_field(
+                char_matrix=field_matrix, name=field_name, index=index, width=width
+            )
+        else:
+            fields[field_name] = pd.Series(
+                slice_arrow_field(char_matrix=char_matrix, start=start, end=end),
+                dtype=PANDAS_STRING_DTYPE,
+                index=index,
+                name=field_name,
+            )
+    return pd.DataFrame(fields, index=index)
@@ -0,0 +1,235 @@
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from cache import (
+    find_cached_table,
+    get_cache_dir,
+    get_cache_path,
+    read_cached_table,
+    write_cached_table,
+)
+from extractors import iter_data_line_batches, lines_to_char_matrix, slice_fixed_width_fields
+from transformers import TABLES, TableSpec
+
+
+def read_data_lines(file_path: Path) -> List[bytes]:
+    data_lines = []
+    for batch in iter_data_line_batches(file_path=file_path):
+        data_lines.extend(batch)
+    return data_lines
+
+
+def get_line_file_numbers(lines: List[bytes]) -> np.ndarray:
+    # Only each line's leading 8 byte file number is copied, not the whole line
+    file_numbers = np.fromiter((line[:8] for line in lines), dtype="S8", count=len(lines))
+    return file_numbers.astype("U8")
+
+
+def fingerprint_lines(lines: List[bytes]) -> pd.DataFrame:
+    # One fingerprint per file number: the wrapping uint64 sum of the hashes of all of that
+    # file number's records, so it changes if any of its records is added, removed or edited.
+    line_hashes = pd.util.hash_array(np.asarray(lines, dtype=object))
+    codes, file_numbers = pd.factorize(get_line_file_numbers(lines=lines), sort=True)
+    fingerprints = np.zeros(len(file_numbers), dtype=np.uint64)
+    np.add.at(fingerprints, codes, line_hashes)
+    return pd.DataFrame(
+        {
+            "file_number": file_numbers,
+            "fingerprint": fingerprints,
+            "n_rows": np.bincount(codes, minlength=len(file_numbers)),
+        }
+    )
+
+
+def compute_delta(previous_fingerprints: pd.DataFrame, fingerprints: pd.DataFrame) -> pd.DataFrame:
+    merged_df = previous_fingerprints.merge(
+        fingerprints, how="outer", on="file_number", suffixes=("_before", "_after"), indicator=True
+    )
+    merged_df["change"] = np.select(
+        [
+            merged_df["_merge"] == "right_only",
+            merged_df["_merge"] == "left_only",
+            merged_df["fingerprint_before"] != merged_df["fingerprint_after"],
+        ],
+        ["inserted", "deleted", "updated"],
+        default="unchanged",
+    )
+    delta_df = merged_df.loc[merged_df["change"] != "unchanged"]
+    delta_df = delta_df[["file_number", "change", "n_rows_before", "n_rows_after"]]
+    delta_df = delta_df.fillna({"n_rows_before": 0, "n_rows_after": 0})
+    delta_df = delta_df.astype({"n_rows_before": int, "n_rows_after": int})
+    return delta_df.reset_index(drop=True)
+
+
+def transform_lines(lines: List[bytes], table_spec: TableSpec) -> pd.DataFrame:
+    char_matrix = lines_to_char_matrix(lines=lines)
+    table_df = slice_fixed_width_fields(char_matrix=char_matrix, layout=table_spec.layout)
+    if table_spec.convert is not None:
+        table_df = table_spec.convert(table_df)
+    return table_df
+
+
+def apply_delta(
+    table_df: pd.DataFrame, changed_df: pd.DataFrame, delta_df: pd.DataFrame
+) -> pd.DataFrame:
+    # changed_df holds the current records of every inserted and updated file number. Any
+    # rows table_df already has for a file number in the delta are dropped, inserted ones
+    # included, so applying a delta twice gives the same table. Rows stay ordered by file
+    # number, matching the order of the SOS files themselves.
+    file_number_column = table_df.columns[0]
+    kept_df = table_df.loc[~table_df[file_number_column].isin(delta_df["file_number"])]
+    updated_df = pd.concat([kept_df, changed_df], ignore_index=True)
+    return updated_df.sort_values(file_number_column, kind="stable", ignore_index=True)
+
+
+def get_fingerprints_path(table_name: str, cache_dir: Path) -> Path:
+    return cache_dir.joinpath(f"{table_name}.fingerprints")
+
+
+def read_fingerprints(fingerprints_path: Path) -> Tuple[pd.DataFrame, Optional[str]]:
+    # The fingerprints, and the name of the cached table they describe
+    fingerprint_table = feather.read_table(fingerprints_path)
+    metadata = fingerprint_table.schema.metadata or {}
+    source = metadata[b"source"].decode() if b"source" in metadata else None
+    return fingerprint_table.to_pandas(), source
+
+
+def write_fingerprints(fingerprints: pd.DataFrame, source: str, fingerprints_path: Path) -> None:
+    fingerprint_table = pa.Table.from_pandas(fingerprints, preserve_index=False)
+    fingerprint_table = fingerprint_table.replace_schema_metadata(
+        {**fingerprint_table.schema.metadata, b"source": source.encode()}
+    )
+    tmp_path = fingerprints_path.with_name(f"{fingerprints_path.name}.tmp")
+    feather.write_feather(fingerprint_table, tmp_path)
+    tmp_path.replace(fingerprints_path)
+
+
+def get_delta_path(
+    table_name: str, previous_cache_name: str, cache_name: str, cache_dir: Path
+) -> Path:
+    previous_stem, cache_stem = Path(previous_cache_name).stem, Path(cache_name).stem
+    return cache_dir.joinpath(f"{table_name}__{previous_stem}__to__{cache_stem}.delta")
+
+
+def write_delta(
+    delta_df: pd.DataFrame,
+    table_name: str,
+    previous_cache_name: str,
+    cache_name: str,
+    cache_dir: Path,
+) -> None:
+    # Only the latest delta of a table is kept: a consumer that missed a drop has no chain
+    # of deltas to follow and rebuilds from the whole table instead
+    delta_path = get_delta_path(
+        table_name=table_name,
+        previous_cache_name=previous_cache_name,
+        cache_name=cache_name,
+        cache_dir=cache_dir,
+    )
+    tmp_path = delta_path.with_name(f"{delta_path.name}.tmp")
+    feather.write_feather(delta_df, tmp_path)
+    tmp_path.replace(delta_path)
+    for stale_path in cache_dir.glob(f"{table_name}__*.delta"):
+        if stale_path != delta_path:
+            stale_path.unlink()
+
+
+def read_delta(
+    table_name: str, previous_cache_name: str, cache_name: str, cache_dir: Path
+) -> Optional[pd.DataFrame]:
+    # The delta that took the cached table from previous_cache_name to cache_name, as
+    # returned by update_table; None when update_table didn't make that step (e.g. the
+    # table was rebuilt from every record, or has moved on since)
+    if previous_cache_name == cache_name:
+        return pd.DataFrame(
+            {
+                "file_number": pd.Series(dtype=str),
+                "change": pd.Series(dtype=str),
+                "n_rows_before": pd.Series(dtype=int),
+                "n_rows_after": pd.Series(dtype=int),
+            }
+        )
+    delta_path = get_delta_path(
+        table_name=table_name,
+        previous_cache_name=previous_cache_name,
+        cache_name=cache_name,
+        cache_dir=cache_dir,
+    )
+    if not delta_path.is_file():
+        return None
+    return feather.read_feather(delta_path)
+
+
+def update_table(table_name: str, DATA_DIR: Path, cache_dir: Optional[Path] = None) -> pd.DataFrame:
+    # Brings the cached table up to date with the drop in DATA_DIR by re-transforming only
+    # the records of file numbers whose fingerprint changed since the previous drop. Returns
+    # the delta; the updated table itself is written to the cache, and the delta beside it
+    # for read_delta, so that what's derived from the table (the entity graph, the capital
+    # cube) can follow it without ingesting anything themselves. The fingerprints are
+    # only trusted for the cached table they were written with: if that table has since
+    # been replaced (e.g. rebuilt by load_table), the table is rebuilt from every record.
+    if table_name not in TABLES.keys():
+        raise Exception(f"Unknown table_name: {table_name}\n  - options: {list(TABLES)}")
+    table_spec = TABLES[table_name]
+    file_path = DATA_DIR.joinpath(table_spec.file_name)
+    cache_dir = get_cache_dir(DATA_DIR=DATA_DIR, cache_dir=cache_dir)
+    lines = read_data_lines(file_path=file_path)
+    fingerprints = fingerprint_lines(lines=lines)
+    fingerprints_path = get_fingerprints_path(table_name=table_name, cache_dir=cache_dir)
+    previous_cache_path = find_cached_table(table_name=table_name, cache_dir=cache_dir)
+    previous_fingerprints, table_df = fingerprints.iloc[0:0], None
+    if fingerprints_path.is_file() and previous_cache_path is not None:
+        fingerprints_df, source = read_fingerprints(fingerprints_path=fingerprints_path)
+        if source == previous_cache_path.name:
+            previous_fingerprints = fingerprints_df
+            table_df = read_cached_table(cache_path=previous_cache_path)
+        else:
+            print(f"Fingerprints don't match the cached {table_name}; rebuilding it")
+    delta_df = compute_delta(previous_fingerprints=previous_fingerprints, fingerprints=fingerprints)
+    print(f"Changed file numbers in {table_name}: {delta_df['change'].value_counts().to_dict()}")
+    cache_path = get_cache_path(table_name=table_name, file_path=file_path, cache_dir=cache_dir)
+    if len(delta_df) == 0 and cache_path == previous_cache_path:
+        return delta_df
+    changed_file_numbers = delta_df.loc[delta_df["change"] != "deleted", "file_number"]
+    is_changed_line = pd.Index(get_line_file_numbers(lines=lines)).isin(changed_file_numbers)
+    changed_lines = [line for line, is_changed in zip(lines, is_changed_line) if is_changed]
+    changed_df = transform_lines(lines=changed_lines, table_spec=table_spec)
+    if table_df is None:
+        write_cached_table(df=changed_df, cache_path=cache_path)
+    else:
+        table_df = apply_delta(table_df=table_df, changed_df=changed_df, delta_df=delta_df)
+        write_cached_table(df=table_df, cache_path=cache_path)
+        write_delta(
+            delta_df=delta_df,
+            table_name=table_name,
+            previous_cache_name=previous_cache_path.name,
+            cache_name=cache_path.name,
+            cache_dir=cache_dir,
+        )
+    write_fingerprints(
+        fingerprints=fingerprints, source=cache_path.name, fingerprints_path=fingerprints_path
+    )
+    return delta_df
+
+
+def update_tables(
+    DATA_DIR: Path, cache_dir: Optional[Path] = None, table_names: Optional[List[str]] = None
+) -> Dict[str, pd.DataFrame]:
+    # The ingestion step for a new drop: update_table for each of table_names (default:
+    # every table whose file is in DATA_DIR). Run it before updating the entity graph or
+    # the capital cube, which follow the deltas it stores.
+    if table_names is None:
+        table_names = [
+            table_name
+            for table_name, table_spec in TABLES.items()
+            if DATA_DIR.joinpath(table_spec.file_name).is_file()
+        ]
+    return {
+        table_name: update_table(table_name=table_name, DATA_DIR=DATA_DIR, cache_dir=cache_dir)
+        for table_name in table_names
+    }
@@ -1,10 +1,34 @@
+import os
 from pathlib import Path
-from typing import List
+import shutil
+from typing import Iterator, List, Optional, Sequence
 import zipfile
 
+import numpy as np
 import pandas as pd
 
-
+from backends import get_backend, slice_arrow_fields
+from instrumentation import instrumented
+from layouts import (
+    Field,
+    CORP_MASTER_LAYOUT,
+    CORP_NAME_LAYOUT,
+    CORP_AGENT_LAYOUT,
+    CORP_ANNUAL_REPORTS_LAYOUT,
+    CORP_ASSUMED_OLD_NAME_LAYOUT,
+    CORP_STOCK_LAYOUT,
+    CORP_OTHER_LAYOUT,
+    LL_ASSUMED_NAME_LAYOUT,
+    LL_ANNUAL_REPORTS_LAYOUT,
+    LL_SERIES_NAMES_LAYOUT,
+    LL_MANAGER_LAYOUT,
+    LL_MASTER_LAYOUT,
+    LL_NAME_LAYOUT,
+    LL_OLD_NAME_LAYOUT,
+)
+
+
+@instrumented("read", file_arg="file_path")
 def read_file_lines(file_path: Path) -> List:
     if file_path.is_file():
         file_name = file_path.name
@@ -17,21 +41,26 @@ def read_file_lines(file_path: Path) -> List:
 
 
 def check__is_last_line_a_count(last_line: str, data_lines: List) -> bool:
+    return check__is_last_line_a_count_of(last_line=last_line, n_data_lines=len(data_lines))
+
+
+def check__is_last_line_a_count_of(last_line: str, n_data_lines: int) -> bool:
     if "END OF FILE RECORD COUNT" in last_line.upper():
         n_records = last_line.split(" ")[-1]
         try:
             n_records = int(n_records)
         except:
             raise Exception(f"Selected substring is not a valid count")
-        if len(data_lines) == n_records:
+        if n_data_lines == n_records:
             print(f"Expected number of records: {n_records:>8}")
-            print(f"Found number of records:    {len(data_lines):>8}")
+            print(f"Found number of records:    {n_data_lines:>8}")
         else:
             raise Exception("Observed number of records doesn't match expectation.")
         return True
     return False
 
 
+@instrumented("decode")
 def extract_data_from_lines(lines: List) -> pd.DataFrame:
     decoded_lines = [line.decode(encoding="latin1").replace("\r\n", "") for line in lines]
     file_metadata = decoded_lines[0]
@@ -44,202 +73,311 @@ def extract_data_from_lines(lines: List) -> pd.DataFrame:
     return data_df
 
 
+def lines_to_char_matrix(lines: Sequence) -> np.ndarray:
+    # Packs decoded str lines (or raw latin1 bytes lines) into an (n_records, record_width)
+    # array of character codes. Short records are padded with NUL codes, which numpy drops
+    # again when a field slice is viewed back as a string.
+    line_arr = np.asarray(lines)
+    if line_arr.dtype.kind == "O":
+        line_arr = line_arr.astype(str)
+    if len(line_arr) == 0:
+        return np.zeros((0, 0), dtype=np.uint32)
+    if line_arr.dtype.kind == "S":
+        # latin1 maps every byte to the code point with the same value
+        return line_arr.view(np.uint8).reshape(len(line_arr), -1).astype(np.uint32)
+    return line_arr.view(np.uint32).reshape(len(line_arr), -1)
+
+
+def slice_field(char_matrix: np.ndarray, start: int, end: Optional[int]) -> np.ndarray:
+    record_width = char_matrix.shape[1]
+    end = record_width if end is None else min(end, record_width)
+    start = min(start, end)
+    if end == start:
+        return np.full(char_matrix.shape[0], "", dtype="U1")
+    field_codes = np.ascontiguousarray(char_matrix[:, start:end], dtype=np.uint32)
+    return field_codes.view(f"U{end - start}").ravel()
+
+
+def slice_fixed_width_fields(
+    char_matrix: np.ndarray, layout: List[Field], index: Optional[pd.Index] = None
+) -> pd.DataFrame:
+    if get_backend() == "arrow":
+        return slice_arrow_fields(char_matrix=char_matrix, layout=layout, index=index)
+    fields = {
+        field_name: slice_field(char_matrix=char_matrix, start=start, end=end)
+        for field_name, start, end, _ in layout
+    }
+    return pd.DataFrame(fields, index=index)
+
+
+@instrumented("parse")
+def parse_fixed_width_data(line_df: pd.DataFrame, layout: List[Field]) -> pd.DataFrame:
+    char_matrix = lines_to_char_matrix(lines=line_df["line"])
+    return slice_fixed_width_fields(char_matrix=char_matrix, layout=layout, index=line_df.index)
+
+
+def iter_file_line_chunks(file_path: Path, chunk_size: int = 2**22) -> Iterator[List[bytes]]:
+    # Reads the zip member chunk_size decompressed bytes at a time and yields the complete
+    # lines in each chunk (line terminators removed), carrying partial lines forward.
+    if not file_path.is_file():
+        raise Exception(f"No file found at the entered file_path\n  - {file_path}")
+    with zipfile.ZipFile(file_path) as zf:
+        with zf.open(file_path.name.replace(".zip", ".txt"), "r") as f:
+            remainder = b""
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                lines = (remainder + chunk).split(b"\n")
+                remainder = lines.pop()
+                yield [line.removesuffix(b"\r") for line in lines]
+            if remainder:
+                yield [remainder.removesuffix(b"\r")]
+
+
+def iter_data_line_batches(
+    file_path: Path, batch_size: int = 100_000, chunk_size: int = 2**22
+) -> Iterator[List[bytes]]:
+    # Streaming counterpart of read_file_lines + extract_data_from_lines. Yields raw data
+    # lines in batches of batch_size; the metadata header is reported when it's read and
+    # the record count trailer is validated once the stream is exhausted.
+    file_metadata = None
+    last_line = None
+    batch = []
+    n_data_lines = 0
+    for lines in iter_file_line_chunks(file_path=file_path, chunk_size=chunk_size):
+        # chunks shorter than a line end in no complete lines
+        if len(lines) == 0:
+            continue
+        if file_metadata is None:
+            file_metadata = lines[0].decode(encoding="latin1")
+            print(f"Data set metadata: {file_metadata}")
+            lines = lines[1:]
+            if len(lines) == 0:
+                continue
+        if last_line is not None:
+            batch.append(last_line)
+        batch.extend(lines[:-1])
+        last_line = lines[-1]
+        n_full_lines = len(batch) - len(batch) % batch_size
+        for batch_start in range(0, n_full_lines, batch_size):
+            yield batch[batch_start : batch_start + batch_size]
+        n_data_lines += n_full_lines
+        batch = batch[n_full_lines:]
+    if last_line is not None:
+        n_data_lines += len(batch)
+        if not check__is_last_line_a_count_of(
+            last_line=last_line.decode(encoding="latin1"), n_data_lines=n_data_lines
+        ):
+            batch.append(last_line)
+    if len(batch) > 0:
+        yield batch
+
+
+def iter_parsed_batches(
+    file_path: Path, layout: List[Field], batch_size: int = 100_000, chunk_size: int = 2**22
+) -> Iterator[pd.DataFrame]:
+    # Yields parsed DataFrame batches with a running index, so pd.concat() of all batches
+    # matches parsing the whole file at once while memory stays bounded by batch_size.
+    n_parsed = 0
+    for batch in iter_data_line_batches(
+        file_path=file_path, batch_size=batch_size, chunk_size=chunk_size
+    ):
+        char_matrix = lines_to_char_matrix(lines=batch)
+        batch_index = pd.RangeIndex(n_parsed, n_parsed + len(batch))
+        yield slice_fixed_width_fields(char_matrix=char_matrix, layout=layout, index=batch_index)
+        n_parsed += len(batch)
+
+
+def unpack_member(file_path: Path, raw_dir: Optional[Path] = None) -> Path:
+    # Decompresses the zip member once into raw_dir (by default a raw/ folder beside the
+    # zip). The raw file is named by the member's CRC, so a new data drop is unpacked again.
+    if not file_path.is_file():
+        raise Exception(f"No file found at the entered file_path\n  - {file_path}")
+    if raw_dir is None:
+        raw_dir = file_path.parent.joinpath("raw")
+    raw_dir.mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(file_path) as zf:
+        member_info = zf.getinfo(file_path.name.replace(".zip", ".txt"))
+        raw_path = raw_dir.joinpath(f"{file_path.stem}__{member_info.CRC:08x}.txt")
+        if not raw_path.is_file():
+            tmp_path = raw_path.with_suffix(".txt.tmp")
+            with zf.open(member_info, "r") as f, open(tmp_path, "wb") as raw_f:
+                shutil.copyfileobj(f, raw_f, length=2**22)
+            os.replace(tmp_path, raw_path)
+    for stale_path in raw_dir.glob(f"{file_path.stem}__*.txt"):
+        if stale_path != raw_path:
+            stale_path.unlink()
+    return raw_path
+
+
+def find_line_bounds(raw: np.ndarray, chunk_size: int = 2**26) -> List[np.ndarray]:
+    # Start and end (line terminator excluded) offsets of every line in raw, found in chunks
+    # so the scan never needs more than chunk_size bytes of scratch memory.
+    line_ends = np.concatenate(
+        [np.array([], dtype=np.int64)]
+        + [
+            np.flatnonzero(raw[chunk_start : chunk_start + chunk_size] == ord("\n")) + chunk_start
+            for chunk_start in range(0, len(raw), chunk_size)
+        ]
+    )
+    if len(line_ends) == 0 or line_ends[-1] != len(raw) - 1:
+        line_ends = np.append(line_ends, len(raw))
+    line_starts = np.concatenate([[0], line_ends[:-1] + 1])
+    has_cr = (line_ends > line_starts) & (raw[np.maximum(line_ends - 1, 0)] == ord("\r"))
+    return [line_starts, line_ends - has_cr]
+
+
+def find_record_bounds(raw: np.ndarray) -> List[np.ndarray]:
+    # find_line_bounds for the data records in the raw bytes of an SOS file: the metadata
+    # header is reported and skipped, and the record count trailer validated and dropped
+    if len(raw) == 0:
+        return [np.array([], dtype=np.int64), np.array([], dtype=np.int64)]
+    line_starts, line_ends = find_line_bounds(raw=raw)
+    file_metadata = raw[line_starts[0] : line_ends[0]].tobytes().decode(encoding="latin1")
+    print(f"Data set metadata: {file_metadata}")
+    record_starts, record_ends = line_starts[1:], line_ends[1:]
+    if len(record_starts) > 0:
+        last_line = raw[record_starts[-1] : record_ends[-1]].tobytes().decode(encoding="latin1")
+        if check__is_last_line_a_count_of(last_line=last_line, n_data_lines=len(record_starts) - 1):
+            record_starts, record_ends = record_starts[:-1], record_ends[:-1]
+    return [record_starts, record_ends]
+
+
+def get_data_records(raw: np.ndarray) -> np.ndarray:
+    # (n_records, record_width) uint8 matrix of character codes for the data records in the
+    # raw bytes of an SOS file (see gather_records)
+    record_starts, record_ends = find_record_bounds(raw=raw)
+    return gather_records(raw=raw, record_starts=record_starts, record_ends=record_ends)
+
+
+def gather_records(
+    raw: np.ndarray, record_starts: np.ndarray, record_ends: np.ndarray
+) -> np.ndarray:
+    # (n_records, record_width) uint8 matrix of the records at the given offsets in raw.
+    # When every record has the same length it's a strided view onto raw, so nothing is
+    # copied. Ragged records are gathered into a NUL-padded matrix a column at a time.
+    n_records = len(record_starts)
+    if n_records == 0:
+        return np.zeros((0, 0), dtype=np.uint8)
+    record_lengths = record_ends - record_starts
+    record_width = int(record_lengths.max())
+    record_stride = int(record_starts[1] - record_starts[0]) if n_records > 1 else record_width
+    is_fixed_width = (record_lengths == record_width).all()
+    if is_fixed_width and (np.diff(record_starts) == record_stride).all():
+        return np.lib.stride_tricks.as_strided(
+            raw[record_starts[0] :],
+            shape=(n_records, record_width),
+            strides=(record_stride, 1),
+            writeable=False,
+        )
+    char_matrix = np.zeros((n_records, record_width), dtype=np.uint8)
+    for position in range(record_width):
+        is_in_record = record_lengths > position
+        char_matrix[is_in_record, position] = raw[record_starts[is_in_record] + position]
+    return char_matrix
+
+
+def map_data_records(raw_path: Path) -> np.ndarray:
+    # get_data_records for an unpacked SOS file, read through a read-only memory map. Fixed
+    # width records are a view straight onto the mapped pages, which processes mapping the
+    # same file share.
+    if raw_path.stat().st_size == 0:
+        return np.zeros((0, 0), dtype=np.uint8)
+    return get_data_records(raw=np.memmap(raw_path, dtype=np.uint8, mode="r"))
+
+
+def map_record_range(raw_path: Path, offset: int, length: int) -> np.ndarray:
+    # gather_records for the data lines in bytes [offset, offset + length) of an unpacked SOS
+    # file, a range of whole lines (e.g. a shard from split_member_into_shards) mapped on its
+    # own, so the rest of the file is never read
+    if length == 0:
+        return np.zeros((0, 0), dtype=np.uint8)
+    raw = np.memmap(raw_path, dtype=np.uint8, mode="r", offset=offset, shape=(length,))
+    record_starts, record_ends = find_line_bounds(raw=raw)
+    return gather_records(raw=raw, record_starts=record_starts, record_ends=record_ends)
+
+
+@instrumented("read", file_arg="file_path")
+def read_data_records(file_path: Path, chunk_size: int = 2**22) -> np.ndarray:
+    # get_data_records for the zip member decompressed into memory. The records are a view
+    # onto the one decompressed buffer, so no line, str or bytes object is made per record.
+    if not file_path.is_file():
+        raise Exception(f"No file found at the entered file_path\n  - {file_path}")
+    with zipfile.ZipFile(file_path) as zf:
+        member_info = zf.getinfo(file_path.name.replace(".zip", ".txt"))
+        raw = np.empty(member_info.file_size, dtype=np.uint8)
+        with zf.open(member_info, "r") as f:
+            # read in chunks straight into raw so the member is never held twice
+            n_read = 0
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                raw[n_read : n_read + len(chunk)] = np.frombuffer(chunk, dtype=np.uint8)
+                n_read += len(chunk)
+    return get_data_records(raw=raw[:n_read])
+
+
+@instrumented("parse", file_arg="file_path")
+def parse_mapped_file(
+    file_path: Path, layout: List[Field], raw_dir: Optional[Path] = None
+) -> pd.DataFrame:
+    # Same result as read_file_lines -> extract_data_from_lines -> parse_*_data, without
+    # creating a Python object per record.
+    raw_path = unpack_member(file_path=file_path, raw_dir=raw_dir)
+    char_matrix = map_data_records(raw_path=raw_path)
+    return slice_fixed_width_fields(char_matrix=char_matrix, layout=layout)
+
+
 def parse_corp_master_data(line_df: pd.DataFrame) -> pd.DataFrame:
-    line_df["corp_file_number"] = line_df["line"].str[0:8]
-    line_df["corp_incorp_date"] = line_df["line"].str[8:16]
-    line_df["corp_extended_date"] = line_df["line"].str[16:24]
-    line_df["corp_state_code"] = line_df["line"].str[24:26]
-    line_df["corp_corp_intent"] = line_df["line"].str[26:29]
-    line_df["corp_status"] = line_df["line"].str[29:31]
-    line_df["corp_type_corp"] = line_df["line"].str[31:32]
-    line_df["corp_trans_date"] = line_df["line"].str[32:40]
-    line_df["corp_pres_name_addr"] = line_df["line"].str[40:100]
-    line_df["corp_sec_name_addr"] = line_df["line"].str[100:160]
-    corp_master_df = line_df.drop(columns=["line"])
-    return corp_master_df
+    return parse_fixed_width_data(line_df=line_df, layout=CORP_MASTER_LAYOUT)
 
 
 def parse_corp_name_data(line_df: pd.DataFrame) -> pd.DataFrame:
-    line_df["corp_file_number"] = line_df["line"].str[0:8]
-    line_df["corp_name"] = line_df["line"].str[8:]
-    corp_name_df = line_df.drop(columns=["line"])
-    return corp_name_df
+    return parse_fixed_width_data(line_df=line_df, layout=CORP_NAME_LAYOUT)
 
 
 def parse_corp_agent_data(line_df: pd.DataFrame) -> pd.DataFrame:
-    line_df["corp_file_number"] = line_df["line"].str[0:8]
-    line_df["corp_agent_name"] = line_df["line"].str[8:68]
-    line_df["corp_agent_street"] = line_df["line"].str[68:113]
-    line_df["corp_agent_city"] = line_df["line"].str[113:143]
-    line_df["corp_agent_change_date"] = line_df["line"].str[143:151]
-    line_df["corp_agent_code"] = line_df["line"].str[151:152]
-    line_df["corp_agent_zip"] = line_df["line"].str[152:161]
-    line_df["corp_agent_county_code"] = line_df["line"].str[161:164]
-    corp_agent_df = line_df.drop(columns=["line"])
-    return corp_agent_df
+    return parse_fixed_width_data(line_df=line_df, layout=CORP_AGENT_LAYOUT)
 
 
 def parse_corp_annual_reports_data(line_df: pd.DataFrame) -> pd.DataFrame:
-    line_df["corp_file_number"] = line_df["line"].str[0:8]
-    line_df["corp_cr_factor"] = line_df["line"].str[8:15]
-    line_df["corp_cr_paid_amount"] = line_df["line"].str[15:24]
-    line_df["corp_cr_ar_cap"] = line_df["line"].str[24:35]
-    line_df["corp_cr_del_run_date"] = line_df["line"].str[35:43]
-    line_df["corp_cr_run_date"] = line_df["line"].str[43:51]
-    line_df["corp_cr_paid_batch_no"] = line_df["line"].str[51:55]
-    line_df["corp_cr_paid_batch_yr"] = line_df["line"].str[55:59]
-    line_df["corp_cr_paid_date"] = line_df["line"].str[59:67]
-    line_df["corp_pv_factor"] = line_df["line"].str[67:74]
-    line_df["corp_pv_paid_amount"] = line_df["line"].str[74:83]
-    line_df["corp_pv_cap"] = line_df["line"].str[83:94]
-    line_df["corp_pv_del_run_date"] = line_df["line"].str[94:102]
-    line_df["corp_pv_run_date"] = line_df["line"].str[102:110]
-    line_df["corp_pv_paid_batch_no"] = line_df["line"].str[110:114]
-    line_df["corp_pv_paid_batch_yr"] = line_df["line"].str[114:118]
-    line_df["corp_pv_paid_date"] = line_df["line"].str[118:126]
-    corp_annual_reports_df = line_df.drop(columns=["line"])
-    return corp_annual_reports_df
+    return parse_fixed_width_data(line_df=line_df, layout=CORP_ANNUAL_REPORTS_LAYOUT)
 
 
 def parse_corp_assumed_old_name_data(line_df: pd.DataFrame) -> pd.DataFrame:
-    line_df["corp_file_number"] = line_df["line"].str[0:8]
-    line_df["corp_date_cancel"] = line_df["line"].str[8:16]
-    line_df["corp_assumed_curr_date"] = line_df["line"].str[16:24]
-    line_df["corp_assumed_old_ind"] = line_df["line"].str[24:25]
-    line_df["corp_assumed_old_date"] = line_df["line"].str[25:33]
-    line_df["corp_assumed_old_name"] = line_df["line"].str[33:]
-    corp_assumed_old_name_df = line_df.drop(columns=["line"])
-    return corp_assumed_old_name_df
+    return parse_fixed_width_data(line_df=line_df, layout=CORP_ASSUMED_OLD_NAME_LAYOUT)
 
 
 def parse_corp_stock_data(line_df: pd.DataFrame) -> pd.DataFrame:
-    line_df["corp_file_number"] = line_df["line"].str[0:8]
-    line_df["corp_stock_class"] = line_df["line"].str[8:33]
-    line_df["corp_stock_series"] = line_df["line"].str[33:58]
-    line_df["corp_voting_rights"] = line_df["line"].str[58:59]
-    line_df["corp_authorized_shares"] = line_df["line"].str[59:72]
-    line_df["corp_issued_shares"] = line_df["line"].str[72:88]
-    line_df["corp_par_value"] = line_df["line"].str[88:101]
-    corp_stock_df = line_df.drop(columns=["line"])
-    return corp_stock_df
+    return parse_fixed_width_data(line_df=line_df, layout=CORP_STOCK_LAYOUT)
 
 
 def parse_corp_other_data(line_df: pd.DataFrame) -> pd.DataFrame:
-    line_df["corp_oth_file_number"] = line_df["line"].str[0:8]
-    line_df["corp_oth_hold_prorate"] = line_df["line"].str[8:9]
-    line_df["corp_oth_regulated_ind"] = line_df["line"].str[9:10]
-    line_df["corp_oth_rec_name_length_ind"] = line_df["line"].str[10:11]
-    line_df["corp_oth_records_destroyed"] = line_df["line"].str[11:12]
-    line_df["corp_oth_cap_date"] = line_df["line"].str[12:20]
-    line_df["corp_oth_inc_letter_ind"] = line_df["line"].str[20:21]
-    line_df["corp_oth_abinitio_ind"] = line_df["line"].str[21:22]
-    line_df["corp_oth_assume_old_ind"] = line_df["line"].str[22:23]
-    line_df["corp_oth_duration_date"] = line_df["line"].str[23:31]
-    line_df["corp_oth_total_cap"] = line_df["line"].str[31:44]
-    line_df["corp_oth_tax_cap"] = line_df["line"].str[44:57]
-    line_df["corp_oth_ill_cap"] = line_df["line"].str[57:68]
-    line_df["corp_oth_cr_new_ill_cap"] = line_df["line"].str[68:79]
-    line_df["corp_oth_pv_ill_cap"] = line_df["line"].str[79:90]
-    line_df["corp_oth_fiscal_year"] = line_df["line"].str[90:98]
-    line_df["corp_oth_sect_code"] = line_df["line"].str[98:102]
-    line_df["corp_oth_stock_date"] = line_df["line"].str[102:110]
-    line_df["corp_oth_revenue_ind"] = line_df["line"].str[110:111]
-    line_df["corp_oth_surv_no"] = line_df["line"].str[111:119]
-    line_df["corp_oth_date_last_chg"] = line_df["line"].str[119:127]
-    corp_other_df = line_df.drop(columns=["line"])
-    return corp_other_df
+    return parse_fixed_width_data(line_df=line_df, layout=CORP_OTHER_LAYOUT)
 
 
 def parse_ll_assumed_name_data(line_df: pd.DataFrame) -> pd.DataFrame:
-    line_df["ll_file_number"] = line_df["line"].str[0:8]
-    line_df["ll_assumed_adopt_date"] = line_df["line"].str[8:16]
-    line_df["ll_assumed_can_date"] = line_df["line"].str[16:24]
-    line_df["ll_assumed_can_code"] = line_df["line"].str[24:25]
-    line_df["ll_assumed_renew_year"] = line_df["line"].str[25:29]
-    line_df["ll_assumed_renew_date"] = line_df["line"].str[29:37]
-    line_df["ll_assumed_ind"] = line_df["line"].str[37:38]
-    line_df["ll_llc_name"] = line_df["line"].str[38:278]
-    line_df["ll_series_nbr"] = line_df["line"].str[278:281]
-    ll_assumed_name_df = line_df.drop(columns=["line"])
-    return ll_assumed_name_df
+    return parse_fixed_width_data(line_df=line_df, layout=LL_ASSUMED_NAME_LAYOUT)
 
 
 def parse_ll_annual_reports_data(line_df: pd.DataFrame) -> pd.DataFrame:
-    line_df["ll_file_number"] = line_df["line"].str[0:8]
-    line_df["ll_cur_mail_date"] = line_df["line"].str[8:16]
-    line_df["ll_cur_file_date"] = line_df["line"].str[16:24]
-    line_df["ll_cur_deliq_date"] = line_df["line"].str[24:32]
-    line_df["ll_cur_paid_amt"] = line_df["line"].str[32:37]
-    line_df["ll_cur_year_due"] = line_df["line"].str[37:41]
-    line_df["ll_pv_mail_date"] = line_df["line"].str[41:49]
-    line_df["ll_pv_file_date"] = line_df["line"].str[49:57]
-    line_df["ll_pv_deliq_date"] = line_df["line"].str[57:65]
-    line_df["ll_pv_paid_amt"] = line_df["line"].str[65:70]
-    line_df["ll_pv_year_due"] = line_df["line"].str[70:74]
-    ll_annual_reports_df = line_df.drop(columns=["line"])
-    return ll_annual_reports_df
+    return parse_fixed_width_data(line_df=line_df, layout=LL_ANNUAL_REPORTS_LAYOUT)
 
 
 def parse_ll_series_names_data(line_df: pd.DataFrame) -> pd.DataFrame:
-    line_df["ll_file_number"] = line_df["line"].str[0:8]
-    line_df["ll_series_number"] = line_df["line"].str[8:11]
-    line_df["ll_series_status"] = line_df["line"].str[11:13]
-    line_df["ll_status_date"] = line_df["line"].str[13:21]
-    line_df["ll_begin_date"] = line_df["line"].str[21:29]
-    line_df["ll_dissolution_date"] = line_df["line"].str[29:37]
-    line_df["ll_series_name"] = line_df["line"].str[37:277]
-    ll_series_names_df = line_df.drop(columns=["line"])
-    return ll_series_names_df
+    return parse_fixed_width_data(line_df=line_df, layout=LL_SERIES_NAMES_LAYOUT)
 
 
 def parse_ll_manager_data(line_df: pd.DataFrame) -> pd.DataFrame:
-    line_df["ll_file_number"] = line_df["line"].str[0:8]
-    line_df["ll_mm_name"] = line_df["line"].str[8:68]
-    line_df["ll_mm_street"] = line_df["line"].str[68:113]
-    line_df["ll_mm_city"] = line_df["line"].str[113:143]
-    line_df["ll_mm_juris"] = line_df["line"].str[143:145]
-    line_df["ll_mm_zip"] = line_df["line"].str[145:154]
-    line_df["ll_mm_file_date"] = line_df["line"].str[154:162]
-    line_df["ll_mm_type_code"] = line_df["line"].str[162:163]
-    ll_manager_df = line_df.drop(columns=["line"])
-    return ll_manager_df
+    return parse_fixed_width_data(line_df=line_df, layout=LL_MANAGER_LAYOUT)
 
 
 def parse_ll_master_data(line_df: pd.DataFrame) -> pd.DataFrame:
-    line_df["ll_file_number"] = line_df["line"].str[0:8]
-    line_df["ll_purpose_code"] = line_df["line"].str[8:14]
-    line_df["ll_status_code"] = line_df["line"].str[14:16]
-    line_df["ll_status_date"] = line_df["line"].str[16:24]
-    line_df["ll_organized_date"] = line_df["line"].str[24:32]
-    line_df["ll_dissolution_date"] = line_df["line"].str[32:40]
-    line_df["ll_management_type"] = line_df["line"].str[40:41]
-    line_df["ll_juris_organized"] = line_df["line"].str[41:43]
-    line_df["ll_records_off_street"] = line_df["line"].str[43:88]
-    line_df["ll_records_off_city"] = line_df["line"].str[88:118]
-    line_df["ll_records_off_zip"] = line_df["line"].str[118:127]
-    line_df["ll_records_off_juris"] = line_df["line"].str[127:129]
-    line_df["ll_assumed_ind"] = line_df["line"].str[129:130]
-    line_df["ll_old_ind"] = line_df["line"].str[130:131]
-    line_df["ll_provisions_ind"] = line_df["line"].str[131:132]
-    line_df["ll_opt_ind"] = line_df["line"].str[132:133]
-    line_df["ll_series_ind"] = line_df["line"].str[133:134]
-    line_df["ll_uap_ind"] = line_df["line"].str[134:135]
-    line_df["ll_l3c_ind"] = line_df["line"].str[135:136]
-    ll_master_df = line_df.drop(columns=["line"])
-    return ll_master_df
+    return parse_fixed_width_data(line_df=line_df, layout=LL_MASTER_LAYOUT)
 
 
 def parse_ll_name_data(line_df: pd.DataFrame) -> pd.DataFrame:
-    line_df["ll_file_number"] = line_df["line"].str[0:8]
-    line_df["ll_name"] = line_df["line"].str[8:]
-    ll_name_df = line_df.drop(columns=["line"])
-    return ll_name_df
+    return parse_fixed_width_data(line_df=line_df, layout=LL_NAME_LAYOUT)
 
 
 def parse_ll_old_name_data(line_df: pd.DataFrame) -> pd.DataFrame:
-    line_df["ll_file_number"] = line_df["line"].str[0:8]
-    line_df["ll_old_date_filed"] = line_df["line"].str[8:16]
-    line_df["ll_llc_name"] = line_df["line"].str[16:136]
-    line_df["ll_series_nbr"] = line_df["line"].str[136:139]
-    ll_old_name_df = line_df.drop(columns=["line"])
-    return ll_old_name_df
+    return parse_fixed_width_data(line_df=line_df, layout=LL_OLD_NAME_LAYOUT)
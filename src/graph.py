@@ -0,0 +1,363 @@
+import hashlib
+from pathlib import Path
+import shutil
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+
+from addresses import normalize_streets, split_zips
+from cache import build_cached_table, get_cache_dir, get_cache_path, read_cached_table
+from deltas import read_delta
+from layouts import LAYOUT_VERSION
+from search import normalize_names, to_offsets
+from transformers import TABLES
+
+# table_name: (entity_type, name_column, street_column, zip_column) for every table linking
+# entities to the people and companies acting for them
+GRAPH_SOURCES = {
+    "corp_agent": ("corp", "corp_agent_name", "corp_agent_street", "corp_agent_zip"),
+    "ll_manager": ("llc", "ll_mm_name", "ll_mm_street", "ll_mm_zip"),
+}
+
+# Bumped whenever the edges derived from a table change, so older edges and graphs are
+# rebuilt rather than reused
+GRAPH_VERSION = 3
+
+
+class EntityGraph(NamedTuple):
+    # sorted node keys, "{node_type}:{key}", where node_type is corp or llc for entities,
+    # party for an agent or manager identity (name, street, zip) and address for a street
+    # and zip; a node's id is its position
+    nodes: np.ndarray
+    # CSR adjacency: the neighbors of node i are neighbor_ids[offsets[i] : offsets[i + 1]]
+    offsets: np.ndarray
+    neighbor_ids: np.ndarray
+    # connected component id of every node, and the nodes of component c at
+    # component_node_ids[component_offsets[c] : component_offsets[c + 1]]
+    components: np.ndarray
+    component_offsets: np.ndarray
+    component_node_ids: np.ndarray
+
+
+def get_table_edges(table_df: pd.DataFrame, table_name: str) -> pd.DataFrame:
+    # One (entity, node) edge per record to its party and one to its address. Records
+    # without a name get no party edge and records without a street no address edge.
+    entity_type, name_column, street_column, zip_column = GRAPH_SOURCES[table_name]
+    file_numbers = table_df.iloc[:, 0].to_numpy(dtype=object)
+    names = normalize_names(table_df[name_column].astype(object)).to_numpy(dtype=object)
+    streets = normalize_streets(table_df[street_column].astype(object)).to_numpy(dtype=object)
+    zips = split_zips(table_df[zip_column].astype(object))[0].to_numpy(dtype=object)
+    entities = f"{entity_type}:" + file_numbers
+    addresses = streets + "|" + zips
+    has_name, has_street = names != "", streets != ""
+    edge_df = pd.DataFrame(
+        {
+            "file_number": np.concatenate([file_numbers[has_name], file_numbers[has_street]]),
+            "entity": np.concatenate([entities[has_name], entities[has_street]]),
+            "node": np.concatenate(
+                [
+                    "party:" + names[has_name] + "|" + addresses[has_name],
+                    "address:" + addresses[has_street],
+                ]
+            ),
+        }
+    )
+    return edge_df.drop_duplicates(["entity", "node"], ignore_index=True)
+
+
+def get_edges_path(table_name: str, cache_dir: Path) -> Path:
+    return cache_dir.joinpath(f"{table_name}.edges")
+
+
+def get_edges_source(cache_path: Path) -> str:
+    return f"{cache_path.name}:v{GRAPH_VERSION}"
+
+
+def get_edges_cache_name(source: Optional[str]) -> Optional[str]:
+    # The name of the cached table edges with this source were taken from, if they're of
+    # the current GRAPH_VERSION
+    if source is None or not source.endswith(f":v{GRAPH_VERSION}"):
+        return None
+    return source.removesuffix(f":v{GRAPH_VERSION}")
+
+
+def read_edges(edges_path: Path) -> Tuple[pd.DataFrame, str]:
+    # The edges, and the cached table and GRAPH_VERSION they were taken from
+    edge_table = feather.read_table(edges_path)
+    return edge_table.to_pandas(), edge_table.schema.metadata[b"source"].decode()
+
+
+def write_edges(edge_df: pd.DataFrame, source: str, edges_path: Path) -> None:
+    edge_table = pa.Table.from_pandas(edge_df, preserve_index=False)
+    edge_table = edge_table.replace_schema_metadata({"source": source})
+    tmp_path = edges_path.with_suffix(".edges.tmp")
+    feather.write_feather(edge_table, tmp_path)
+    tmp_path.replace(edges_path)
+
+
+def update_table_edges(table_name: str, DATA_DIR: Path, cache_dir: Path) -> pd.DataFrame:
+    # Brings the table's edges up to date with the table cached for the drop in DATA_DIR.
+    # When the edges were taken from the table that update_table last stepped from, only
+    # the file numbers in its delta (see read_delta) get their edges recomputed; otherwise
+    # they're taken from the whole table. New drops are ingested by update_tables, not here.
+    cache_path = build_cached_table(table_name=table_name, DATA_DIR=DATA_DIR, cache_dir=cache_dir)
+    edges_path = get_edges_path(table_name=table_name, cache_dir=cache_dir)
+    edge_df, source = None, None
+    if edges_path.is_file():
+        edge_df, source = read_edges(edges_path=edges_path)
+    if source == get_edges_source(cache_path=cache_path):
+        return edge_df
+    table_df = read_cached_table(cache_path=cache_path)
+    previous_cache_name = get_edges_cache_name(source=source)
+    delta_df = None
+    if previous_cache_name is not None:
+        delta_df = read_delta(
+            table_name=table_name,
+            previous_cache_name=previous_cache_name,
+            cache_name=cache_path.name,
+            cache_dir=cache_dir,
+        )
+    if delta_df is not None:
+        changed_file_numbers = pd.Index(delta_df["file_number"])
+        edge_df = edge_df.loc[~pd.Index(edge_df["file_number"]).isin(changed_file_numbers)]
+        changed_df = table_df.loc[pd.Index(table_df.iloc[:, 0]).isin(changed_file_numbers)]
+        changed_edge_df = get_table_edges(table_df=changed_df, table_name=table_name)
+        edge_df = pd.concat([edge_df, changed_edge_df], ignore_index=True)
+        print(f"Recomputed the {table_name} edges of {len(delta_df)} changed file numbers")
+    else:
+        edge_df = get_table_edges(table_df=table_df, table_name=table_name)
+    write_edges(
+        edge_df=edge_df, source=get_edges_source(cache_path=cache_path), edges_path=edges_path
+    )
+    return edge_df
+
+
+def label_components(offsets: np.ndarray, neighbor_ids: np.ndarray) -> np.ndarray:
+    # Min-label propagation with pointer jumping: each round every node takes the smallest
+    # label among its own and its neighbors', hooks its old label onto that, and labels are
+    # followed to their roots. Ends with every node labeled with the smallest node id of its
+    # component, after a few dozen rounds even for long chains.
+    labels = np.arange(len(offsets) - 1)
+    has_neighbors = np.diff(offsets) > 0
+    if len(neighbor_ids) == 0:
+        return labels
+    while True:
+        new_labels = labels.copy()
+        neighbor_min = np.minimum.reduceat(labels[neighbor_ids], offsets[:-1][has_neighbors])
+        new_labels[has_neighbors] = np.minimum(labels[has_neighbors], neighbor_min)
+        np.minimum.at(new_labels, labels, new_labels.copy())
+        while True:
+            jumped_labels = new_labels[new_labels]
+            if (jumped_labels == new_labels).all():
+                break
+            new_labels = jumped_labels
+        if (new_labels == labels).all():
+            return labels
+        labels = new_labels
+
+
+def factorize_sorted(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # pd.factorize(keys, sort=True), but with the distinct keys sorted by Arrow, which is
+    # several times faster than numpy at sorting millions of Python strings
+    codes, unique_keys = pd.factorize(keys)
+    order = pc.array_sort_indices(pa.array(unique_keys, type=pa.string())).to_numpy()
+    ranks = np.empty_like(order)
+    ranks[order] = np.arange(len(order))
+    return ranks[codes], unique_keys[order]
+
+
+def build_graph_tables(edge_df: pd.DataFrame) -> Dict[str, pa.Table]:
+    n_edges = len(edge_df)
+    node_ids, nodes = factorize_sorted(
+        keys=np.concatenate(
+            [edge_df["entity"].to_numpy(dtype=object), edge_df["node"].to_numpy(dtype=object)]
+        )
+    )
+    # Both directions of every edge, grouped by source node
+    source_ids = np.concatenate([node_ids[:n_edges], node_ids[n_edges:]])
+    target_ids = np.concatenate([node_ids[n_edges:], node_ids[:n_edges]])
+    order = np.lexsort((target_ids, source_ids))
+    degrees = np.bincount(source_ids, minlength=len(nodes))
+    offsets = to_offsets(degrees)
+    neighbor_ids = target_ids[order]
+    labels = label_components(offsets=offsets, neighbor_ids=neighbor_ids)
+    components, _ = pd.factorize(labels)
+    return {
+        "nodes": pa.table(
+            {
+                "node": np.asarray(nodes, dtype=object),
+                "degree": degrees.astype(np.int32),
+                "component": components.astype(np.int32),
+            }
+        ),
+        "neighbors": pa.table({"node_id": neighbor_ids.astype(np.int32)}),
+        "components": pa.table({"n_nodes": np.bincount(components)}),
+        "component_members": pa.table(
+            {"node_id": np.argsort(components, kind="stable").astype(np.int32)}
+        ),
+    }
+
+
+def get_entity_graph_dir(DATA_DIR: Path, cache_dir: Optional[Path] = None) -> Path:
+    # Keyed on the source files, by way of the names of the cached tables they'd become,
+    # so each data drop gets its own graph.
+    cache_dir = get_cache_dir(DATA_DIR=DATA_DIR, cache_dir=cache_dir)
+    source_keys = []
+    for table_name in GRAPH_SOURCES.keys():
+        file_path = DATA_DIR.joinpath(TABLES[table_name].file_name)
+        if file_path.is_file():
+            cache_path = get_cache_path(
+                table_name=table_name, file_path=file_path, cache_dir=cache_dir
+            )
+            source_keys.append(get_edges_source(cache_path=cache_path))
+    graph_key = hashlib.sha256("\n".join(source_keys).encode()).hexdigest()[:16]
+    return cache_dir.joinpath(f"entity_graph__{graph_key}__v{LAYOUT_VERSION}")
+
+
+def build_entity_graph(
+    DATA_DIR: Path, cache_dir: Optional[Path] = None, refresh: bool = False
+) -> Path:
+    # After update_tables has ingested a new drop, only the edges of the file numbers in the
+    # agent and manager tables' deltas are recomputed; the CSR arrays and components are
+    # then rebuilt from the edge lists, which is a sort and a few passes.
+    graph_dir = get_entity_graph_dir(DATA_DIR=DATA_DIR, cache_dir=cache_dir)
+    if graph_dir.is_dir() and not refresh:
+        return graph_dir
+    cache_dir = graph_dir.parent
+    edge_dfs = []
+    for table_name in GRAPH_SOURCES.keys():
+        table_spec = TABLES[table_name]
+        if not DATA_DIR.joinpath(table_spec.file_name).is_file():
+            print(f"No {table_spec.file_name} found in DATA_DIR, skipping the {table_name} edges")
+            continue
+        if refresh:
+            get_edges_path(table_name=table_name, cache_dir=cache_dir).unlink(missing_ok=True)
+        edge_dfs.append(
+            update_table_edges(table_name=table_name, DATA_DIR=DATA_DIR, cache_dir=cache_dir)
+        )
+    if len(edge_dfs) == 0:
+        raise Exception(
+            f"Neither the agent nor the manager file was found in DATA_DIR\n  - {DATA_DIR}"
+        )
+    graph_tables = build_graph_tables(edge_df=pd.concat(edge_dfs, ignore_index=True))
+    tmp_dir = graph_dir.with_name(f"{graph_dir.name}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir()
+    for part_name, part_table in graph_tables.items():
+        feather.write_feather(
+            part_table, tmp_dir.joinpath(f"{part_name}.arrow"), compression="uncompressed"
+        )
+    shutil.rmtree(graph_dir, ignore_errors=True)
+    tmp_dir.rename(graph_dir)
+    for stale_dir in graph_dir.parent.glob("entity_graph__*"):
+        if stale_dir != graph_dir:
+            shutil.rmtree(stale_dir, ignore_errors=True)
+    return graph_dir
+
+
+def load_entity_graph(
+    DATA_DIR: Path, cache_dir: Optional[Path] = None, refresh: bool = False
+) -> EntityGraph:
+    graph_dir = build_entity_graph(DATA_DIR=DATA_DIR, cache_dir=cache_dir, refresh=refresh)
+    graph_tables = {
+        part_path.stem: feather.read_table(part_path, memory_map=True)
+        for part_path in graph_dir.glob("*.arrow")
+    }
+
+    def to_numpy(part_name: str, column: str) -> np.ndarray:
+        return graph_tables[part_name][column].to_numpy()
+
+    return EntityGraph(
+        nodes=to_numpy("nodes", "node"),
+        offsets=to_offsets(to_numpy("nodes", "degree")),
+        neighbor_ids=to_numpy("neighbors", "node_id"),
+        components=to_numpy("nodes", "component"),
+        component_offsets=to_offsets(to_numpy("components", "n_nodes")),
+        component_node_ids=to_numpy("component_members", "node_id"),
+    )
+
+
+def get_entity_node_id(file_number: str, entity_type: str, entity_graph: EntityGraph) -> int:
+    if entity_type not in ("corp", "llc"):
+        raise Exception(f"Unknown entity_type: {entity_type}\n  - options: corp, llc")
+    node = f"{entity_type}:{str(file_number).zfill(8)}"
+    position = np.searchsorted(entity_graph.nodes, node)
+    if position == len(entity_graph.nodes) or entity_graph.nodes[position] != node:
+        raise Exception(f"No agent or manager records found for {node}")
+    return int(position)
+
+
+def get_degrees(node_ids: np.ndarray, entity_graph: EntityGraph) -> np.ndarray:
+    return entity_graph.offsets[node_ids + 1] - entity_graph.offsets[node_ids]
+
+
+def get_neighbor_ids(node_ids: np.ndarray, entity_graph: EntityGraph) -> np.ndarray:
+    # The neighbor lists of node_ids, laid end to end
+    starts = entity_graph.offsets[node_ids]
+    degrees = entity_graph.offsets[node_ids + 1] - starts
+    positions = np.repeat(starts - np.cumsum(degrees) + degrees, degrees)
+    positions += np.arange(degrees.sum())
+    return entity_graph.neighbor_ids[positions]
+
+
+def to_node_df(node_ids: np.ndarray, entity_graph: EntityGraph) -> pd.DataFrame:
+    node_parts = pd.Series(entity_graph.nodes[node_ids], dtype=object).str.split(":", n=1)
+    return pd.DataFrame(
+        {
+            "node_type": node_parts.str[0],
+            "key": node_parts.str[1],
+            "degree": get_degrees(node_ids=node_ids, entity_graph=entity_graph),
+        }
+    )
+
+
+def get_neighborhood(
+    file_number: str,
+    entity_graph: EntityGraph,
+    entity_type: str = "corp",
+    n_hops: int = 2,
+    max_degree: Optional[int] = None,
+) -> pd.DataFrame:
+    # Every node within n_hops of the entity, nearest first. The default two hops reach the
+    # entity's agents or managers and their addresses, then every other entity sharing one
+    # of them. Nodes with more than max_degree neighbors (a registered agent company serving
+    # thousands of corporations, say) are listed but not expanded.
+    start_id = get_entity_node_id(
+        file_number=file_number, entity_type=entity_type, entity_graph=entity_graph
+    )
+    frontier = np.array([start_id])
+    seen_ids = frontier
+    reached = [(frontier, 0)]
+    for distance in range(1, n_hops + 1):
+        if max_degree is not None and distance > 1:
+            frontier = frontier[
+                get_degrees(node_ids=frontier, entity_graph=entity_graph) <= max_degree
+            ]
+        frontier = np.unique(get_neighbor_ids(node_ids=frontier, entity_graph=entity_graph))
+        frontier = np.setdiff1d(frontier, seen_ids, assume_unique=True)
+        seen_ids = np.union1d(seen_ids, frontier)
+        reached.append((frontier, distance))
+    node_ids = np.concatenate([node_ids for node_ids, _ in reached])
+    node_df = to_node_df(node_ids=node_ids, entity_graph=entity_graph)
+    node_df["distance"] = np.repeat(
+        [distance for _, distance in reached], [len(node_ids) for node_ids, _ in reached]
+    )
+    return node_df
+
+
+def get_component(
+    file_number: str, entity_graph: EntityGraph, entity_type: str = "corp"
+) -> pd.DataFrame:
+    # Every node connected to the entity through any chain of shared agents, managers or
+    # addresses
+    start_id = get_entity_node_id(
+        file_number=file_number, entity_type=entity_type, entity_graph=entity_graph
+    )
+    component = entity_graph.components[start_id]
+    members_start, members_end = entity_graph.component_offsets[component : component + 2]
+    node_ids = entity_graph.component_node_ids[members_start:members_end]
+    return to_node_df(node_ids=node_ids, entity_graph=entity_graph)
@@ -0,0 +1,183 @@
+from contextvars import ContextVar, copy_context
+import functools
+import inspect
+import json
+import logging
+from pathlib import Path
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+# Instrumentation is off while SINK is None; every instrumented call then costs one global
+# lookup on top of the call itself. Set it with enable_instrumentation().
+SINK: Optional[Callable[[Dict[str, Any]], None]] = None
+TRACE_MEMORY = False
+
+# Name of the SOS file the current transform is working on, set by the read stage
+CURRENT_FILE: ContextVar[Optional[str]] = ContextVar("CURRENT_FILE", default=None)
+
+# Per thread: the highest traced memory seen so far by each of the thread's open stages,
+# innermost last, so that nested stages can reset tracemalloc's peak without losing their
+# parent's (see get_open_stage_peaks)
+THREAD_STATE = threading.local()
+
+LOGGER = logging.getLogger(__name__)
+
+
+class MemorySink:
+    # Collects events in a list, e.g. for tests or notebooks
+    def __init__(self) -> None:
+        self.events: List[Dict[str, Any]] = []
+
+    def __call__(self, event: Dict[str, Any]) -> None:
+        self.events.append(event)
+
+
+class JsonLinesSink:
+    def __init__(self, file_path: Path) -> None:
+        self.file_path = file_path
+
+    def __call__(self, event: Dict[str, Any]) -> None:
+        with open(self.file_path, "a") as f:
+            f.write(json.dumps(event) + "\n")
+
+
+class LoggingSink:
+    def __init__(self, logger: Optional[logging.Logger] = None, level: int = logging.INFO) -> None:
+        self.logger = logging.getLogger(__name__) if logger is None else logger
+        self.level = level
+
+    def __call__(self, event: Dict[str, Any]) -> None:
+        self.logger.log(self.level, json.dumps(event))
+
+
+def enable_instrumentation(
+    sink: Callable[[Dict[str, Any]], None], trace_memory: bool = False
+) -> None:
+    # trace_memory adds allocated and peak bytes (as seen by tracemalloc, which includes
+    # numpy's buffers) to each event, at the cost of slowing every allocation down.
+    # tracemalloc's counters are process-wide: a stage's bytes include whatever other
+    # threads allocate meanwhile, and its peak is reset by stages starting in other threads,
+    # so threaded loaders (see load_all_pipelined) refuse to run while it's on.
+    global SINK, TRACE_MEMORY
+    SINK = sink
+    TRACE_MEMORY = trace_memory
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable_instrumentation() -> None:
+    global SINK, TRACE_MEMORY
+    if TRACE_MEMORY and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    SINK = None
+    TRACE_MEMORY = False
+
+
+def is_tracing_memory() -> bool:
+    return SINK is not None and TRACE_MEMORY
+
+
+def get_open_stage_peaks() -> List[int]:
+    if not hasattr(THREAD_STATE, "open_stage_peaks"):
+        THREAD_STATE.open_stage_peaks = []
+    return THREAD_STATE.open_stage_peaks
+
+
+def count_rows(result: Any) -> Optional[int]:
+    if isinstance(result, (str, bytes)) or not hasattr(result, "__len__"):
+        return None
+    return len(result)
+
+
+def run_stage(
+    stage: str,
+    func: Callable,
+    signature: inspect.Signature,
+    file_arg: Optional[str],
+    args: tuple,
+    kwargs: dict,
+) -> Any:
+    if file_arg is not None:
+        file_path = signature.bind(*args, **kwargs).arguments.get(file_arg)
+        if file_path is not None:
+            CURRENT_FILE.set(Path(file_path).name)
+    if TRACE_MEMORY:
+        open_stage_peaks = get_open_stage_peaks()
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        if len(open_stage_peaks) > 0:
+            open_stage_peaks[-1] = max(open_stage_peaks[-1], peak_bytes)
+        tracemalloc.reset_peak()
+        start_bytes = tracemalloc.get_traced_memory()[0]
+        open_stage_peaks.append(start_bytes)
+    started_at = time.time()
+    start_time = time.perf_counter()
+    # Run in a copy of the context so a file picked up by a read inside this stage tags
+    # the stage's later siblings and the stage itself, but nothing outside it
+    stage_context = copy_context()
+    try:
+        result = stage_context.run(func, *args, **kwargs)
+    finally:
+        seconds = time.perf_counter() - start_time
+        if TRACE_MEMORY:
+            current_bytes, peak_bytes = tracemalloc.get_traced_memory()
+            peak_bytes = max(peak_bytes, open_stage_peaks.pop())
+            if len(open_stage_peaks) > 0:
+                open_stage_peaks[-1] = max(open_stage_peaks[-1], peak_bytes)
+    event = {
+        "stage": stage,
+        "function": func.__name__,
+        "file": stage_context.get(CURRENT_FILE),
+        "column": result.name if stage == "map" else None,
+        "n_rows": count_rows(result),
+        "started_at": started_at,
+        "seconds": seconds,
+        "allocated_bytes": current_bytes - start_bytes if TRACE_MEMORY else None,
+        "peak_bytes": peak_bytes - start_bytes if TRACE_MEMORY else None,
+    }
+    SINK(event)
+    return result
+
+
+def report_invalid_values(kind: str, column: str, n_invalid: int) -> None:
+    # Values a decoder couldn't parse and left missing. Always logged as a warning, and sent
+    # to the sink as an "invalid" event, tagged with the current file, while it's enabled.
+    file_name = CURRENT_FILE.get()
+    file_note = "" if file_name is None else f" of {file_name}"
+    LOGGER.warning("Invalid %s in %s%s: %d", kind, column, file_note, n_invalid)
+    if SINK is not None:
+        SINK(
+            {
+                "stage": "invalid",
+                "kind": kind,
+                "file": file_name,
+                "column": column,
+                "n_rows": n_invalid,
+                "started_at": time.time(),
+            }
+        )
+
+
+def instrumented(stage: str, file_arg: Optional[str] = None) -> Callable:
+    # Decorator reporting each call of the function as a stage event to the sink.
+    # file_arg names the argument holding the SOS file's path, for stages that read it.
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if SINK is None:
+                return func(*args, **kwargs)
+            return run_stage(
+                stage=stage,
+                func=func,
+                signature=signature,
+                file_arg=file_arg,
+                args=args,
+                kwargs=kwargs,
+            )
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,209 @@
+from typing import List, Optional, Tuple
+
+# Fixed-width record layouts for the Illinois SOS data files, as documented in
+# proc_corp_data.pdf and proc_llc_data.pdf. Each field is declared as
+#   (field_name, start, end, dtype)
+# with python-style [start:end) character offsets into a record (end=None runs to
+# the end of the record) and dtype one of "str", "date" (YYYYMMDD) or "int".
+
+Field = Tuple[str, int, Optional[int], str]
+
+# Bump whenever a layout or a transform changes what a parsed table looks like, so
+# tables cached under the previous version are rebuilt.
+LAYOUT_VERSION = 5
+
+CORP_MASTER_LAYOUT: List[Field] = [
+    ("corp_file_number", 0, 8, "str"),
+    ("corp_incorp_date", 8, 16, "date"),
+    ("corp_extended_date", 16, 24, "date"),
+    ("corp_state_code", 24, 26, "str"),
+    ("corp_corp_intent", 26, 29, "str"),
+    ("corp_status", 29, 31, "str"),
+    ("corp_type_corp", 31, 32, "str"),
+    ("corp_trans_date", 32, 40, "date"),
+    ("corp_pres_name_addr", 40, 100, "str"),
+    ("corp_sec_name_addr", 100, 160, "str"),
+]
+
+CORP_NAME_LAYOUT: List[Field] = [
+    ("corp_file_number", 0, 8, "str"),
+    ("corp_name", 8, None, "str"),
+]
+
+CORP_AGENT_LAYOUT: List[Field] = [
+    ("corp_file_number", 0, 8, "str"),
+    ("corp_agent_name", 8, 68, "str"),
+    ("corp_agent_street", 68, 113, "str"),
+    ("corp_agent_city", 113, 143, "str"),
+    ("corp_agent_change_date", 143, 151, "date"),
+    ("corp_agent_code", 151, 152, "str"),
+    ("corp_agent_zip", 152, 161, "str"),
+    ("corp_agent_county_code", 161, 164, "str"),
+]
+
+CORP_ANNUAL_REPORTS_LAYOUT: List[Field] = [
+    ("corp_file_number", 0, 8, "str"),
+    ("corp_cr_factor", 8, 15, "int"),
+    ("corp_cr_paid_amount", 15, 24, "int"),
+    ("corp_cr_ar_cap", 24, 35, "int"),
+    ("corp_cr_del_run_date", 35, 43, "date"),
+    ("corp_cr_run_date", 43, 51, "date"),
+    ("corp_cr_paid_batch_no", 51, 55, "int"),
+    ("corp_cr_paid_batch_yr", 55, 59, "str"),
+    ("corp_cr_paid_date", 59, 67, "date"),
+    ("corp_pv_factor", 67, 74, "int"),
+    ("corp_pv_paid_amount", 74, 83, "int"),
+    ("corp_pv_cap", 83, 94, "int"),
+    ("corp_pv_del_run_date", 94, 102, "date"),
+    ("corp_pv_run_date", 102, 110, "date"),
+    ("corp_pv_paid_batch_no", 110, 114, "int"),
+    ("corp_pv_paid_batch_yr", 114, 118, "str"),
+    ("corp_pv_paid_date", 118, 126, "date"),
+]
+
+CORP_ASSUMED_OLD_NAME_LAYOUT: List[Field] = [
+    ("corp_file_number", 0, 8, "str"),
+    ("corp_date_cancel", 8, 16, "date"),
+    ("corp_assumed_curr_date", 16, 24, "date"),
+    ("corp_assumed_old_ind", 24, 25, "str"),
+    ("corp_assumed_old_date", 25, 33, "date"),
+    ("corp_assumed_old_name", 33, None, "str"),
+]
+
+CORP_STOCK_LAYOUT: List[Field] = [
+    ("corp_file_number", 0, 8, "str"),
+    ("corp_stock_class", 8, 33, "str"),
+    ("corp_stock_series", 33, 58, "str"),
+    ("corp_voting_rights", 58, 59, "str"),
+    ("corp_authorized_shares", 59, 72, "int"),
+    ("corp_issued_shares", 72, 88, "int"),
+    ("corp_par_value", 88, 101, "int"),
+]
+
+CORP_OTHER_LAYOUT: List[Field] = [
+    ("corp_oth_file_number", 0, 8, "str"),
+    ("corp_oth_hold_prorate", 8, 9, "str"),
+    ("corp_oth_regulated_ind", 9, 10, "str"),
+    ("corp_oth_rec_name_length_ind", 10, 11, "str"),
+    ("corp_oth_records_destroyed", 11, 12, "str"),
+    ("corp_oth_cap_date", 12, 20, "date"),
+    ("corp_oth_inc_letter_ind", 20, 21, "str"),
+    ("corp_oth_abinitio_ind", 21, 22, "str"),
+    ("corp_oth_assume_old_ind", 22, 23, "str"),
+    ("corp_oth_duration_date", 23, 31, "date"),
+    ("corp_oth_total_cap", 31, 44, "int"),
+    ("corp_oth_tax_cap", 44, 57, "int"),
+    ("corp_oth_ill_cap", 57, 68, "int"),
+    ("corp_oth_cr_new_ill_cap", 68, 79, "int"),
+    ("corp_oth_pv_ill_cap", 79, 90, "int"),
+    ("corp_oth_fiscal_year", 90, 98, "date"),
+    ("corp_oth_sect_code", 98, 102, "str"),
+    ("corp_oth_stock_date", 102, 110, "date"),
+    ("corp_oth_revenue_ind", 110, 111, "str"),
+    ("corp_oth_surv_no", 111, 119, "str"),
+    ("corp_oth_date_last_chg", 119, 127, "date"),
+]
+
+LL_ASSUMED_NAME_LAYOUT: List[Field] = [
+    ("ll_file_number", 0, 8, "str"),
+    ("ll_assumed_adopt_date", 8, 16, "date"),
+    ("ll_assumed_can_date", 16, 24, "date"),
+    ("ll_assumed_can_code", 24, 25, "str"),
+    ("ll_assumed_renew_year", 25, 29, "int"),
+    ("ll_assumed_renew_date", 29, 37, "date"),
+    ("ll_assumed_ind", 37, 38, "str"),
+    ("ll_llc_name", 38, 278, "str"),
+    ("ll_series_nbr", 278, 281, "str"),
+]
+
+LL_ANNUAL_REPORTS_LAYOUT: List[Field] = [
+    ("ll_file_number", 0, 8, "str"),
+    ("ll_cur_mail_date", 8, 16, "date"),
+    ("ll_cur_file_date", 16, 24, "date"),
+    ("ll_cur_deliq_date", 24, 32, "date"),
+    ("ll_cur_paid_amt", 32, 37, "int"),
+    ("ll_cur_year_due", 37, 41, "int"),
+    ("ll_pv_mail_date", 41, 49, "date"),
+    ("ll_pv_file_date", 49, 57, "date"),
+    ("ll_pv_deliq_date", 57, 65, "date"),
+    ("ll_pv_paid_amt", 65, 70, "int"),
+    ("ll_pv_year_due", 70, 74, "int"),
+]
+
+LL_SERIES_NAMES_LAYOUT: List[Field] = [
+    ("ll_file_number", 0, 8, "str"),
+    ("ll_series_number", 8, 11, "str"),
+    ("ll_series_status", 11, 13, "str"),
+    ("ll_status_date", 13, 21, "date"),
+    ("ll_begin_date", 21, 29, "date"),
+    ("ll_dissolution_date", 29, 37, "date"),
+    ("ll_series_name", 37, 277, "str"),
+]
+
+LL_MANAGER_LAYOUT: List[Field] = [
+    ("ll_file_number", 0, 8, "str"),
+    ("ll_mm_name", 8, 68, "str"),
+    ("ll_mm_street", 68, 113, "str"),
+    ("ll_mm_city", 113, 143, "str"),
+    ("ll_mm_juris", 143, 145, "str"),
+    ("ll_mm_zip", 145, 154, "str"),
+    ("ll_mm_file_date", 154, 162, "date"),
+    ("ll_mm_type_code", 162, 163, "str"),
+]
+
+LL_MASTER_LAYOUT: List[Field] = [
+    ("ll_file_number", 0, 8, "str"),
+    ("ll_purpose_code", 8, 14, "str"),
+    ("ll_status_code", 14, 16, "str"),
+    ("ll_status_date", 16, 24, "date"),
+    ("ll_organized_date", 24, 32, "date"),
+    ("ll_dissolution_date", 32, 40, "date"),
+    ("ll_management_type", 40, 41, "str"),
+    ("ll_juris_organized", 41, 43, "str"),
+    ("ll_records_off_street", 43, 88, "str"),
+    ("ll_records_off_city", 88, 118, "str"),
+    ("ll_records_off_zip", 118, 127, "str"),
+    ("ll_records_off_juris", 127, 129, "str"),
+    ("ll_assumed_ind", 129, 130, "str"),
+    ("ll_old_ind", 130, 131, "str"),
+    ("ll_provisions_ind", 131, 132, "str"),
+    ("ll_opt_ind", 132, 133, "str"),
+    ("ll_series_ind", 133, 134, "str"),
+    ("ll_uap_ind", 134, 135, "str"),
+    ("ll_l3c_ind", 135, 136, "str"),
+]
+
+LL_NAME_LAYOUT: List[Field] = [
+    ("ll_file_number", 0, 8, "str"),
+    ("ll_name", 8, None, "str"),
+]
+
+LL_OLD_NAME_LAYOUT: List[Field] = [
+    ("ll_file_number", 0, 8, "str"),
+    ("ll_old_date_filed", 8, 16, "date"),
+    ("ll_llc_name", 16, 136, "str"),
+    ("ll_series_nbr", 136, 139, "str"),
+]
+
+# Width of every "int" field, by field name (field names are unique across the layouts)
+INT_FIELD_WIDTHS = {
+    field_name: end - start
+    for layout in [
+        CORP_MASTER_LAYOUT,
+        CORP_NAME_LAYOUT,
+        CORP_AGENT_LAYOUT,
+        CORP_ANNUAL_REPORTS_LAYOUT,
+        CORP_ASSUMED_OLD_NAME_LAYOUT,
+        CORP_STOCK_LAYOUT,
+        CORP_OTHER_LAYOUT,
+        LL_ASSUMED_NAME_LAYOUT,
+        LL_ANNUAL_REPORTS_LAYOUT,
+        LL_SERIES_NAMES_LAYOUT,
+        LL_MANAGER_LAYOUT,
+        LL_MASTER_LAYOUT,
+        LL_NAME_LAYOUT,
+        LL_OLD_NAME_LAYOUT,
+    ]
+    for field_name, start, end, dtype in layout
+    if dtype == "int"
+}
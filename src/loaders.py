@@ -0,0 +1,220 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+import pandas as pd
+import pyarrow as pa
+
+from cache import (
+    build_cached_table,
+    get_cache_dir,
+    get_cache_path,
+    read_cached_table,
+    write_cached_table,
+)
+from extractors import (
+    find_record_bounds,
+    lines_to_char_matrix,
+    map_record_range,
+    slice_fixed_width_fields,
+    unpack_member,
+)
+from instrumentation import is_tracing_memory
+from layouts import Field
+from transformers import TABLES, read_table_records, transform_records
+
+
+def load_all(
+    DATA_DIR: Path,
+    max_workers: Optional[int] = None,
+    cache_dir: Optional[Path] = None,
+    refresh: bool = False,
+    use_mmap: bool = False,
+) -> Dict[str, pd.DataFrame]:
+    # Builds every table whose source file is present in DATA_DIR in a process pool. Each
+    # worker writes its table to the Arrow cache and hands back only the cache path, which
+    # the parent memory-maps, so no DataFrame is ever pickled between processes.
+    table_names = []
+    for table_name, table_spec in TABLES.items():
+        if DATA_DIR.joinpath(table_spec.file_name).is_file():
+            table_names.append(table_name)
+        else:
+            print(f"No {table_spec.file_name} found in DATA_DIR, skipping the {table_name} table")
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            table_name: executor.submit(
+                build_cached_table,
+                table_name=table_name,
+                DATA_DIR=DATA_DIR,
+                cache_dir=cache_dir,
+                refresh=refresh,
+                use_mmap=use_mmap,
+            )
+            for table_name in table_names
+        }
+        return {
+            table_name: read_cached_table(cache_path=future.result())
+            for table_name, future in futures.items()
+        }
+
+
+def split_member_into_shards(raw_path: Path, n_shards: int) -> List[Tuple[int, int]]:
+    # Validates the header and record count trailer of the unpacked member (see
+    # unpack_member), then cuts its data lines into n_shards line-aligned (offset, length)
+    # byte ranges of roughly equal size. Only the line offsets are kept, never the bytes.
+    if raw_path.stat().st_size == 0:
+        return []
+    raw = np.memmap(raw_path, dtype=np.uint8, mode="r")
+    record_starts, record_ends = find_record_bounds(raw=raw)
+    if len(record_starts) == 0:
+        return []
+    # the last record's range runs through its line terminator, if it has one
+    data_end = int(record_ends[-1])
+    for terminator in b"\r\n":
+        if data_end < len(raw) and raw[data_end] == terminator:
+            data_end += 1
+    data_start = int(record_starts[0])
+    targets = data_start + (data_end - data_start) * np.arange(1, n_shards) // n_shards
+    line_aligned_bounds = np.append(record_starts, data_end)
+    shard_bounds = np.unique(
+        np.concatenate(
+            [[data_start], line_aligned_bounds[np.searchsorted(record_starts, targets)], [data_end]]
+        )
+    )
+    return [
+        (int(shard_start), int(shard_end - shard_start))
+        for shard_start, shard_end in zip(shard_bounds[:-1], shard_bounds[1:])
+    ]
+
+
+def parse_shard(raw_path: Path, offset: int, length: int, layout: List[Field]) -> bytes:
+    char_matrix = map_record_range(raw_path=raw_path, offset=offset, length=length)
+    shard_df = slice_fixed_width_fields(char_matrix=char_matrix, layout=layout)
+    table = pa.Table.from_pandas(shard_df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def parse_file_in_shards(
+    file_path: Path,
+    layout: List[Field],
+    n_shards: int = 4,
+    max_workers: Optional[int] = None,
+    raw_dir: Optional[Path] = None,
+) -> pd.DataFrame:
+    # Parses line-range shards of one large file in parallel. The member is unpacked once
+    # into raw_dir and each worker memory-maps just its own shard, so only the shard offsets
+    # are sent to the workers. Shards come back as Arrow IPC streams and are concatenated as
+    # Arrow tables before conversion.
+    raw_path = unpack_member(file_path=file_path, raw_dir=raw_dir)
+    shards = split_member_into_shards(raw_path=raw_path, n_shards=n_shards)
+    if len(shards) == 0:
+        return slice_fixed_width_fields(char_matrix=lines_to_char_matrix(lines=[]), layout=layout)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(
+                parse_shard, raw_path=raw_path, offset=offset, length=length, layout=layout
+            )
+            for offset, length in shards
+        ]
+        shard_buffers = [future.result() for future in futures]
+    tables = [pa.ipc.open_stream(shard_buffer).read_all() for shard_buffer in shard_buffers]
+    return pa.concat_tables(tables).to_pandas()
+
+
+def iter_prefetched(
+    func: Callable, items: List, max_queued: int = 2, max_workers: int = 1
+) -> Iterator:
+    # Yields func(item) for each item in order, with the calls for up to max_queued items
+    # run ahead in background threads. The window is what bounds the queue: a slow consumer
+    # never has more than max_queued results waiting for it in memory.
+    item_iter = iter(items)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = deque(executor.submit(func, item) for item in islice(item_iter, max_queued))
+        try:
+            while len(futures) > 0:
+                result = futures.popleft().result()
+                futures.extend(executor.submit(func, item) for item in islice(item_iter, 1))
+                yield result
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def read_table_stage(
+    table_name: str, DATA_DIR: Path, cache_dir: Path, refresh: bool, use_mmap: bool
+) -> Tuple[str, Path, Optional[np.ndarray]]:
+    # The table's cache path, and its records unless the cached table is current
+    file_path = DATA_DIR.joinpath(TABLES[table_name].file_name)
+    cache_path = get_cache_path(table_name=table_name, file_path=file_path, cache_dir=cache_dir)
+    if cache_path.is_file() and not refresh:
+        return table_name, cache_path, None
+    char_matrix = read_table_records(table_name=table_name, DATA_DIR=DATA_DIR, use_mmap=use_mmap)
+    return table_name, cache_path, char_matrix
+
+
+def load_all_pipelined(
+    DATA_DIR: Path,
+    cache_dir: Optional[Path] = None,
+    refresh: bool = False,
+    use_mmap: bool = False,
+    max_queued: int = 2,
+    read_workers: int = 2,
+) -> Dict[str, pd.DataFrame]:
+    # Same result as load_all, built in one process as a pipeline: read_workers threads
+    # hash and decompress the next files while the calling thread parses the current one,
+    # and a writer thread writes finished tables to the Arrow cache. zlib, hashlib and the
+    # Arrow writer release the GIL, so reads and writes overlap the parsing. At most
+    # max_queued decompressed files wait to be parsed, and max_queued tables to be
+    # written. The largest files go first so none is left parsing on its own at the end.
+    # Refused while instrumentation traces memory, whose counters the threads would share.
+    if is_tracing_memory():
+        raise Exception(
+            "load_all_pipelined can't run while instrumentation traces memory\n"
+            "  - enable_instrumentation(sink, trace_memory=False), or use load_all"
+        )
+    table_names = []
+    for table_name, table_spec in TABLES.items():
+        if DATA_DIR.joinpath(table_spec.file_name).is_file():
+            table_names.append(table_name)
+        else:
+            print(f"No {table_spec.file_name} found in DATA_DIR, skipping the {table_name} table")
+    table_names.sort(
+        key=lambda table_name: DATA_DIR.joinpath(TABLES[table_name].file_name).stat().st_size,
+        reverse=True,
+    )
+    cache_dir = get_cache_dir(DATA_DIR=DATA_DIR, cache_dir=cache_dir)
+    read_stage = partial(
+        read_table_stage, DATA_DIR=DATA_DIR, cache_dir=cache_dir, refresh=refresh, use_mmap=use_mmap
+    )
+    cache_paths = {}
+    with ThreadPoolExecutor(max_workers=1) as write_executor:
+        pending_writes = deque()
+        for table_name, cache_path, char_matrix in iter_prefetched(
+            func=read_stage, items=table_names, max_queued=max_queued, max_workers=read_workers
+        ):
+            cache_paths[table_name] = cache_path
+            if char_matrix is None:
+                continue
+            table_df = transform_records(char_matrix=char_matrix, table_name=table_name)
+            del char_matrix
+            while len(pending_writes) >= max_queued:
+                pending_writes.popleft().result()
+            pending_writes.append(
+                write_executor.submit(write_cached_table, df=table_df, cache_path=cache_path)
+            )
+            del table_df
+        for future in pending_writes:
+            future.result()
+    return {
+        table_name: read_cached_table(cache_path=cache_paths[table_name])
+        for table_name in TABLES
+        if table_name in cache_paths
+    }
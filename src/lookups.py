@@ -0,0 +1,141 @@
+import os
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from cache import build_cached_table
+from transformers import CORP_TABLES, LL_TABLES, TABLES
+
+# entity_kind: the table with one row per entity of that kind, and the other tables of its
+# file number series. Corp and LLC file numbers are separate series that overlap, so a
+# file number only names an entity together with its kind.
+ENTITY_TABLES = {
+    "corp": (
+        "corp_master",
+        [table_name for table_name in CORP_TABLES if table_name != "corp_master"],
+    ),
+    "llc": ("ll_master", [table_name for table_name in LL_TABLES if table_name != "ll_master"]),
+}
+
+
+class TableIndex(NamedTuple):
+    # The cached table, memory-mapped: only the pages of the rows a lookup takes are read,
+    # so the index itself holds nothing but the file number arrays below
+    table: pa.Table
+    # sorted distinct file numbers; the rows of file_numbers[i] are
+    # row_order[row_offsets[i] : row_offsets[i + 1]]
+    file_numbers: np.ndarray
+    row_offsets: np.ndarray
+    row_order: np.ndarray
+
+
+def get_index_path(cache_path: Path) -> Path:
+    return cache_path.with_suffix(".index.npz")
+
+
+def build_file_number_index(file_number_ser: pd.Series) -> Dict[str, np.ndarray]:
+    codes, file_numbers = pd.factorize(file_number_ser, sort=True)
+    row_order = np.argsort(codes, kind="stable")
+    row_counts = np.bincount(codes, minlength=len(file_numbers))
+    return {
+        "file_numbers": np.asarray(file_numbers, dtype=str),
+        "row_offsets": np.concatenate([[0], np.cumsum(row_counts)]),
+        "row_order": row_order,
+    }
+
+
+def write_file_number_index(index_arrays: Dict[str, np.ndarray], index_path: Path) -> None:
+    tmp_path = index_path.with_suffix(".tmp.npz")
+    np.savez(tmp_path, **index_arrays)
+    os.replace(tmp_path, index_path)
+    for stale_path in index_path.parent.glob(f"{index_path.name.split('__')[0]}__*.index.npz"):
+        if stale_path != index_path:
+            stale_path.unlink()
+
+
+def load_table_index(
+    table_name: str, DATA_DIR: Path, cache_dir: Optional[Path] = None, refresh: bool = False
+) -> TableIndex:
+    # The index is stored beside the cached table it was built from, so a new data drop
+    # (or layout version) gets a new index along with its new table.
+    cache_path = build_cached_table(
+        table_name=table_name, DATA_DIR=DATA_DIR, cache_dir=cache_dir, refresh=refresh
+    )
+    table = feather.read_table(cache_path, memory_map=True)
+    index_path = get_index_path(cache_path=cache_path)
+    if refresh or not index_path.is_file():
+        index_arrays = build_file_number_index(file_number_ser=table.column(0).to_pandas())
+        write_file_number_index(index_arrays=index_arrays, index_path=index_path)
+    with np.load(index_path) as index_arrays:
+        return TableIndex(
+            table=table,
+            file_numbers=index_arrays["file_numbers"],
+            row_offsets=index_arrays["row_offsets"],
+            row_order=index_arrays["row_order"],
+        )
+
+
+def load_table_indexes(
+    DATA_DIR: Path, cache_dir: Optional[Path] = None, refresh: bool = False
+) -> Dict[str, TableIndex]:
+    table_indexes = {}
+    for table_name, table_spec in TABLES.items():
+        if DATA_DIR.joinpath(table_spec.file_name).is_file():
+            table_indexes[table_name] = load_table_index(
+                table_name=table_name, DATA_DIR=DATA_DIR, cache_dir=cache_dir, refresh=refresh
+            )
+        else:
+            print(f"No {table_spec.file_name} found in DATA_DIR, skipping the {table_name} table")
+    return table_indexes
+
+
+def get_table_rows(file_number: str, table_index: TableIndex) -> List[Dict[str, Any]]:
+    # The table's rows filed under file_number as {column: value} dicts. Rows are sliced
+    # out of the table one at a time, which unlike take() never copies the table's chunks
+    # together; missing values come back as None.
+    position = np.searchsorted(table_index.file_numbers, file_number)
+    if position == len(table_index.file_numbers):
+        return []
+    if table_index.file_numbers[position] != file_number:
+        return []
+    row_start, row_end = table_index.row_offsets[position : position + 2]
+    rows = table_index.row_order[row_start:row_end]
+    row_tables = [table_index.table.slice(row, 1) for row in rows]
+    return pa.concat_tables(row_tables).to_pylist()
+
+
+def lookup(
+    file_number: Union[str, int], entity_kind: str, table_indexes: Dict[str, TableIndex]
+) -> Optional[Dict[str, Any]]:
+    # The entity filed under file_number in the entity_kind ("corp" or "llc") series as one
+    # record: its master row's columns, with the rows of each of its other tables nested
+    # under the table's name (without their file number column). Tables that aren't in
+    # table_indexes are left out; None if no table has a row for the entity.
+    if entity_kind not in ENTITY_TABLES.keys():
+        raise Exception(f"Unknown entity_kind: {entity_kind}\n  - options: {list(ENTITY_TABLES)}")
+    file_number = str(file_number).zfill(8)
+    master_table_name, child_table_names = ENTITY_TABLES[entity_kind]
+    entity = {"entity_kind": entity_kind, "file_number": file_number}
+    has_rows = False
+    if master_table_name in table_indexes.keys():
+        master_rows = get_table_rows(
+            file_number=file_number, table_index=table_indexes[master_table_name]
+        )
+        if len(master_rows) > 0:
+            entity.update(master_rows[0])
+            has_rows = True
+    for table_name in child_table_names:
+        if table_name not in table_indexes.keys():
+            continue
+        table_index = table_indexes[table_name]
+        file_number_column = table_index.table.column_names[0]
+        table_rows = get_table_rows(file_number=file_number, table_index=table_index)
+        for row in table_rows:
+            del row[file_number_column]
+        entity[table_name] = table_rows
+        has_rows |= len(table_rows) > 0
+    return entity if has_rows else None
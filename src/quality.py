@@ -0,0 +1,186 @@
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+
+from cache import get_cache_dir
+from decoders import decode_digit_matrix, decode_yyyymmdd, factorize_byte_rows
+from extractors import slice_field
+from instrumentation import instrumented
+from layouts import Field
+from transformers import TABLES, get_field_codes, read_table_records
+
+# What each check flags as invalid:
+#   length: records too short to reach the layout's last field, or longer than the layout
+#   int:    values that aren't a (signed or zoned) number of digits
+#   date:   values that aren't a real YYYYMMDD calendar date
+#   code:   values that aren't in the field's code dict
+# Blank values are counted as missing rather than invalid, except codes whose dict has a
+# blank code.
+
+
+class QualityReport(NamedTuple):
+    # summary: one row per checked field with its missing and invalid counts and error rate
+    # quarantine: one row per record that failed any check, with the reasons and the record
+    summary: pd.DataFrame
+    quarantine: pd.DataFrame
+
+
+def get_record_lengths(char_matrix: np.ndarray) -> np.ndarray:
+    # Short records are NUL padded (see get_data_records); when none are the matrix is
+    # a view onto fixed width records and every length is its width
+    n_records, record_width = char_matrix.shape
+    if record_width == 0 or char_matrix[:, -1].all():
+        return np.full(n_records, record_width)
+    is_content = char_matrix != 0
+    return np.where(
+        is_content.any(axis=1), record_width - np.argmax(is_content[:, ::-1], axis=1), 0
+    )
+
+
+def check_record_lengths(
+    char_matrix: np.ndarray, layout: List[Field]
+) -> Tuple[np.ndarray, np.ndarray]:
+    # A trailing free-text field may be cut short (the LLC series file trims trailing
+    # blanks), so records only need to reach the start of the last field
+    record_lengths = get_record_lengths(char_matrix=char_matrix)
+    last_start = max(start for _, start, _, _ in layout)
+    is_invalid = record_lengths <= last_start
+    if all(end is not None for _, _, end, _ in layout):
+        is_invalid |= record_lengths > max(end for _, _, end, _ in layout)
+    return record_lengths == 0, is_invalid
+
+
+def check_field(
+    field_matrix: np.ndarray, check: str, code_map: Optional[dict] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    # (is_missing, is_invalid) for every record, worked out once per distinct value
+    unique_positions, first_records = factorize_byte_rows(char_matrix=field_matrix)
+    unique_matrix = field_matrix[first_records]
+    if check == "int":
+        _, is_missing, is_invalid = decode_digit_matrix(char_matrix=unique_matrix)
+    elif check == "date":
+        dates, is_invalid = decode_yyyymmdd(char_matrix=unique_matrix)
+        is_missing = np.isnat(dates) & ~is_invalid
+    else:
+        unique_values = pd.Index(slice_field(char_matrix=unique_matrix, start=0, end=None))
+        is_code = unique_values.isin(list(code_map.keys()))
+        is_missing = ~is_code & (unique_values.str.strip() == "")
+        is_invalid = ~is_code & ~is_missing
+    return is_missing[unique_positions], is_invalid[unique_positions]
+
+
+@instrumented("validate")
+def validate_records(char_matrix: np.ndarray, table_name: str) -> QualityReport:
+    # Checks every record of a table against its layout in one pass over the fields of the
+    # record matrix (see get_data_records): the record's length, every "int" and "date"
+    # field, and every field with a code dict (see FIELD_CODES). Records are numbered by
+    # their position among the data records, which is also their row in the table.
+    if table_name not in TABLES.keys():
+        raise Exception(f"Unknown table_name: {table_name}\n  - options: {list(TABLES)}")
+    layout = TABLES[table_name].layout
+    field_codes = get_field_codes(table_name=table_name)
+    n_records, record_width = char_matrix.shape
+    summary_rows = []
+    failure_dfs = []
+    checks = [("record", "length", None, None, None)]
+    for field_name, start, end, dtype in layout:
+        if dtype in ("int", "date"):
+            checks.append((field_name, dtype, start, end, None))
+        elif field_name in field_codes:
+            checks.append((field_name, "code", start, end, field_codes[field_name]))
+    for field_name, check, start, end, code_map in checks:
+        if check == "length":
+            is_missing, is_invalid = check_record_lengths(char_matrix=char_matrix, layout=layout)
+        else:
+            end = record_width if end is None else min(end, record_width)
+            is_missing, is_invalid = check_field(
+                field_matrix=char_matrix[:, min(start, end) : end], check=check, code_map=code_map
+            )
+        n_missing, n_invalid = int(is_missing.sum()), int(is_invalid.sum())
+        summary_rows.append(
+            {
+                "table_name": table_name,
+                "field_name": field_name,
+                "check": check,
+                "n_records": n_records,
+                "n_missing": n_missing,
+                "n_invalid": n_invalid,
+                "error_rate": n_invalid / n_records if n_records > 0 else 0.0,
+            }
+        )
+        if n_invalid > 0:
+            failure_dfs.append(
+                pd.DataFrame(
+                    {"record_number": np.flatnonzero(is_invalid), "reason": f"{field_name}:{check}"}
+                )
+            )
+    summary_df = pd.DataFrame(summary_rows)
+    quarantine_df = get_quarantine(
+        char_matrix=char_matrix, failure_dfs=failure_dfs, table_name=table_name
+    )
+    if len(quarantine_df) > 0:
+        print(f"Quarantined records in {table_name}: {len(quarantine_df):>8}")
+    return QualityReport(summary=summary_df, quarantine=quarantine_df)
+
+
+def get_quarantine(
+    char_matrix: np.ndarray, failure_dfs: List[pd.DataFrame], table_name: str
+) -> pd.DataFrame:
+    columns = ["table_name", "record_number", "file_number", "n_failures", "reasons", "record"]
+    if len(failure_dfs) == 0:
+        column_dtypes = {"record_number": np.int64, "n_failures": np.int64}
+        return pd.DataFrame(
+            {column: pd.Series(dtype=column_dtypes.get(column, str)) for column in columns}
+        )
+    failure_df = pd.concat(failure_dfs, ignore_index=True)
+    record_groups = failure_df.groupby("record_number", sort=True)["reason"]
+    quarantine_df = pd.DataFrame(
+        {"n_failures": record_groups.size(), "reasons": record_groups.agg(", ".join)}
+    ).reset_index()
+    record_numbers = quarantine_df["record_number"].to_numpy()
+    record_matrix = char_matrix[record_numbers]
+    quarantine_df["file_number"] = slice_field(char_matrix=record_matrix, start=0, end=8)
+    quarantine_df["record"] = slice_field(char_matrix=record_matrix, start=0, end=None)
+    quarantine_df["table_name"] = table_name
+    return quarantine_df[columns]
+
+
+def validate_table(
+    table_name: str, DATA_DIR: Path, use_mmap: bool = False, raw_dir: Optional[Path] = None
+) -> QualityReport:
+    char_matrix = read_table_records(
+        table_name=table_name, DATA_DIR=DATA_DIR, use_mmap=use_mmap, raw_dir=raw_dir
+    )
+    return validate_records(char_matrix=char_matrix, table_name=table_name)
+
+
+def get_quality_paths(table_name: str, cache_dir: Path) -> Tuple[Path, Path]:
+    return (
+        cache_dir.joinpath(f"{table_name}.quality"),
+        cache_dir.joinpath(f"{table_name}.quarantine"),
+    )
+
+
+def write_quality_report(
+    table_name: str, DATA_DIR: Path, cache_dir: Optional[Path] = None, use_mmap: bool = False
+) -> QualityReport:
+    # Validates the table and writes its summary and quarantine beside the Arrow cache
+    cache_dir = get_cache_dir(DATA_DIR=DATA_DIR, cache_dir=cache_dir)
+    quality_report = validate_table(table_name=table_name, DATA_DIR=DATA_DIR, use_mmap=use_mmap)
+    summary_path, quarantine_path = get_quality_paths(table_name=table_name, cache_dir=cache_dir)
+    feather.write_feather(quality_report.summary, summary_path)
+    feather.write_feather(quality_report.quarantine, quarantine_path)
+    return quality_report
+
+
+def read_quality_report(table_name: str, cache_dir: Path) -> QualityReport:
+    summary_path, quarantine_path = get_quality_paths(table_name=table_name, cache_dir=cache_dir)
+    if not summary_path.is_file():
+        raise Exception(f"No quality report found for {table_name}\n  - {summary_path}")
+    return QualityReport(
+        summary=feather.read_feather(summary_path),
+        quarantine=feather.read_feather(quarantine_path),
+    )
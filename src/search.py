@@ -0,0 +1,384 @@
+import hashlib
+from pathlib import Path
+import shutil
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from cache import build_cached_table, get_cache_dir, read_cached_table
+from layouts import LAYOUT_VERSION
+from transformers import TABLES
+
+# table_name: (name_column, name_type) for every table holding business names
+NAME_SOURCES = {
+    "corp_name": ("corp_name", "corp current name"),
+    "corp_assumed_old_name": ("corp_assumed_old_name", "corp assumed or old name"),
+    "ll_name": ("ll_name", "llc current name"),
+    "ll_assumed_name": ("ll_llc_name", "llc assumed name"),
+    "ll_old_name": ("ll_llc_name", "llc old name"),
+}
+
+# Bumped whenever names are normalized or indexed differently, so older indexes are rebuilt
+NAME_INDEX_VERSION = 2
+
+# Unicode's combining diacritical marks, which NFKD splits off accented letters
+COMBINING_MARKS = "[\u0300-\u036f]"
+
+# A prefix or fuzzy query token expands to at most this many vocabulary tokens
+MAX_TOKEN_EXPANSIONS = 256
+
+
+class NameIndex(NamedTuple):
+    # distinct normalized names in sorted order; a name's id is its position
+    names: np.ndarray
+    name_n_tokens: np.ndarray
+    # records (file_number, name as filed, name_type) grouped by name id
+    record_offsets: np.ndarray
+    record_df: pd.DataFrame
+    # sorted token vocabulary and, per token, the sorted ids of the names containing it
+    tokens: np.ndarray
+    token_lengths: np.ndarray
+    token_offsets: np.ndarray
+    token_name_ids: np.ndarray
+    # sorted trigrams of the vocabulary and, per trigram, the ids of the tokens containing it
+    trigrams: np.ndarray
+    trigram_offsets: np.ndarray
+    trigram_token_ids: np.ndarray
+
+
+def normalize_names(name_ser: pd.Series) -> pd.Series:
+    # Accents folded (JOSÉ -> JOSE), upper case, apostrophes dropped (O'HARE -> OHARE),
+    # every other run of punctuation or whitespace collapsed to a single space. Done once per
+    # distinct name.
+    codes, unique_names = pd.factorize(name_ser)
+    normalized_names = (
+        pd.Series(unique_names, dtype=object)
+        .str.normalize("NFKD")
+        .str.replace(COMBINING_MARKS, "", regex=True)
+        .str.upper()
+        .str.replace("'", "", regex=False)
+        .str.replace(r"[^A-Z0-9]+", " ", regex=True)
+        .str.strip()
+        .to_numpy()
+    )
+    normalized_names = np.append(normalized_names, "")
+    return pd.Series(normalized_names[codes], index=name_ser.index, name=name_ser.name)
+
+
+def get_trigrams(token: str) -> List[str]:
+    padded_token = f" {token} "
+    return sorted({padded_token[i : i + 3] for i in range(len(padded_token) - 2)})
+
+
+def to_offsets(counts: np.ndarray) -> np.ndarray:
+    return np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+
+def group_postings(keys: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # CSR postings: the returned values are sorted by (key, value), and the values for key
+    # code k sit at offsets[k] : offsets[k + 1]
+    key_codes, unique_keys = pd.factorize(keys, sort=True)
+    order = np.lexsort((values, key_codes))
+    counts = np.bincount(key_codes, minlength=len(unique_keys))
+    return to_offsets(counts), values[order]
+
+
+def collect_names(DATA_DIR: Path, cache_dir: Optional[Path] = None) -> pd.DataFrame:
+    name_dfs = []
+    for table_name, (name_column, name_type) in NAME_SOURCES.items():
+        table_spec = TABLES[table_name]
+        if not DATA_DIR.joinpath(table_spec.file_name).is_file():
+            print(f"No {table_spec.file_name} found in DATA_DIR, skipping the {table_name} names")
+            continue
+        cache_path = build_cached_table(
+            table_name=table_name, DATA_DIR=DATA_DIR, cache_dir=cache_dir
+        )
+        table_df = read_cached_table(cache_path=cache_path)
+        name_dfs.append(
+            pd.DataFrame(
+                {
+                    "file_number": table_df.iloc[:, 0].astype(object),
+                    "name": table_df[name_column].astype(object).str.strip(),
+                    "name_type": name_type,
+                }
+            )
+        )
+    if len(name_dfs) == 0:
+        raise Exception(f"None of the name files were found in DATA_DIR\n  - {DATA_DIR}")
+    return pd.concat(name_dfs, ignore_index=True)
+
+
+def build_name_index_tables(name_df: pd.DataFrame) -> Dict[str, pa.Table]:
+    normalized_name_ser = normalize_names(name_df["name"])
+    name_ids, names = pd.factorize(normalized_name_ser, sort=True)
+    names = names.to_numpy(dtype=object)
+    record_order = np.argsort(name_ids, kind="stable")
+
+    name_token_ser = pd.Series(names, dtype=object).str.split().explode().dropna()
+    name_n_tokens = np.bincount(name_token_ser.index.to_numpy(), minlength=len(names))
+    token_ids, tokens = pd.factorize(name_token_ser.to_numpy(), sort=True)
+    token_name_pairs = pd.DataFrame({"token_id": token_ids, "name_id": name_token_ser.index})
+    token_name_pairs = token_name_pairs.drop_duplicates()
+    token_offsets, token_name_ids = group_postings(
+        keys=token_name_pairs["token_id"].to_numpy(), values=token_name_pairs["name_id"].to_numpy()
+    )
+
+    token_trigrams = [get_trigrams(token=token) for token in tokens]
+    token_n_trigrams = np.array([len(trigrams) for trigrams in token_trigrams], dtype=np.int32)
+    token_n_characters = np.array([len(token) for token in tokens], dtype=np.int32)
+    trigram_keys = np.array([trigram for trigrams in token_trigrams for trigram in trigrams])
+    trigram_offsets, trigram_token_ids = group_postings(
+        keys=trigram_keys, values=np.repeat(np.arange(len(tokens)), token_n_trigrams)
+    )
+
+    return {
+        "names": pa.table(
+            {
+                "name": names,
+                "n_tokens": name_n_tokens.astype(np.int32),
+                "n_records": np.bincount(name_ids, minlength=len(names)),
+            }
+        ),
+        "records": pa.Table.from_pandas(
+            name_df.iloc[record_order].astype({"name_type": "category"}), preserve_index=False
+        ),
+        "tokens": pa.table(
+            {
+                "token": np.asarray(tokens, dtype=object),
+                "length": token_n_characters,
+                "n_names": np.diff(token_offsets),
+            }
+        ),
+        "token_postings": pa.table({"name_id": token_name_ids.astype(np.int64)}),
+        "trigrams": pa.table(
+            {
+                "trigram": np.unique(trigram_keys).astype(object),
+                "n_tokens": np.diff(trigram_offsets),
+            }
+        ),
+        "trigram_postings": pa.table({"token_id": trigram_token_ids.astype(np.int64)}),
+    }
+
+
+def get_name_index_dir(DATA_DIR: Path, cache_dir: Optional[Path] = None) -> Path:
+    # Keyed on the cached name tables it's built from, which are themselves keyed on the
+    # source files, so each data drop gets its own index.
+    cache_dir = get_cache_dir(DATA_DIR=DATA_DIR, cache_dir=cache_dir)
+    source_keys = []
+    for table_name in NAME_SOURCES.keys():
+        table_spec = TABLES[table_name]
+        if DATA_DIR.joinpath(table_spec.file_name).is_file():
+            cache_path = build_cached_table(
+                table_name=table_name, DATA_DIR=DATA_DIR, cache_dir=cache_dir
+            )
+            source_keys.append(cache_path.name)
+    index_key = hashlib.sha256("\n".join(source_keys).encode()).hexdigest()[:16]
+    return cache_dir.joinpath(f"name_index__{index_key}__v{LAYOUT_VERSION}.{NAME_INDEX_VERSION}")
+
+
+def build_name_index(
+    DATA_DIR: Path, cache_dir: Optional[Path] = None, refresh: bool = False
+) -> Path:
+    index_dir = get_name_index_dir(DATA_DIR=DATA_DIR, cache_dir=cache_dir)
+    if index_dir.is_dir() and not refresh:
+        return index_dir
+    name_df = collect_names(DATA_DIR=DATA_DIR, cache_dir=cache_dir)
+    index_tables = build_name_index_tables(name_df=name_df)
+    tmp_dir = index_dir.with_name(f"{index_dir.name}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir()
+    for part_name, part_table in index_tables.items():
+        feather.write_feather(
+            part_table, tmp_dir.joinpath(f"{part_name}.arrow"), compression="uncompressed"
+        )
+    shutil.rmtree(index_dir, ignore_errors=True)
+    tmp_dir.rename(index_dir)
+    for stale_dir in index_dir.parent.glob("name_index__*"):
+        if stale_dir != index_dir:
+            shutil.rmtree(stale_dir, ignore_errors=True)
+    return index_dir
+
+
+def load_name_index(
+    DATA_DIR: Path, cache_dir: Optional[Path] = None, refresh: bool = False
+) -> NameIndex:
+    index_dir = build_name_index(DATA_DIR=DATA_DIR, cache_dir=cache_dir, refresh=refresh)
+    index_tables = {
+        part_path.stem: feather.read_table(part_path, memory_map=True)
+        for part_path in index_dir.glob("*.arrow")
+    }
+
+    def to_numpy(part_name: str, column: str) -> np.ndarray:
+        return index_tables[part_name][column].to_numpy()
+
+    return NameIndex(
+        names=to_numpy("names", "name"),
+        name_n_tokens=to_numpy("names", "n_tokens"),
+        record_offsets=to_offsets(to_numpy("names", "n_records")),
+        record_df=index_tables["records"].to_pandas(),
+        tokens=to_numpy("tokens", "token"),
+        token_lengths=to_numpy("tokens", "length"),
+        token_offsets=to_offsets(to_numpy("tokens", "n_names")),
+        token_name_ids=to_numpy("token_postings", "name_id"),
+        trigrams=to_numpy("trigrams", "trigram"),
+        trigram_offsets=to_offsets(to_numpy("trigrams", "n_tokens")),
+        trigram_token_ids=to_numpy("trigram_postings", "token_id"),
+    )
+
+
+def match_exact_token(query_token: str, name_index: NameIndex) -> Tuple[np.ndarray, np.ndarray]:
+    position = np.searchsorted(name_index.tokens, query_token)
+    if position < len(name_index.tokens) and name_index.tokens[position] == query_token:
+        return np.array([position]), np.array([1.0])
+    return np.array([], dtype=np.int64), np.array([])
+
+
+def match_prefix_token(query_token: str, name_index: NameIndex) -> Tuple[np.ndarray, np.ndarray]:
+    # Every vocabulary token starting with query_token; shorter completions score higher.
+    # The most common completions are kept when there are too many.
+    first = np.searchsorted(name_index.tokens, query_token, side="left")
+    last = np.searchsorted(name_index.tokens, query_token + "\uffff", side="left")
+    token_ids = np.arange(first, last)
+    if len(token_ids) > MAX_TOKEN_EXPANSIONS:
+        n_names = np.diff(name_index.token_offsets)[token_ids]
+        token_ids = token_ids[np.argsort(-n_names, kind="stable")[:MAX_TOKEN_EXPANSIONS]]
+    token_lengths = np.array([len(token) for token in name_index.tokens[token_ids]])
+    return token_ids, len(query_token) / np.maximum(token_lengths, 1)
+
+
+def get_edit_distance(token: str, other_token: str) -> int:
+    previous_row = list(range(len(other_token) + 1))
+    for i, char in enumerate(token, start=1):
+        row = [i]
+        for j, other_char in enumerate(other_token, start=1):
+            row.append(
+                min(previous_row[j] + 1, row[j - 1] + 1, previous_row[j - 1] + (char != other_char))
+            )
+        previous_row = row
+    return previous_row[-1]
+
+
+def match_fuzzy_token(
+    query_token: str, name_index: NameIndex, max_edits: Optional[int]
+) -> Tuple[np.ndarray, np.ndarray]:
+    # Vocabulary tokens within max_edits edits of query_token (one for tokens of up to five
+    # characters, two beyond that, by default), scored 1 - edits / length. One edit touches
+    # at most 3 trigrams, so the trigram postings narrow the vocabulary down to a handful of
+    # candidates before any edit distance is computed.
+    if max_edits is None:
+        max_edits = 1 if len(query_token) <= 5 else 2
+    query_trigrams = np.array(get_trigrams(token=query_token), dtype=object)
+    positions = np.searchsorted(name_index.trigrams, query_trigrams)
+    is_known = positions < len(name_index.trigrams)
+    is_known[is_known] = name_index.trigrams[positions[is_known]] == query_trigrams[is_known]
+    positions = positions[is_known]
+    token_id_chunks = [
+        name_index.trigram_token_ids[
+            name_index.trigram_offsets[position] : name_index.trigram_offsets[position + 1]
+        ]
+        for position in positions
+    ]
+    token_ids, n_shared = np.unique(
+        np.concatenate(token_id_chunks + [np.array([], dtype=np.int64)]), return_counts=True
+    )
+    length_gap = np.abs(name_index.token_lengths[token_ids] - len(query_token))
+    is_candidate = (n_shared >= len(query_trigrams) - 3 * max_edits) & (length_gap <= max_edits)
+    token_ids = token_ids[is_candidate]
+    edit_distances = np.array(
+        [get_edit_distance(query_token, token) for token in name_index.tokens[token_ids]],
+        dtype=np.int64,
+    )
+    is_match = edit_distances <= max_edits
+    token_ids, edit_distances = token_ids[is_match], edit_distances[is_match]
+    longer_lengths = np.maximum(name_index.token_lengths[token_ids], len(query_token))
+    similarity = 1 - edit_distances / longer_lengths
+    best = np.argsort(-similarity, kind="stable")[:MAX_TOKEN_EXPANSIONS]
+    return token_ids[best], similarity[best]
+
+
+def get_posting(token_id: int, name_index: NameIndex) -> np.ndarray:
+    token_start, token_end = name_index.token_offsets[token_id : token_id + 2]
+    return name_index.token_name_ids[token_start:token_end]
+
+
+def score_names(
+    token_matches: List[Tuple[np.ndarray, np.ndarray]], name_index: NameIndex
+) -> Tuple[np.ndarray, np.ndarray]:
+    # Names must match every query token; each query token contributes the similarity of
+    # its best matching token in the name. Starting from the query token with the fewest
+    # postings keeps the candidate set small, and the rest are checked by binary search
+    # into their (sorted) postings.
+    n_postings = [
+        np.diff(name_index.token_offsets)[token_ids].sum() for token_ids, _ in token_matches
+    ]
+    name_ids, scores = None, None
+    for match_number in np.argsort(n_postings, kind="stable"):
+        token_ids, similarities = token_matches[match_number]
+        if name_ids is None:
+            postings = [
+                get_posting(token_id=token_id, name_index=name_index) for token_id in token_ids
+            ]
+            posting_name_ids = np.concatenate(postings + [np.array([], dtype=np.int64)])
+            posting_similarities = np.repeat(similarities, [len(posting) for posting in postings])
+            order = np.lexsort((-posting_similarities, posting_name_ids))
+            name_ids, first = np.unique(posting_name_ids[order], return_index=True)
+            scores = posting_similarities[order][first]
+            continue
+        best_similarities = np.zeros(len(name_ids))
+        for token_id, similarity in zip(token_ids, similarities):
+            posting = get_posting(token_id=token_id, name_index=name_index)
+            positions = np.minimum(np.searchsorted(posting, name_ids), len(posting) - 1)
+            is_hit = posting[positions] == name_ids
+            best_similarities[is_hit] = np.maximum(best_similarities[is_hit], similarity)
+        is_kept = best_similarities > 0
+        name_ids, scores = name_ids[is_kept], scores[is_kept] + best_similarities[is_kept]
+    return name_ids, scores / len(token_matches)
+
+
+def search_names(
+    query: str,
+    name_index: NameIndex,
+    mode: str = "token",
+    limit: int = 20,
+    max_edits: Optional[int] = None,
+) -> pd.DataFrame:
+    # Ranked name records matching every token of query, best first. Modes:
+    #   token:  query tokens must appear in the name as-is
+    #   prefix: query tokens match name tokens starting with them (type-ahead)
+    #   fuzzy:  query tokens match name tokens within max_edits edits (typos)
+    # Ties go to names with fewer tokens, i.e. the closest overall match.
+    query_tokens = normalize_names(pd.Series([query], dtype=object)).iloc[0].split()
+    token_matches = []
+    for query_token in query_tokens:
+        if mode == "token":
+            token_matches.append(match_exact_token(query_token=query_token, name_index=name_index))
+        elif mode == "prefix":
+            token_matches.append(match_prefix_token(query_token=query_token, name_index=name_index))
+        elif mode == "fuzzy":
+            token_matches.append(
+                match_fuzzy_token(
+                    query_token=query_token, name_index=name_index, max_edits=max_edits
+                )
+            )
+        else:
+            raise Exception(f"Unknown search mode: {mode}\n  - options: token, prefix, fuzzy")
+    result_columns = ["file_number", "name", "name_type", "matched_name", "score"]
+    if len(token_matches) == 0:
+        return pd.DataFrame(columns=result_columns)
+    name_ids, scores = score_names(token_matches=token_matches, name_index=name_index)
+    top = np.lexsort((name_ids, name_index.name_n_tokens[name_ids], -scores))[:limit]
+    name_ids, scores = name_ids[top], scores[top]
+    record_starts = name_index.record_offsets[name_ids]
+    record_counts = name_index.record_offsets[name_ids + 1] - record_starts
+    # record_starts[i], record_starts[i] + 1, ... for each name, laid end to end
+    record_positions = np.repeat(
+        record_starts - np.cumsum(record_counts) + record_counts, record_counts
+    )
+    record_positions += np.arange(record_counts.sum())
+    result_df = name_index.record_df.iloc[record_positions].reset_index(drop=True)
+    result_df["matched_name"] = np.repeat(name_index.names[name_ids], record_counts)
+    result_df["score"] = np.repeat(scores, record_counts)
+    return result_df[result_columns].head(limit)
@@ -0,0 +1,209 @@
+from pathlib import Path
+import sqlite3
+from typing import Any, Iterator, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from cache import build_cached_table, get_cache_dir
+from layouts import LAYOUT_VERSION
+from transformers import (
+    TABLES,
+    CORP_STATUS_CODES,
+    STATE_CODES,
+    CORP_TYPE_CODES,
+    CORP_FOR_PROFIT_INTENT_CODES,
+    CORP_NON_PROFIT_INTENT_CODES,
+    CORP_AGENT_CODES,
+    NUMERIC_COUNTY_CODES,
+    ALPHA_COUNTY_CODES,
+    ASSUMED_OLD_IND_CODES,
+    VOTING_RIGHTS_CODES,
+    REPORT_OF_ISSUANCES_CODES,
+    OUTSIDE_REGULATOR_CODE,
+    NAME_LENGTH_CODES,
+    RECORDS_DESTROYED_CODES,
+    INCREASED_LETTER_SENT_CODES,
+    ABINITO_FEE_PROBLEM_CODES,
+    OLD_NAME_AVAILABLE_CODES,
+    SECTION_CODES,
+    REVENUE_IND_CODES,
+    LL_STATUS_CODES,
+    LL_MANAGEMENT_TYPE_CODES,
+    LL_ASSUMED_IND_CODES,
+    LL_OLD_IND_CODES,
+    LL_PROVISIONS_IND_CODES,
+    LL_OPT_IND_CODES,
+    LL_SERIES_IND_CODES,
+    LL_UAP_IND_CODES,
+    LL_ASSUMED_CAN_CODES,
+    LL_ASSUMED_NAME_TYPE_CODES,
+    LL_MM_TYPE_CODES,
+    LL_SERIES_STATUS_CODES,
+)
+
+# Every code table as a (code, description) dimension table
+DIMENSION_TABLES = {
+    "dim_corp_status_codes": CORP_STATUS_CODES,
+    "dim_state_codes": STATE_CODES,
+    "dim_corp_type_codes": CORP_TYPE_CODES,
+    "dim_corp_for_profit_intent_codes": CORP_FOR_PROFIT_INTENT_CODES,
+    "dim_corp_non_profit_intent_codes": CORP_NON_PROFIT_INTENT_CODES,
+    "dim_corp_agent_codes": CORP_AGENT_CODES,
+    "dim_numeric_county_codes": NUMERIC_COUNTY_CODES,
+    "dim_alpha_county_codes": ALPHA_COUNTY_CODES,
+    "dim_assumed_old_ind_codes": ASSUMED_OLD_IND_CODES,
+    "dim_voting_rights_codes": VOTING_RIGHTS_CODES,
+    "dim_report_of_issuances_codes": REPORT_OF_ISSUANCES_CODES,
+    "dim_outside_regulator_code": OUTSIDE_REGULATOR_CODE,
+    "dim_name_length_codes": NAME_LENGTH_CODES,
+    "dim_records_destroyed_codes": RECORDS_DESTROYED_CODES,
+    "dim_increased_letter_sent_codes": INCREASED_LETTER_SENT_CODES,
+    "dim_abinito_fee_problem_codes": ABINITO_FEE_PROBLEM_CODES,
+    "dim_old_name_available_codes": OLD_NAME_AVAILABLE_CODES,
+    "dim_section_codes": SECTION_CODES,
+    "dim_revenue_ind_codes": REVENUE_IND_CODES,
+    "dim_ll_status_codes": LL_STATUS_CODES,
+    "dim_ll_management_type_codes": LL_MANAGEMENT_TYPE_CODES,
+    "dim_ll_assumed_ind_codes": LL_ASSUMED_IND_CODES,
+    "dim_ll_old_ind_codes": LL_OLD_IND_CODES,
+    "dim_ll_provisions_ind_codes": LL_PROVISIONS_IND_CODES,
+    "dim_ll_opt_ind_codes": LL_OPT_IND_CODES,
+    "dim_ll_series_ind_codes": LL_SERIES_IND_CODES,
+    "dim_ll_uap_ind_codes": LL_UAP_IND_CODES,
+    "dim_ll_assumed_can_codes": LL_ASSUMED_CAN_CODES,
+    "dim_ll_assumed_name_type_codes": LL_ASSUMED_NAME_TYPE_CODES,
+    "dim_ll_mm_type_codes": LL_MM_TYPE_CODES,
+    "dim_ll_series_status_codes": LL_SERIES_STATUS_CODES,
+}
+
+# Records are copied from the Arrow cache into the store this many at a time, so exporting
+# a table never holds more than one batch of it in memory
+EXPORT_BATCH_SIZE = 100_000
+
+
+def get_store_path(DATA_DIR: Path, cache_dir: Optional[Path] = None) -> Path:
+    cache_dir = get_cache_dir(DATA_DIR=DATA_DIR, cache_dir=cache_dir)
+    return cache_dir.joinpath(f"sos__v{LAYOUT_VERSION}.sqlite")
+
+
+def get_column_type(arrow_type: pa.DataType) -> str:
+    # Dates are stored as ISO "YYYY-MM-DD" text, which sorts and compares as dates and
+    # works with SQLite's date functions
+    if pa.types.is_integer(arrow_type) or pa.types.is_boolean(arrow_type):
+        return "INTEGER"
+    if pa.types.is_floating(arrow_type):
+        return "REAL"
+    return "TEXT"
+
+
+def to_sqlite_rows(batch_df: pd.DataFrame) -> Sequence[tuple]:
+    columns = []
+    for column in batch_df.columns:
+        column_ser = batch_df[column]
+        if pd.api.types.is_datetime64_any_dtype(column_ser):
+            dates = column_ser.to_numpy().astype("datetime64[D]").astype(str)
+            columns.append(np.where(column_ser.isna(), None, dates).tolist())
+        else:
+            column_ser = column_ser.astype(object)
+            columns.append(column_ser.where(column_ser.notna(), None).tolist())
+    return list(zip(*columns))
+
+
+def export_table(connection: sqlite3.Connection, table_name: str, cache_path: Path) -> int:
+    # Copies the cached table into the store batch by batch, then indexes its file number
+    arrow_table = feather.read_table(cache_path, memory_map=True)
+    column_names = arrow_table.schema.names
+    column_definitions = ", ".join(
+        f'"{field.name}" {get_column_type(arrow_type=field.type)}' for field in arrow_table.schema
+    )
+    connection.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+    connection.execute(f'CREATE TABLE "{table_name}" ({column_definitions})')
+    insert_sql = f'INSERT INTO "{table_name}" VALUES ({", ".join("?" * len(column_names))})'
+    for batch in arrow_table.to_batches(max_chunksize=EXPORT_BATCH_SIZE):
+        connection.executemany(insert_sql, to_sqlite_rows(batch_df=batch.to_pandas()))
+    connection.execute(
+        f'CREATE INDEX "{table_name}__{column_names[0]}" ON "{table_name}" ("{column_names[0]}")'
+    )
+    return arrow_table.num_rows
+
+
+def export_dimension_tables(connection: sqlite3.Connection) -> None:
+    for dimension_name, code_map in DIMENSION_TABLES.items():
+        connection.execute(f'DROP TABLE IF EXISTS "{dimension_name}"')
+        connection.execute(
+            f'CREATE TABLE "{dimension_name}" (code TEXT PRIMARY KEY, description TEXT)'
+        )
+        connection.executemany(
+            f'INSERT INTO "{dimension_name}" VALUES (?, ?)', list(code_map.items())
+        )
+
+
+def build_store(DATA_DIR: Path, cache_dir: Optional[Path] = None, refresh: bool = False) -> Path:
+    # Materializes every table whose source file is in DATA_DIR, plus the code tables, into
+    # one SQLite file beside the Arrow cache. Tables whose cached source hasn't changed
+    # since they were exported are left alone.
+    store_path = get_store_path(DATA_DIR=DATA_DIR, cache_dir=cache_dir)
+    connection = sqlite3.connect(store_path)
+    try:
+        # The store can always be rebuilt from the cache, so writes skip the journal
+        connection.execute("PRAGMA journal_mode = OFF")
+        connection.execute("PRAGMA synchronous = OFF")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS store_sources (table_name TEXT PRIMARY KEY, source TEXT)"
+        )
+        sources = dict(connection.execute("SELECT table_name, source FROM store_sources"))
+        for table_name, table_spec in TABLES.items():
+            if not DATA_DIR.joinpath(table_spec.file_name).is_file():
+                print(
+                    f"No {table_spec.file_name} found in DATA_DIR, skipping the {table_name} table"
+                )
+                continue
+            cache_path = build_cached_table(
+                table_name=table_name, DATA_DIR=DATA_DIR, cache_dir=cache_dir
+            )
+            if not refresh and sources.get(table_name) == cache_path.name:
+                continue
+            n_rows = export_table(
+                connection=connection, table_name=table_name, cache_path=cache_path
+            )
+            connection.execute(
+                "INSERT OR REPLACE INTO store_sources VALUES (?, ?)", (table_name, cache_path.name)
+            )
+            connection.commit()
+            print(f"Exported {n_rows:>8} records to the {table_name} table")
+        export_dimension_tables(connection=connection)
+        connection.execute("ANALYZE")
+        connection.commit()
+    finally:
+        connection.close()
+    return store_path
+
+
+def connect_store(store_path: Path) -> sqlite3.Connection:
+    # Read-only; SQLite pages the tables in from disk as queries need them, and sorts or
+    # groups too big for its cache spill to temporary files, so results needn't fit in memory
+    if not store_path.is_file():
+        raise Exception(f"No store found at the entered store_path\n  - {store_path}")
+    return sqlite3.connect(f"{store_path.as_uri()}?mode=ro", uri=True)
+
+
+def query_store(sql: str, store_path: Path, params: Sequence[Any] = ()) -> pd.DataFrame:
+    connection = connect_store(store_path=store_path)
+    try:
+        return pd.read_sql_query(sql, connection, params=params)
+    finally:
+        connection.close()
+
+
+def iter_query_store(
+    sql: str, store_path: Path, params: Sequence[Any] = (), chunk_size: int = 100_000
+) -> Iterator[pd.DataFrame]:
+    # For results too large to load at once
+    connection = connect_store(store_path=store_path)
+    try:
+        yield from pd.read_sql_query(sql, connection, params=params, chunksize=chunk_size)
+    finally:
+        connection.close()
@@ -0,0 +1,361 @@
+from pathlib import Path
+from typing import Dict, List, Optional
+import zipfile
+
+import numpy as np
+
+from layouts import Field
+from transformers import TABLES, get_field_codes
+
+# Width given to a layout's last field when it runs to the end of the record
+OPEN_FIELD_WIDTH = 120
+
+NAME_WORDS = [
+    "ACME",
+    "ADVANCED",
+    "ALLIANCE",
+    "AMERICAN",
+    "APEX",
+    "ASSOCIATES",
+    "BLUE",
+    "BUILDERS",
+    "CAPITAL",
+    "CENTRAL",
+    "CHICAGO",
+    "CITY",
+    "CONSULTING",
+    "CREATIVE",
+    "DEVELOPMENT",
+    "EAGLE",
+    "ENTERPRISES",
+    "FAMILY",
+    "FIRST",
+    "GENERAL",
+    "GLOBAL",
+    "GOLDEN",
+    "GREAT",
+    "GROUP",
+    "HEALTH",
+    "HOLDINGS",
+    "HOME",
+    "ILLINOIS",
+    "INTERNATIONAL",
+    "INVESTMENTS",
+    "LAKE",
+    "MANAGEMENT",
+    "MEDICAL",
+    "MIDWEST",
+    "NATIONAL",
+    "NORTH",
+    "PARTNERS",
+    "PRAIRIE",
+    "PROPERTIES",
+    "REAL",
+    "ESTATE",
+    "SERVICES",
+    "SOLUTIONS",
+    "SOUTH",
+    "STAR",
+    "SYSTEMS",
+    "TECHNOLOGIES",
+    "TRANSPORT",
+    "UNITED",
+    "VENTURES",
+    "WEST",
+    "WINDY",
+    "ZION",
+]
+NAME_SUFFIXES = ["INC.", "INC", "CORP.", "CORPORATION", "CO.", "LLC", "L.L.C.", "LTD."]
+STREET_SUFFIXES = ["ST", "ST.", "AVE", "AVENUE", "RD", "ROAD", "DR", "BLVD", "LN", "CT"]
+CITIES = [
+    "CHICAGO",
+    "SPRINGFIELD",
+    "NAPERVILLE",
+    "AURORA",
+    "JOLIET",
+    "ROCKFORD",
+    "PEORIA",
+    "ELGIN",
+    "CHAMPAIGN",
+    "WAUKEGAN",
+    "CICERO",
+    "EVANSTON",
+    "SCHAUMBURG",
+    "BLOOMINGTON",
+    "DECATUR",
+    "OAK PARK",
+    "SKOKIE",
+    "ST. LOUIS",
+    "MILWAUKEE",
+    "NEW YORK",
+]
+STOCK_CLASSES = [
+    "COMMON",
+    "COMMON",
+    "COMMON",
+    "COM",
+    "COM.",
+    "PREFERRED",
+    "PFD",
+    "CLASS A COMMON",
+    "CLASS B COMMON",
+    "CL A",
+    "CLASS A",
+    "SERIES A PREFERRED",
+    "NON-VOTING COMMON",
+    "CAPITAL",
+    "COMMON NO PAR",
+    "CUMULATIVE PREFERRED",
+]
+
+# Shares of date fields holding the all-zero sentinel, left blank, or not a real date
+ZERO_DATE_RATE = 0.2
+BLANK_DATE_RATE = 0.03
+INVALID_DATE_RATE = 0.001
+# Shares of coded fields left blank or holding a code missing from the code dict
+BLANK_CODE_RATE = 0.02
+UNKNOWN_CODE_RATE = 0.002
+# Share of "int" amount fields that are zero
+ZERO_AMOUNT_RATE = 0.3
+# Distinct values in each generated name/street pool
+POOL_SIZE = 50_000
+# Tables with a single row per file number; the rest average MEAN_ROWS_PER_FILE_NUMBER
+SINGLE_ROW_TABLES = ["corp_master", "corp_name", "corp_other", "ll_master", "ll_name"]
+MEAN_ROWS_PER_FILE_NUMBER = 1.5
+# Gaps between consecutive file numbers are drawn from 1 through this, or less for files
+# with too many records for their file numbers to fit in the file number field
+MAX_FILE_NUMBER_STEP = 3
+
+
+def get_record_width(layout: List[Field]) -> int:
+    return max(start + OPEN_FIELD_WIDTH if end is None else end for _, start, end, _ in layout)
+
+
+def to_char_matrix(values: List[str], width: int) -> np.ndarray:
+    # (len(values), width) uint8 matrix of the values, blank padded and cut to width
+    padded_values = np.array([value[:width].ljust(width) for value in values], dtype=f"S{width}")
+    return padded_values.view(np.uint8).reshape(len(values), width)
+
+
+def write_digits(records: np.ndarray, start: int, end: int, values: np.ndarray) -> None:
+    # Right-aligned, zero-padded decimal digits of values into records[:, start:end]
+    for position in range(end - 1, start - 1, -1):
+        records[:, position] = ord("0") + values % 10
+        values = values // 10
+
+
+def draw_codes(codes: List[str], n_records: int, rng: np.random.Generator) -> np.ndarray:
+    # Codes in dict order with Zipf-like frequencies (the first codes listed, like
+    # "Goodstanding", are the common ones), plus a few blanks and unknown codes
+    width = max(len(code) for code in codes)
+    weights = 1 / np.arange(1, len(codes) + 1) ** 1.2
+    choices = rng.choice(len(codes), size=n_records, p=weights / weights.sum())
+    code_matrix = to_char_matrix(values=codes + [" " * width, "?" * width], width=width)
+    uniform = rng.random(n_records)
+    choices[uniform < BLANK_CODE_RATE] = len(codes)
+    choices[uniform > 1 - UNKNOWN_CODE_RATE] = len(codes) + 1
+    return code_matrix[choices]
+
+
+def get_date_pool() -> np.ndarray:
+    # (n_days, 8) uint8 matrix of every YYYYMMDD date from 1900 through 2022
+    days = np.arange(np.datetime64("1900-01-01"), np.datetime64("2023-01-01"))
+    date_strings = np.datetime_as_string(days, unit="D").astype("S10")
+    date_pool = date_strings.view(np.uint8).reshape(len(days), 10)[:, [0, 1, 2, 3, 5, 6, 8, 9]]
+    return np.ascontiguousarray(date_pool)
+
+
+def draw_dates(n_records: int, rng: np.random.Generator) -> np.ndarray:
+    date_pool = get_date_pool()
+    date_matrix = date_pool[rng.integers(0, len(date_pool), n_records)]
+    uniform = rng.random(n_records)
+    date_matrix[uniform < ZERO_DATE_RATE] = ord("0")
+    is_blank = (uniform >= ZERO_DATE_RATE) & (uniform < ZERO_DATE_RATE + BLANK_DATE_RATE)
+    date_matrix[is_blank] = ord(" ")
+    # month 13
+    date_matrix[uniform > 1 - INVALID_DATE_RATE, 4:6] = np.frombuffer(b"13", dtype=np.uint8)
+    return date_matrix
+
+
+def draw_amounts(n_records: int, width: int, rng: np.random.Generator) -> np.ndarray:
+    # Log-uniform amounts that fit in width digits, some of them zero
+    n_digits = min(width, 18)
+    values = np.floor(10 ** rng.uniform(0, n_digits, n_records)).astype(np.int64)
+    values[rng.random(n_records) < ZERO_AMOUNT_RATE] = 0
+    values = np.minimum(values, 10**n_digits - 1)
+    digit_matrix = np.full((n_records, width), ord("0"), dtype=np.uint8)
+    write_digits(digit_matrix, start=0, end=width, values=values)
+    return digit_matrix
+
+
+def make_value_pool(field_name: str, rng: np.random.Generator) -> Optional[List[str]]:
+    # Realistic-looking values for free-text fields, by field name; None for fields that
+    # just get random letters
+    if "stock_class" in field_name:
+        return STOCK_CLASSES
+    if "city" in field_name:
+        return CITIES
+    if "zip" in field_name:
+        zip5 = rng.integers(60_000, 63_000, POOL_SIZE)
+        zip4 = rng.integers(0, 10_000, POOL_SIZE)
+        has_zip4 = rng.random(POOL_SIZE) < 0.3
+        return [
+            f"{zip5[i]:05d}{zip4[i]:04d}" if has_zip4[i] else f"{zip5[i]:05d}"
+            for i in range(POOL_SIZE)
+        ]
+    if "street" in field_name or "addr" in field_name:
+        numbers = rng.integers(1, 20_000, POOL_SIZE)
+        words = rng.choice(NAME_WORDS, POOL_SIZE)
+        suffixes = rng.choice(STREET_SUFFIXES, POOL_SIZE)
+        return [f"{numbers[i]} {words[i]} {suffixes[i]}" for i in range(POOL_SIZE)]
+    if "name" in field_name:
+        n_words = rng.integers(1, 4, POOL_SIZE)
+        words = rng.choice(NAME_WORDS, (POOL_SIZE, 3))
+        suffixes = rng.choice(NAME_SUFFIXES, POOL_SIZE)
+        return [" ".join(list(words[i, : n_words[i]]) + [suffixes[i]]) for i in range(POOL_SIZE)]
+    return None
+
+
+def get_max_file_number_step(n_records: int, n_chunks: int, width: int) -> int:
+    # The largest gap between file numbers that keeps the last of n_records within width
+    # digits; each chunk after the first also starts one past the previous chunk's last
+    max_step = min(MAX_FILE_NUMBER_STEP, (10**width - 1 - n_chunks) // max(n_records, 1))
+    if max_step < 1:
+        raise Exception(f"Too many records for {width} digit file numbers: {n_records}")
+    return max_step
+
+
+def generate_file_numbers(
+    n_records: int,
+    first_file_number: int,
+    mean_rows_per_file_number: float,
+    rng,
+    max_step: int = MAX_FILE_NUMBER_STEP,
+) -> np.ndarray:
+    # Ascending file numbers with gaps, each repeated for a geometric number of rows
+    if mean_rows_per_file_number <= 1:
+        rows_per_file_number = np.ones(n_records, dtype=np.int64)
+    else:
+        rows_per_file_number = rng.geometric(1 / mean_rows_per_file_number, n_records)
+    file_numbers = first_file_number + np.cumsum(rng.integers(1, max_step + 1, n_records))
+    return np.repeat(file_numbers, rows_per_file_number)[:n_records]
+
+
+def generate_records(
+    layout: List[Field],
+    n_records: int,
+    rng: np.random.Generator,
+    table_name: Optional[str] = None,
+    first_file_number: int = 0,
+    mean_rows_per_file_number: float = 1.0,
+    max_file_number_step: int = MAX_FILE_NUMBER_STEP,
+) -> np.ndarray:
+    # (n_records, record_width) uint8 matrix of records for layout. File numbers ascend
+    # from first_file_number, coded fields follow their code dicts, date fields mix real
+    # dates with the zero/blank sentinels, and text fields come from name-like pools.
+    records = np.full((n_records, get_record_width(layout)), ord(" "), dtype=np.uint8)
+    field_codes = get_field_codes(table_name=table_name)
+    for field_number, (field_name, start, end, dtype) in enumerate(layout):
+        end = records.shape[1] if end is None else end
+        width = end - start
+        if field_number == 0:
+            file_numbers = generate_file_numbers(
+                n_records=n_records,
+                first_file_number=first_file_number,
+                mean_rows_per_file_number=mean_rows_per_file_number,
+                rng=rng,
+                max_step=max_file_number_step,
+            )
+            if len(file_numbers) > 0 and file_numbers[-1] >= 10**width:
+                raise Exception(f"File number {file_numbers[-1]} doesn't fit in {width} digits")
+            write_digits(records, start=start, end=end, values=file_numbers)
+        elif field_name in field_codes:
+            codes = list(field_codes[field_name].keys())
+            records[:, start:end] = draw_codes(codes=codes, n_records=n_records, rng=rng)[:, :width]
+        elif dtype == "date":
+            records[:, start:end] = draw_dates(n_records=n_records, rng=rng)[:, :width]
+        elif dtype == "int":
+            records[:, start:end] = draw_amounts(n_records=n_records, width=width, rng=rng)
+        else:
+            value_pool = make_value_pool(field_name=field_name, rng=rng)
+            if value_pool is None:
+                letters = np.frombuffer(b"ABCDEFGHIJKLMNOPQRSTUVWXYZ ", dtype=np.uint8)
+                records[:, start:end] = letters[rng.integers(0, len(letters), (n_records, width))]
+            else:
+                pool_matrix = to_char_matrix(values=value_pool, width=width)
+                records[:, start:end] = pool_matrix[rng.integers(0, len(pool_matrix), n_records)]
+    return records
+
+
+def write_synthetic_file(
+    file_path: Path,
+    layout: List[Field],
+    n_records: int,
+    seed: int = 0,
+    table_name: Optional[str] = None,
+    mean_rows_per_file_number: float = 1.0,
+    chunk_size: int = 1_000_000,
+    compresslevel: int = 1,
+) -> Path:
+    # Streams n_records generated records chunk_size at a time into an SOS-style zip
+    # member: metadata header, CRLF-terminated records and an END OF FILE RECORD COUNT
+    # trailer. Memory stays bounded by chunk_size, so files of tens of millions of records
+    # are fine; compresslevel 1 keeps deflate from dominating the run time.
+    rng = np.random.default_rng(seed)
+    record_width = get_record_width(layout)
+    header = f"RUN DATE=20221007   FILE:SYNTHETIC {file_path.stem.upper()} DATA\r\n"
+    trailer = f"END OF FILE RECORD COUNT= {n_records:07d}\r\n"
+    _, file_number_start, file_number_end, _ = layout[0]
+    max_file_number_step = get_max_file_number_step(
+        n_records=n_records,
+        n_chunks=-(-n_records // chunk_size),
+        width=file_number_end - file_number_start,
+    )
+    next_file_number = 0
+    with zipfile.ZipFile(
+        file_path, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=compresslevel
+    ) as zf:
+        with zf.open(file_path.name.replace(".zip", ".txt"), "w", force_zip64=True) as f:
+            f.write(header.encode(encoding="latin1"))
+            for chunk_start in range(0, n_records, chunk_size):
+                n_chunk_records = min(chunk_size, n_records - chunk_start)
+                records = generate_records(
+                    layout=layout,
+                    n_records=n_chunk_records,
+                    rng=rng,
+                    table_name=table_name,
+                    first_file_number=next_file_number,
+                    mean_rows_per_file_number=mean_rows_per_file_number,
+                    max_file_number_step=max_file_number_step,
+                )
+                next_file_number = int(records[-1, file_number_start:file_number_end].tobytes()) + 1
+                lines = np.empty((n_chunk_records, record_width + 2), dtype=np.uint8)
+                lines[:, :record_width] = records
+                lines[:, record_width:] = np.frombuffer(b"\r\n", dtype=np.uint8)
+                f.write(lines.tobytes())
+            f.write(trailer.encode(encoding="latin1"))
+    return file_path
+
+
+def write_synthetic_data(
+    DATA_DIR: Path, n_records: int, table_names: Optional[List[str]] = None, seed: int = 0
+) -> Dict[str, Path]:
+    # Writes a synthetic file of n_records for each of table_names (default: every table)
+    # into DATA_DIR under its real file name, so the usual transforms and loaders read it.
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    if table_names is None:
+        table_names = list(TABLES.keys())
+    file_paths = {}
+    for table_number, table_name in enumerate(table_names):
+        table_spec = TABLES[table_name]
+        file_paths[table_name] = write_synthetic_file(
+            file_path=DATA_DIR.joinpath(table_spec.file_name),
+            layout=table_spec.layout,
+            n_records=n_records,
+            seed=seed + table_number,
+            table_name=table_name,
+            mean_rows_per_file_number=(
+                1.0 if table_name in SINGLE_ROW_TABLES else MEAN_ROWS_PER_FILE_NUMBER
+            ),
+        )
+    return file_paths
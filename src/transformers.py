@@ -1,11 +1,22 @@
 from copy import copy
+from functools import partial
+import operator
 from pathlib import Path
-from typing import List
+import re
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
 import zipfile
 
+import numpy as np
 import pandas as pd
 
+from backends import get_backend, map_arrow_codes
+from decoders import decode_dates, decode_ints, parse_typed_fields
 from extractors import (
+    lines_to_char_matrix,
+    map_data_records,
+    read_data_records,
+    unpack_member,
+    slice_fixed_width_fields,
     read_file_lines,
     extract_data_from_lines,
     parse_corp_master_data,
@@ -15,6 +26,31 @@ from extractors import (
     parse_corp_assumed_old_name_data,
     parse_corp_stock_data,
     parse_corp_other_data,
+    parse_ll_master_data,
+    parse_ll_name_data,
+    parse_ll_annual_reports_data,
+    parse_ll_assumed_name_data,
+    parse_ll_old_name_data,
+    parse_ll_manager_data,
+    parse_ll_series_names_data,
+)
+from instrumentation import instrumented
+from layouts import (
+    CORP_MASTER_LAYOUT,
+    CORP_NAME_LAYOUT,
+    CORP_AGENT_LAYOUT,
+    CORP_ANNUAL_REPORTS_LAYOUT,
+    CORP_ASSUMED_OLD_NAME_LAYOUT,
+    CORP_STOCK_LAYOUT,
+    CORP_OTHER_LAYOUT,
+    LL_MASTER_LAYOUT,
+    LL_NAME_LAYOUT,
+    LL_ANNUAL_REPORTS_LAYOUT,
+    LL_ASSUMED_NAME_LAYOUT,
+    LL_OLD_NAME_LAYOUT,
+    LL_MANAGER_LAYOUT,
+    LL_SERIES_NAMES_LAYOUT,
+    Field,
 )
 
 CORP_STATUS_CODES = {
@@ -498,267 +534,1035 @@ REVENUE_IND_CODES = {
     " ": "Revenue Indicator never set",
 }
 
+LL_STATUS_CODES = {
+    "00": "Goodstanding",
+    "01": "Reinstated",
+    "02": "NGS",
+    "03": "Domesticated",
+    "04": "Converted",
+    "05": "Agent Vacated",
+    "06": "Withdrawn",
+    "07": "Revoked",
+    "08": "Voluntary Diss./Terminated",
+    "09": "Involuntary Dissolution",
+    "10": "Merged",
+    "11": "Dissolved",
+    "12": "Void",
+    "13": "Bankruptcy",
+    "14": "Incomplete File",
+}
 
-def transform_corp_master_data(DATA_DIR: Path) -> pd.DataFrame:
-    lines = read_file_lines(file_path=DATA_DIR.joinpath("cdxallmst.zip"))
-    line_df = extract_data_from_lines(lines=lines)
-    corp_master_df = parse_corp_master_data(line_df=line_df)
-    corp_master_df["corp_incorp_date"] = pd.to_datetime(
-        corp_master_df["corp_incorp_date"], errors="coerce"
+LL_MANAGEMENT_TYPE_CODES = {
+    "0": "No type selected (Foreign only)",
+    "1": "Member Managed",
+    "2": "Manager Managed",
+    "3": "Member and Manager Managed",
+}
+
+LL_ASSUMED_IND_CODES = {
+    "0": "No assumed name",
+    "1": "Assumed name on file",
+}
+
+LL_OLD_IND_CODES = {
+    "0": "No old name",
+    "1": "Old name on file",
+}
+
+LL_PROVISIONS_IND_CODES = {
+    "0": "No provisions selected",
+    "1": "Some, but not all, provisions selected",
+    "2": "All provisions selected",
+}
+
+LL_OPT_IND_CODES = {
+    "0": "Did not opt in",
+    "1": "Opted in",
+}
+
+LL_SERIES_IND_CODES = {
+    "Y": "Is a designator",
+    " ": "Not a designator",
+}
+
+LL_UAP_IND_CODES = {
+    "Y": "Unacceptable Payment",
+    "N": "Not an Unacceptable Payment",
+}
+
+LL_L3C_IND_CODES = {
+    " ": "No indicator",
+    "N": "No indicator",
+    "W": "LWCA designation",
+    "Y": "L3C designation",
+}
+
+# "0" isn't in the published code list but is what uncancelled assumed names carry.
+LL_ASSUMED_CAN_CODES = {
+    "0": "Not cancelled",
+    "1": "Voluntary cancellation",
+    "2": "Involuntary cancellation",
+}
+
+LL_ASSUMED_NAME_TYPE_CODES = {
+    "0": "Assumed name",
+    "1": "Foreign assumed name",
+}
+
+LL_MM_TYPE_CODES = {
+    "1": "Manager",
+    "2": "Member",
+    "3": "Manager and Member",
+}
+
+LL_SERIES_STATUS_CODES = {
+    "00": "Active",
+    "01": "Terminated",
+    "02": "Involuntary Terminated",
+    "03": "Merged",
+}
+
+# Code dict each coded field's values come from
+FIELD_CODES = {
+    "corp_state_code": STATE_CODES,
+    "corp_corp_intent": {**CORP_FOR_PROFIT_INTENT_CODES, **CORP_NON_PROFIT_INTENT_CODES},
+    "corp_status": CORP_STATUS_CODES,
+    "corp_type_corp": CORP_TYPE_CODES,
+    "corp_agent_code": CORP_AGENT_CODES,
+    "corp_agent_county_code": NUMERIC_COUNTY_CODES,
+    "corp_assumed_old_ind": ASSUMED_OLD_IND_CODES,
+    "corp_voting_rights": VOTING_RIGHTS_CODES,
+    "corp_oth_hold_prorate": REPORT_OF_ISSUANCES_CODES,
+    "corp_oth_regulated_ind": OUTSIDE_REGULATOR_CODE,
+    "corp_oth_rec_name_length_ind": NAME_LENGTH_CODES,
+    "corp_oth_records_destroyed": RECORDS_DESTROYED_CODES,
+    "corp_oth_inc_letter_ind": INCREASED_LETTER_SENT_CODES,
+    "corp_oth_abinitio_ind": ABINITO_FEE_PROBLEM_CODES,
+    "corp_oth_assume_old_ind": OLD_NAME_AVAILABLE_CODES,
+    "corp_oth_sect_code": SECTION_CODES,
+    "corp_oth_revenue_ind": REVENUE_IND_CODES,
+    "ll_status_code": LL_STATUS_CODES,
+    "ll_management_type": LL_MANAGEMENT_TYPE_CODES,
+    "ll_juris_organized": STATE_CODES,
+    "ll_records_off_juris": STATE_CODES,
+    "ll_assumed_ind": LL_ASSUMED_IND_CODES,
+    "ll_old_ind": LL_OLD_IND_CODES,
+    "ll_provisions_ind": LL_PROVISIONS_IND_CODES,
+    "ll_opt_ind": LL_OPT_IND_CODES,
+    "ll_series_ind": LL_SERIES_IND_CODES,
+    "ll_uap_ind": LL_UAP_IND_CODES,
+    "ll_l3c_ind": LL_L3C_IND_CODES,
+    "ll_assumed_can_code": LL_ASSUMED_CAN_CODES,
+    "ll_mm_juris": STATE_CODES,
+    "ll_mm_type_code": LL_MM_TYPE_CODES,
+    "ll_series_status": LL_SERIES_STATUS_CODES,
+}
+
+# Fields whose values in the real files are LLC-style assumed name type codes, not the
+# master file's yes/no indicator that shares the field name
+TABLE_FIELD_CODES = {
+    "ll_assumed_name": {"ll_assumed_ind": LL_ASSUMED_NAME_TYPE_CODES},
+}
+
+
+def get_field_codes(table_name: str) -> Dict[str, Dict[str, str]]:
+    return {**FIELD_CODES, **TABLE_FIELD_CODES.get(table_name, {})}
+
+
+@instrumented("map")
+def map_codes(
+    code_ser: pd.Series, code_map: Dict[str, str], as_category: bool = False
+) -> pd.Series:
+    # With as_category, codes are decoded once per distinct description into a Categorical
+    # whose categories come from code_map, rather than holding one string per row. Codes
+    # that aren't in code_map become NaN either way, as with .map().
+    if get_backend() == "arrow" and isinstance(code_ser.dtype, pd.StringDtype):
+        return map_arrow_codes(code_ser=code_ser, code_map=code_map, as_category=as_category)
+    if not as_category:
+        return code_ser.map(code_map)
+    descriptions = pd.Index(list(dict.fromkeys(code_map.values())))
+    description_positions = descriptions.get_indexer(list(code_map.values()))
+    code_positions = pd.Index(list(code_map.keys())).get_indexer(code_ser)
+    category_codes = np.where(code_positions >= 0, description_positions[code_positions], -1)
+    return pd.Series(
+        pd.Categorical.from_codes(category_codes, categories=descriptions),
+        index=code_ser.index,
+        name=code_ser.name,
+    )
+
+
+# A row filter (column, operator, value), e.g. ("corp_status", "in", {"Goodstanding"}) or
+# ("corp_incorp_date", ">=", "2000-01-01"). Filters compare converted values and a record
+# is kept when it passes every filter.
+Filter = Tuple[str, str, Any]
+
+FILTER_OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": lambda column_ser, values: column_ser.isin(values),
+    "not in": lambda column_ser, values: ~column_ser.isin(values),
+}
+
+# Layout fields that a convert function renames, and output columns that it derives from a
+# layout field
+RENAMED_FIELDS = {"corp_oth_file_number": "corp_file_number"}
+DERIVED_COLUMN_SOURCES = {"corp_is_for_profit": "corp_corp_intent"}
+
+
+def get_layout_fields(columns: List[str], layout: List[Field]) -> List[Field]:
+    # The layout fields holding columns, in layout order. Columns are named as they are
+    # after conversion, so a renamed field goes by its new name.
+    field_names = [field_name for field_name, _, _, _ in layout]
+    column_sources = {
+        RENAMED_FIELDS.get(field_name, field_name): field_name for field_name in field_names
+    }
+    for column, source_name in DERIVED_COLUMN_SOURCES.items():
+        if source_name in field_names:
+            column_sources[column] = source_name
+    source_names = set()
+    for column in columns:
+        if column not in column_sources.keys():
+            raise Exception(f"Unknown column: {column}\n  - options: {list(column_sources)}")
+        source_names.add(column_sources[column])
+    return [field for field in layout if field[0] in source_names]
+
+
+def convert_projected_fields(
+    table_df: pd.DataFrame,
+    layout: List[Field],
+    convert: Optional[Callable[[pd.DataFrame], pd.DataFrame]],
+) -> pd.DataFrame:
+    # Runs the table's convert function on a subset of its fields. The fields that weren't
+    # sliced are stood in for by a blank categorical, which every decoder handles in one
+    # step; whatever the convert function makes of them is left for the caller to drop.
+    if convert is None:
+        return table_df
+    blank_codes = np.zeros(len(table_df), dtype=np.int8)
+    for field_name, _, _, _ in layout:
+        if field_name not in table_df.columns:
+            table_df[field_name] = pd.Categorical.from_codes(blank_codes, categories=[""])
+    return convert(table_df)
+
+
+def get_filter_mask(table_df: pd.DataFrame, filters: List[Filter]) -> np.ndarray:
+    is_kept = np.ones(len(table_df), dtype=bool)
+    for column, filter_operator, value in filters:
+        if filter_operator not in FILTER_OPERATORS.keys():
+            raise Exception(
+                f"Unknown filter operator: {filter_operator}\n  - options: {list(FILTER_OPERATORS)}"
+            )
+        is_match = FILTER_OPERATORS[filter_operator](table_df[column], value)
+        # Missing values never match
+        is_kept &= pd.Series(is_match).fillna(False).to_numpy(dtype=bool)
+    return is_kept
+
+
+def transform_projected_data(
+    line_df: pd.DataFrame,
+    layout: List[Field],
+    convert: Optional[Callable[[pd.DataFrame], pd.DataFrame]],
+    columns: Optional[List[str]] = None,
+    filters: Optional[List[Filter]] = None,
+) -> pd.DataFrame:
+    # Slices and converts only the fields behind columns (every column by default). The
+    # filter columns are sliced and converted first, over every record, and the rest only
+    # for the records that pass.
+    char_matrix = lines_to_char_matrix(lines=line_df["line"])
+    index = line_df.index
+    if filters is not None and len(filters) > 0:
+        filter_columns = list(dict.fromkeys(column for column, _, _ in filters))
+        filter_df = slice_fixed_width_fields(
+            char_matrix=char_matrix,
+            layout=get_layout_fields(columns=filter_columns, layout=layout),
+            index=index,
+        )
+        filter_df = convert_projected_fields(table_df=filter_df, layout=layout, convert=convert)
+        is_kept = get_filter_mask(table_df=filter_df, filters=filters)
+        char_matrix, index = char_matrix[is_kept], index[is_kept]
+    if columns is None:
+        table_df = slice_fixed_width_fields(char_matrix=char_matrix, layout=layout, index=index)
+        return convert(table_df) if convert is not None else table_df
+    table_df = slice_fixed_width_fields(
+        char_matrix=char_matrix,
+        layout=get_layout_fields(columns=columns, layout=layout),
+        index=index,
     )
-    corp_master_df["corp_extended_date"] = pd.to_datetime(
-        corp_master_df["corp_extended_date"], errors="coerce"
+    table_df = convert_projected_fields(table_df=table_df, layout=layout, convert=convert)
+    return table_df[columns]
+
+
+@instrumented("convert")
+def convert_corp_master_data(
+    corp_master_df: pd.DataFrame, as_category: bool = False
+) -> pd.DataFrame:
+    corp_master_df["corp_incorp_date"] = decode_dates(corp_master_df["corp_incorp_date"])
+    corp_master_df["corp_extended_date"] = decode_dates(corp_master_df["corp_extended_date"])
+    corp_master_df["corp_state_code"] = map_codes(
+        corp_master_df["corp_state_code"], code_map=STATE_CODES, as_category=as_category
     )
-    corp_master_df["corp_state_code"] = corp_master_df["corp_state_code"].map(STATE_CODES)
     corp_master_df["corp_is_for_profit"] = (
         corp_master_df["corp_corp_intent"].isin(CORP_FOR_PROFIT_INTENT_CODES.keys())
     ) & (corp_master_df["corp_corp_intent"] != "000")
     business_intent_codes = copy(CORP_FOR_PROFIT_INTENT_CODES)
     business_intent_codes.update(copy(CORP_NON_PROFIT_INTENT_CODES))
-    corp_master_df["corp_corp_intent"] = corp_master_df["corp_corp_intent"].map(
-        business_intent_codes
+    corp_master_df["corp_corp_intent"] = map_codes(
+        corp_master_df["corp_corp_intent"], code_map=business_intent_codes, as_category=as_category
+    )
+    corp_master_df["corp_status"] = map_codes(
+        corp_master_df["corp_status"], code_map=CORP_STATUS_CODES, as_category=as_category
     )
-    corp_master_df["corp_status"] = corp_master_df["corp_status"].map(CORP_STATUS_CODES)
-    corp_master_df["corp_type_corp"] = corp_master_df["corp_type_corp"].map(CORP_TYPE_CODES)
-    corp_master_df["corp_trans_date"] = pd.to_datetime(
-        corp_master_df["corp_trans_date"], errors="coerce"
+    corp_master_df["corp_type_corp"] = map_codes(
+        corp_master_df["corp_type_corp"], code_map=CORP_TYPE_CODES, as_category=as_category
     )
+    corp_master_df["corp_trans_date"] = decode_dates(corp_master_df["corp_trans_date"])
     return corp_master_df
 
 
-def transform_corp_name_data(DATA_DIR: Path) -> pd.DataFrame:
+@instrumented("transform")
+def transform_corp_master_data(
+    DATA_DIR: Path,
+    as_category: bool = False,
+    columns: Optional[List[str]] = None,
+    filters: Optional[List[Filter]] = None,
+) -> pd.DataFrame:
+    lines = read_file_lines(file_path=DATA_DIR.joinpath("cdxallmst.zip"))
+    line_df = extract_data_from_lines(lines=lines)
+    if columns is not None or filters is not None:
+        return transform_projected_data(
+            line_df=line_df,
+            layout=CORP_MASTER_LAYOUT,
+            convert=partial(convert_corp_master_data, as_category=as_category),
+            columns=columns,
+            filters=filters,
+        )
+    corp_master_df = parse_corp_master_data(line_df=line_df)
+    return convert_corp_master_data(corp_master_df=corp_master_df, as_category=as_category)
+
+
+@instrumented("transform")
+def transform_corp_name_data(
+    DATA_DIR: Path,
+    columns: Optional[List[str]] = None,
+    filters: Optional[List[Filter]] = None,
+) -> pd.DataFrame:
     lines = read_file_lines(file_path=DATA_DIR.joinpath("cdxallnam.zip"))
     line_df = extract_data_from_lines(lines=lines)
+    if columns is not None or filters is not None:
+        return transform_projected_data(
+            line_df=line_df,
+            layout=CORP_NAME_LAYOUT,
+            convert=None,
+            columns=columns,
+            filters=filters,
+        )
     corp_name_df = parse_corp_name_data(line_df=line_df)
     return corp_name_df
 
 
-def transform_corp_agent_data(DATA_DIR: Path) -> pd.DataFrame:
-    lines = read_file_lines(file_path=DATA_DIR.joinpath("cdxallagt.zip"))
-    line_df = extract_data_from_lines(lines=lines)
-    corp_agent_df = parse_corp_agent_data(line_df=line_df)
-    corp_agent_df["corp_agent_change_date"] = pd.to_datetime(
-        corp_agent_df["corp_agent_change_date"], errors="coerce"
+@instrumented("convert")
+def convert_corp_agent_data(corp_agent_df: pd.DataFrame, as_category: bool = False) -> pd.DataFrame:
+    corp_agent_df["corp_agent_change_date"] = decode_dates(corp_agent_df["corp_agent_change_date"])
+    corp_agent_df["corp_agent_code"] = map_codes(
+        corp_agent_df["corp_agent_code"], code_map=CORP_AGENT_CODES, as_category=as_category
     )
-    corp_agent_df["corp_agent_code"] = corp_agent_df["corp_agent_code"].map(CORP_AGENT_CODES)
-    corp_agent_df["corp_agent_county_code"] = corp_agent_df["corp_agent_county_code"].map(
-        NUMERIC_COUNTY_CODES
+    corp_agent_df["corp_agent_county_code"] = map_codes(
+        corp_agent_df["corp_agent_county_code"],
+        code_map=NUMERIC_COUNTY_CODES,
+        as_category=as_category,
     )
     return corp_agent_df
 
 
-def transform_corp_annual_report_data(DATA_DIR: Path) -> pd.DataFrame:
+@instrumented("transform")
+def transform_corp_agent_data(
+    DATA_DIR: Path,
+    as_category: bool = False,
+    columns: Optional[List[str]] = None,
+    filters: Optional[List[Filter]] = None,
+) -> pd.DataFrame:
+    lines = read_file_lines(file_path=DATA_DIR.joinpath("cdxallagt.zip"))
+    line_df = extract_data_from_lines(lines=lines)
+    if columns is not None or filters is not None:
+        return transform_projected_data(
+            line_df=line_df,
+            layout=CORP_AGENT_LAYOUT,
+            convert=partial(convert_corp_agent_data, as_category=as_category),
+            columns=columns,
+            filters=filters,
+        )
+    corp_agent_df = parse_corp_agent_data(line_df=line_df)
+    return convert_corp_agent_data(corp_agent_df=corp_agent_df, as_category=as_category)
+
+
+@instrumented("convert")
+def convert_corp_annual_report_data(corp_report_df: pd.DataFrame) -> pd.DataFrame:
+    corp_report_df["corp_cr_factor"] = decode_ints(corp_report_df["corp_cr_factor"])
+    corp_report_df["corp_cr_paid_amount"] = decode_ints(corp_report_df["corp_cr_paid_amount"])
+    corp_report_df["corp_cr_ar_cap"] = decode_ints(corp_report_df["corp_cr_ar_cap"])
+    corp_report_df["corp_cr_del_run_date"] = decode_dates(corp_report_df["corp_cr_del_run_date"])
+    corp_report_df["corp_cr_run_date"] = decode_dates(corp_report_df["corp_cr_run_date"])
+    corp_report_df["corp_cr_paid_batch_no"] = decode_ints(corp_report_df["corp_cr_paid_batch_no"])
+    corp_report_df["corp_cr_paid_date"] = decode_dates(corp_report_df["corp_cr_paid_date"])
+    corp_report_df["corp_pv_factor"] = decode_ints(corp_report_df["corp_pv_factor"])
+    corp_report_df["corp_pv_paid_amount"] = decode_ints(corp_report_df["corp_pv_paid_amount"])
+    corp_report_df["corp_pv_cap"] = decode_ints(corp_report_df["corp_pv_cap"])
+    corp_report_df["corp_pv_del_run_date"] = decode_dates(corp_report_df["corp_pv_del_run_date"])
+    corp_report_df["corp_pv_run_date"] = decode_dates(corp_report_df["corp_pv_run_date"])
+    corp_report_df["corp_pv_paid_batch_no"] = decode_ints(corp_report_df["corp_pv_paid_batch_no"])
+    corp_report_df["corp_pv_paid_date"] = decode_dates(corp_report_df["corp_pv_paid_date"])
+    return corp_report_df
+
+
+@instrumented("transform")
+def transform_corp_annual_report_data(
+    DATA_DIR: Path,
+    columns: Optional[List[str]] = None,
+    filters: Optional[List[Filter]] = None,
+) -> pd.DataFrame:
     lines = read_file_lines(file_path=DATA_DIR.joinpath("cdxallarp.zip"))
     line_df = extract_data_from_lines(lines=lines)
+    if columns is not None or filters is not None:
+        return transform_projected_data(
+            line_df=line_df,
+            layout=CORP_ANNUAL_REPORTS_LAYOUT,
+            convert=convert_corp_annual_report_data,
+            columns=columns,
+            filters=filters,
+        )
     corp_report_df = parse_corp_annual_reports_data(line_df=line_df)
-    corp_report_df["corp_cr_factor"] = corp_report_df["corp_cr_factor"].astype(int)
-    corp_report_df["corp_cr_paid_amount"] = corp_report_df["corp_cr_paid_amount"].astype(int)
-    corp_report_df["corp_cr_ar_cap"] = corp_report_df["corp_cr_ar_cap"].astype(int)
-    corp_report_df["corp_cr_del_run_date"] = pd.to_datetime(
-        corp_report_df["corp_cr_del_run_date"], errors="coerce"
-    )
-    corp_report_df["corp_cr_run_date"] = pd.to_datetime(
-        corp_report_df["corp_cr_run_date"], errors="coerce"
-    )
-    corp_report_df["corp_cr_paid_batch_no"] = corp_report_df["corp_cr_paid_batch_no"].astype(int)
-    corp_report_df["corp_cr_paid_date"] = pd.to_datetime(
-        corp_report_df["corp_cr_paid_date"], errors="coerce"
-    )
-    corp_report_df["corp_pv_factor"] = corp_report_df["corp_pv_factor"].astype(int)
-    corp_report_df["corp_pv_paid_amount"] = corp_report_df["corp_pv_paid_amount"].astype(int)
-    corp_report_df["corp_pv_cap"] = corp_report_df["corp_pv_cap"].astype(int)
-    corp_report_df["corp_pv_del_run_date"] = pd.to_datetime(
-        corp_report_df["corp_pv_del_run_date"], errors="coerce"
+    return convert_corp_annual_report_data(corp_report_df=corp_report_df)
+
+
+@instrumented("convert")
+def convert_corp_assumed_old_name_data(
+    corp_old_name_df: pd.DataFrame, as_category: bool = False
+) -> pd.DataFrame:
+    corp_old_name_df["corp_date_cancel"] = decode_dates(corp_old_name_df["corp_date_cancel"])
+    corp_old_name_df["corp_assumed_curr_date"] = decode_dates(
+        corp_old_name_df["corp_assumed_curr_date"]
     )
-    corp_report_df["corp_pv_run_date"] = pd.to_datetime(
-        corp_report_df["corp_pv_run_date"], errors="coerce"
+    corp_old_name_df["corp_assumed_old_ind"] = map_codes(
+        corp_old_name_df["corp_assumed_old_ind"],
+        code_map=ASSUMED_OLD_IND_CODES,
+        as_category=as_category,
     )
-    corp_report_df["corp_pv_paid_batch_no"] = corp_report_df["corp_pv_paid_batch_no"].astype(int)
-    corp_report_df["corp_pv_paid_date"] = pd.to_datetime(
-        corp_report_df["corp_pv_paid_date"], errors="coerce"
+    corp_old_name_df["corp_assumed_old_date"] = decode_dates(
+        corp_old_name_df["corp_assumed_old_date"]
     )
-    return corp_report_df
+    return corp_old_name_df
 
 
-def transform_corp_assumed_old_name_data(DATA_DIR: Path) -> pd.DataFrame:
+@instrumented("transform")
+def transform_corp_assumed_old_name_data(
+    DATA_DIR: Path,
+    as_category: bool = False,
+    columns: Optional[List[str]] = None,
+    filters: Optional[List[Filter]] = None,
+) -> pd.DataFrame:
     lines = read_file_lines(file_path=DATA_DIR.joinpath("cdxallaon.zip"))
     line_df = extract_data_from_lines(lines=lines)
+    if columns is not None or filters is not None:
+        return transform_projected_data(
+            line_df=line_df,
+            layout=CORP_ASSUMED_OLD_NAME_LAYOUT,
+            convert=partial(convert_corp_assumed_old_name_data, as_category=as_category),
+            columns=columns,
+            filters=filters,
+        )
     corp_old_name_df = parse_corp_assumed_old_name_data(line_df=line_df)
-    corp_old_name_df["corp_date_cancel"] = pd.to_datetime(
-        corp_old_name_df["corp_date_cancel"], errors="coerce"
-    )
-    corp_old_name_df["corp_assumed_curr_date"] = pd.to_datetime(
-        corp_old_name_df["corp_assumed_curr_date"], errors="coerce"
+    return convert_corp_assumed_old_name_data(
+        corp_old_name_df=corp_old_name_df, as_category=as_category
     )
-    corp_old_name_df["corp_assumed_old_ind"] = corp_old_name_df["corp_assumed_old_ind"].map(
-        ASSUMED_OLD_IND_CODES
-    )
-    corp_old_name_df["corp_assumed_old_date"] = pd.to_datetime(
-        corp_old_name_df["corp_assumed_old_date"], errors="coerce"
+
+
+@instrumented("convert")
+def convert_corp_stock_data(corp_stock_df: pd.DataFrame, as_category: bool = False) -> pd.DataFrame:
+    corp_stock_df["corp_voting_rights"] = map_codes(
+        corp_stock_df["corp_voting_rights"], code_map=VOTING_RIGHTS_CODES, as_category=as_category
     )
-    return corp_old_name_df
+    corp_stock_df["corp_authorized_shares"] = decode_ints(corp_stock_df["corp_authorized_shares"])
+    corp_stock_df["corp_issued_shares"] = decode_ints(corp_stock_df["corp_issued_shares"])
+    corp_stock_df["corp_par_value"] = decode_ints(corp_stock_df["corp_par_value"])
+    return corp_stock_df
 
 
-def transform_corp_stock_data(DATA_DIR: Path) -> pd.DataFrame:
+@instrumented("transform")
+def transform_corp_stock_data(
+    DATA_DIR: Path,
+    as_category: bool = False,
+    columns: Optional[List[str]] = None,
+    filters: Optional[List[Filter]] = None,
+) -> pd.DataFrame:
     lines = read_file_lines(file_path=DATA_DIR.joinpath("cdxallstk.zip"))
     line_df = extract_data_from_lines(lines=lines)
+    if columns is not None or filters is not None:
+        return transform_projected_data(
+            line_df=line_df,
+            layout=CORP_STOCK_LAYOUT,
+            convert=partial(convert_corp_stock_data, as_category=as_category),
+            columns=columns,
+            filters=filters,
+        )
     corp_stock_df = parse_corp_stock_data(line_df=line_df)
-    corp_stock_df["corp_voting_rights"] = corp_stock_df["corp_voting_rights"].map(
-        VOTING_RIGHTS_CODES
+    return convert_corp_stock_data(corp_stock_df=corp_stock_df, as_category=as_category)
+
+
+@instrumented("convert")
+def convert_corp_other_data(corp_other_df: pd.DataFrame, as_category: bool = False) -> pd.DataFrame:
+    corp_other_df["corp_oth_hold_prorate"] = map_codes(
+        corp_other_df["corp_oth_hold_prorate"],
+        code_map=REPORT_OF_ISSUANCES_CODES,
+        as_category=as_category,
     )
-    corp_stock_df["corp_authorized_shares"] = corp_stock_df["corp_authorized_shares"].astype(int)
-    corp_stock_df["corp_issued_shares"] = corp_stock_df["corp_issued_shares"].astype(int)
-    corp_stock_df["corp_par_value"] = corp_stock_df["corp_par_value"].astype(int)
-    return corp_stock_df
+    corp_other_df["corp_oth_regulated_ind"] = map_codes(
+        corp_other_df["corp_oth_regulated_ind"],
+        code_map=OUTSIDE_REGULATOR_CODE,
+        as_category=as_category,
+    )
+    corp_other_df["corp_oth_rec_name_length_ind"] = map_codes(
+        corp_other_df["corp_oth_rec_name_length_ind"],
+        code_map=NAME_LENGTH_CODES,
+        as_category=as_category,
+    )
+    corp_other_df["corp_oth_records_destroyed"] = map_codes(
+        corp_other_df["corp_oth_records_destroyed"],
+        code_map=RECORDS_DESTROYED_CODES,
+        as_category=as_category,
+    )
+    corp_other_df["corp_oth_cap_date"] = decode_dates(corp_other_df["corp_oth_cap_date"])
+    corp_other_df["corp_oth_inc_letter_ind"] = map_codes(
+        corp_other_df["corp_oth_inc_letter_ind"],
+        code_map=INCREASED_LETTER_SENT_CODES,
+        as_category=as_category,
+    )
+    corp_other_df["corp_oth_abinitio_ind"] = map_codes(
+        corp_other_df["corp_oth_abinitio_ind"],
+        code_map=ABINITO_FEE_PROBLEM_CODES,
+        as_category=as_category,
+    )
+    corp_other_df["corp_oth_assume_old_ind"] = map_codes(
+        corp_other_df["corp_oth_assume_old_ind"],
+        code_map=OLD_NAME_AVAILABLE_CODES,
+        as_category=as_category,
+    )
+    corp_other_df["corp_oth_duration_date"] = decode_dates(corp_other_df["corp_oth_duration_date"])
+    corp_other_df["corp_oth_total_cap"] = decode_ints(corp_other_df["corp_oth_total_cap"])
+    corp_other_df["corp_oth_tax_cap"] = decode_ints(corp_other_df["corp_oth_tax_cap"])
+    corp_other_df["corp_oth_ill_cap"] = decode_ints(corp_other_df["corp_oth_ill_cap"])
+    corp_other_df["corp_oth_cr_new_ill_cap"] = decode_ints(corp_other_df["corp_oth_cr_new_ill_cap"])
+    corp_other_df["corp_oth_pv_ill_cap"] = decode_ints(corp_other_df["corp_oth_pv_ill_cap"])
+    corp_other_df["corp_oth_fiscal_year"] = decode_dates(corp_other_df["corp_oth_fiscal_year"])
+    corp_other_df["corp_oth_sect_code"] = map_codes(
+        corp_other_df["corp_oth_sect_code"], code_map=SECTION_CODES, as_category=as_category
+    )
+    corp_other_df["corp_oth_stock_date"] = decode_dates(corp_other_df["corp_oth_stock_date"])
+    corp_other_df["corp_oth_revenue_ind"] = map_codes(
+        corp_other_df["corp_oth_revenue_ind"], code_map=REVENUE_IND_CODES, as_category=as_category
+    )
+    corp_other_df["corp_oth_date_last_chg"] = decode_dates(corp_other_df["corp_oth_date_last_chg"])
+    corp_other_df = corp_other_df.rename(columns=RENAMED_FIELDS)
+    return corp_other_df
 
 
-def transform_corp_other_data(DATA_DIR: Path) -> pd.DataFrame:
+@instrumented("transform")
+def transform_corp_other_data(
+    DATA_DIR: Path,
+    as_category: bool = False,
+    columns: Optional[List[str]] = None,
+    filters: Optional[List[Filter]] = None,
+) -> pd.DataFrame:
     lines = read_file_lines(file_path=DATA_DIR.joinpath("cdxalloth.zip"))
     line_df = extract_data_from_lines(lines=lines)
+    if columns is not None or filters is not None:
+        return transform_projected_data(
+            line_df=line_df,
+            layout=CORP_OTHER_LAYOUT,
+            convert=partial(convert_corp_other_data, as_category=as_category),
+            columns=columns,
+            filters=filters,
+        )
     corp_other_df = parse_corp_other_data(line_df=line_df)
-    corp_other_df["corp_oth_hold_prorate"] = corp_other_df["corp_oth_hold_prorate"].map(
-        REPORT_OF_ISSUANCES_CODES
+    return convert_corp_other_data(corp_other_df=corp_other_df, as_category=as_category)
+
+
+@instrumented("convert")
+def convert_ll_master_data(ll_master_df: pd.DataFrame, as_category: bool = False) -> pd.DataFrame:
+    ll_master_df["ll_status_code"] = map_codes(
+        ll_master_df["ll_status_code"], code_map=LL_STATUS_CODES, as_category=as_category
     )
-    corp_other_df["corp_oth_regulated_ind"] = corp_other_df["corp_oth_regulated_ind"].map(
-        OUTSIDE_REGULATOR_CODE
+    ll_master_df["ll_status_date"] = decode_dates(ll_master_df["ll_status_date"])
+    ll_master_df["ll_organized_date"] = decode_dates(ll_master_df["ll_organized_date"])
+    ll_master_df["ll_dissolution_date"] = decode_dates(ll_master_df["ll_dissolution_date"])
+    ll_master_df["ll_management_type"] = map_codes(
+        ll_master_df["ll_management_type"],
+        code_map=LL_MANAGEMENT_TYPE_CODES,
+        as_category=as_category,
     )
-    corp_other_df["corp_oth_rec_name_length_ind"] = corp_other_df[
-        "corp_oth_rec_name_length_ind"
-    ].map(NAME_LENGTH_CODES)
-    corp_other_df["corp_oth_records_destroyed"] = corp_other_df["corp_oth_records_destroyed"].map(
-        RECORDS_DESTROYED_CODES
+    ll_master_df["ll_assumed_ind"] = map_codes(
+        ll_master_df["ll_assumed_ind"], code_map=LL_ASSUMED_IND_CODES, as_category=as_category
     )
-    corp_other_df["corp_oth_cap_date"] = pd.to_datetime(
-        corp_other_df["corp_oth_cap_date"], errors="coerce"
+    ll_master_df["ll_old_ind"] = map_codes(
+        ll_master_df["ll_old_ind"], code_map=LL_OLD_IND_CODES, as_category=as_category
     )
-    corp_other_df["corp_oth_inc_letter_ind"] = corp_other_df["corp_oth_inc_letter_ind"].map(
-        INCREASED_LETTER_SENT_CODES
+    ll_master_df["ll_provisions_ind"] = map_codes(
+        ll_master_df["ll_provisions_ind"], code_map=LL_PROVISIONS_IND_CODES, as_category=as_category
     )
-    corp_other_df["corp_oth_abinitio_ind"] = corp_other_df["corp_oth_abinitio_ind"].map(
-        ABINITO_FEE_PROBLEM_CODES
+    ll_master_df["ll_opt_ind"] = map_codes(
+        ll_master_df["ll_opt_ind"], code_map=LL_OPT_IND_CODES, as_category=as_category
     )
-    corp_other_df["corp_oth_assume_old_ind"] = corp_other_df["corp_oth_assume_old_ind"].map(
-        OLD_NAME_AVAILABLE_CODES
+    ll_master_df["ll_series_ind"] = map_codes(
+        ll_master_df["ll_series_ind"], code_map=LL_SERIES_IND_CODES, as_category=as_category
     )
-    corp_other_df["corp_oth_duration_date"] = pd.to_datetime(
-        corp_other_df["corp_oth_duration_date"], errors="coerce"
+    ll_master_df["ll_uap_ind"] = map_codes(
+        ll_master_df["ll_uap_ind"], code_map=LL_UAP_IND_CODES, as_category=as_category
     )
-    corp_other_df["corp_oth_total_cap"] = corp_other_df["corp_oth_total_cap"].astype(int)
-    corp_other_df["corp_oth_tax_cap"] = corp_other_df["corp_oth_tax_cap"].astype(int)
-    corp_other_df["corp_oth_ill_cap"] = corp_other_df["corp_oth_ill_cap"].astype(int)
-    corp_other_df["corp_oth_cr_new_ill_cap"] = corp_other_df["corp_oth_cr_new_ill_cap"].astype(int)
-    corp_other_df["corp_oth_pv_ill_cap"] = corp_other_df["corp_oth_pv_ill_cap"].astype(int)
-    corp_other_df["corp_oth_fiscal_year"] = pd.to_datetime(
-        corp_other_df["corp_oth_fiscal_year"], errors="coerce"
+    ll_master_df["ll_l3c_ind"] = map_codes(
+        ll_master_df["ll_l3c_ind"], code_map=LL_L3C_IND_CODES, as_category=as_category
     )
-    corp_other_df["corp_oth_sect_code"] = corp_other_df["corp_oth_sect_code"].map(SECTION_CODES)
-    corp_other_df["corp_oth_stock_date"] = pd.to_datetime(
-        corp_other_df["corp_oth_stock_date"], errors="coerce"
+    return ll_master_df
+
+
+@instrumented("transform")
+def transform_ll_master_data(
+    DATA_DIR: Path,
+    as_category: bool = False,
+    columns: Optional[List[str]] = None,
+    filters: Optional[List[Filter]] = None,
+) -> pd.DataFrame:
+    lines = read_file_lines(file_path=DATA_DIR.joinpath("llcallmst.zip"))
+    line_df = extract_data_from_lines(lines=lines)
+    if columns is not None or filters is not None:
+        return transform_projected_data(
+            line_df=line_df,
+            layout=LL_MASTER_LAYOUT,
+            convert=partial(convert_ll_master_data, as_category=as_category),
+            columns=columns,
+            filters=filters,
+        )
+    ll_master_df = parse_ll_master_data(line_df=line_df)
+    return convert_ll_master_data(ll_master_df=ll_master_df, as_category=as_category)
+
+
+@instrumented("transform")
+def transform_ll_name_data(
+    DATA_DIR: Path,
+    columns: Optional[List[str]] = None,
+    filters: Optional[List[Filter]] = None,
+) -> pd.DataFrame:
+    lines = read_file_lines(file_path=DATA_DIR.joinpath("llcallnam.zip"))
+    line_df = extract_data_from_lines(lines=lines)
+    if columns is not None or filters is not None:
+        return transform_projected_data(
+            line_df=line_df,
+            layout=LL_NAME_LAYOUT,
+            convert=None,
+            columns=columns,
+            filters=filters,
+        )
+    ll_name_df = parse_ll_name_data(line_df=line_df)
+    return ll_name_df
+
+
+@instrumented("convert")
+def convert_ll_annual_report_data(ll_report_df: pd.DataFrame) -> pd.DataFrame:
+    ll_report_df["ll_cur_mail_date"] = decode_dates(ll_report_df["ll_cur_mail_date"])
+    ll_report_df["ll_cur_file_date"] = decode_dates(ll_report_df["ll_cur_file_date"])
+    ll_report_df["ll_cur_deliq_date"] = decode_dates(ll_report_df["ll_cur_deliq_date"])
+    ll_report_df["ll_cur_paid_amt"] = decode_ints(ll_report_df["ll_cur_paid_amt"])
+    ll_report_df["ll_cur_year_due"] = decode_ints(ll_report_df["ll_cur_year_due"])
+    ll_report_df["ll_pv_mail_date"] = decode_dates(ll_report_df["ll_pv_mail_date"])
+    ll_report_df["ll_pv_file_date"] = decode_dates(ll_report_df["ll_pv_file_date"])
+    ll_report_df["ll_pv_deliq_date"] = decode_dates(ll_report_df["ll_pv_deliq_date"])
+    ll_report_df["ll_pv_paid_amt"] = decode_ints(ll_report_df["ll_pv_paid_amt"])
+    ll_report_df["ll_pv_year_due"] = decode_ints(ll_report_df["ll_pv_year_due"])
+    return ll_report_df
+
+
+@instrumented("transform")
+def transform_ll_annual_report_data(
+    DATA_DIR: Path,
+    columns: Optional[List[str]] = None,
+    filters: Optional[List[Filter]] = None,
+) -> pd.DataFrame:
+    lines = read_file_lines(file_path=DATA_DIR.joinpath("llcallarp.zip"))
+    line_df = extract_data_from_lines(lines=lines)
+    if columns is not None or filters is not None:
+        return transform_projected_data(
+            line_df=line_df,
+            layout=LL_ANNUAL_REPORTS_LAYOUT,
+            convert=convert_ll_annual_report_data,
+            columns=columns,
+            filters=filters,
+        )
+    ll_report_df = parse_ll_annual_reports_data(line_df=line_df)
+    return convert_ll_annual_report_data(ll_report_df=ll_report_df)
+
+
+@instrumented("convert")
+def convert_ll_assumed_name_data(
+    ll_assumed_df: pd.DataFrame, as_category: bool = False
+) -> pd.DataFrame:
+    ll_assumed_df["ll_assumed_adopt_date"] = decode_dates(ll_assumed_df["ll_assumed_adopt_date"])
+    ll_assumed_df["ll_assumed_can_date"] = decode_dates(ll_assumed_df["ll_assumed_can_date"])
+    ll_assumed_df["ll_assumed_can_code"] = map_codes(
+        ll_assumed_df["ll_assumed_can_code"],
+        code_map=LL_ASSUMED_CAN_CODES,
+        as_category=as_category,
     )
-    corp_other_df["corp_oth_revenue_ind"] = corp_other_df["corp_oth_revenue_ind"].map(
-        REVENUE_IND_CODES
+    ll_assumed_df["ll_assumed_renew_year"] = decode_ints(ll_assumed_df["ll_assumed_renew_year"])
+    ll_assumed_df["ll_assumed_renew_date"] = decode_dates(ll_assumed_df["ll_assumed_renew_date"])
+    ll_assumed_df["ll_assumed_ind"] = map_codes(
+        ll_assumed_df["ll_assumed_ind"],
+        code_map=LL_ASSUMED_NAME_TYPE_CODES,
+        as_category=as_category,
     )
-    corp_other_df["corp_oth_date_last_chg"] = pd.to_datetime(
-        corp_other_df["corp_oth_date_last_chg"], errors="coerce"
+    return ll_assumed_df
+
+
+@instrumented("transform")
+def transform_ll_assumed_name_data(
+    DATA_DIR: Path,
+    as_category: bool = False,
+    columns: Optional[List[str]] = None,
+    filters: Optional[List[Filter]] = None,
+) -> pd.DataFrame:
+    lines = read_file_lines(file_path=DATA_DIR.joinpath("llcallase.zip"))
+    line_df = extract_data_from_lines(lines=lines)
+    if columns is not None or filters is not None:
+        return transform_projected_data(
+            line_df=line_df,
+            layout=LL_ASSUMED_NAME_LAYOUT,
+            convert=partial(convert_ll_assumed_name_data, as_category=as_category),
+            columns=columns,
+            filters=filters,
+        )
+    ll_assumed_df = parse_ll_assumed_name_data(line_df=line_df)
+    return convert_ll_assumed_name_data(ll_assumed_df=ll_assumed_df, as_category=as_category)
+
+
+@instrumented("convert")
+def convert_ll_old_name_data(ll_old_name_df: pd.DataFrame) -> pd.DataFrame:
+    ll_old_name_df["ll_old_date_filed"] = decode_dates(ll_old_name_df["ll_old_date_filed"])
+    return ll_old_name_df
+
+
+@instrumented("transform")
+def transform_ll_old_name_data(
+    DATA_DIR: Path,
+    columns: Optional[List[str]] = None,
+    filters: Optional[List[Filter]] = None,
+) -> pd.DataFrame:
+    lines = read_file_lines(file_path=DATA_DIR.joinpath("llcallold.zip"))
+    line_df = extract_data_from_lines(lines=lines)
+    if columns is not None or filters is not None:
+        return transform_projected_data(
+            line_df=line_df,
+            layout=LL_OLD_NAME_LAYOUT,
+            convert=convert_ll_old_name_data,
+            columns=columns,
+            filters=filters,
+        )
+    ll_old_name_df = parse_ll_old_name_data(line_df=line_df)
+    return convert_ll_old_name_data(ll_old_name_df=ll_old_name_df)
+
+
+@instrumented("convert")
+def convert_ll_manager_data(ll_manager_df: pd.DataFrame, as_category: bool = False) -> pd.DataFrame:
+    ll_manager_df["ll_mm_file_date"] = decode_dates(ll_manager_df["ll_mm_file_date"])
+    ll_manager_df["ll_mm_type_code"] = map_codes(
+        ll_manager_df["ll_mm_type_code"], code_map=LL_MM_TYPE_CODES, as_category=as_category
     )
-    corp_other_df = corp_other_df.rename(columns={"corp_oth_file_number": "corp_file_number"})
-    return corp_other_df
+    return ll_manager_df
+
+
+@instrumented("transform")
+def transform_ll_manager_data(
+    DATA_DIR: Path,
+    as_category: bool = False,
+    columns: Optional[List[str]] = None,
+    filters: Optional[List[Filter]] = None,
+) -> pd.DataFrame:
+    lines = read_file_lines(file_path=DATA_DIR.joinpath("llcallmgr.zip"))
+    line_df = extract_data_from_lines(lines=lines)
+    if columns is not None or filters is not None:
+        return transform_projected_data(
+            line_df=line_df,
+            layout=LL_MANAGER_LAYOUT,
+            convert=partial(convert_ll_manager_data, as_category=as_category),
+            columns=columns,
+            filters=filters,
+        )
+    ll_manager_df = parse_ll_manager_data(line_df=line_df)
+    return convert_ll_manager_data(ll_manager_df=ll_manager_df, as_category=as_category)
+
+
+@instrumented("convert")
+def convert_ll_series_names_data(
+    ll_series_df: pd.DataFrame, as_category: bool = False
+) -> pd.DataFrame:
+    ll_series_df["ll_series_status"] = map_codes(
+        ll_series_df["ll_series_status"], code_map=LL_SERIES_STATUS_CODES, as_category=as_category
+    )
+    ll_series_df["ll_status_date"] = decode_dates(ll_series_df["ll_status_date"])
+    ll_series_df["ll_begin_date"] = decode_dates(ll_series_df["ll_begin_date"])
+    ll_series_df["ll_dissolution_date"] = decode_dates(ll_series_df["ll_dissolution_date"])
+    return ll_series_df
+
+
+@instrumented("transform")
+def transform_ll_series_names_data(
+    DATA_DIR: Path,
+    as_category: bool = False,
+    columns: Optional[List[str]] = None,
+    filters: Optional[List[Filter]] = None,
+) -> pd.DataFrame:
+    lines = read_file_lines(file_path=DATA_DIR.joinpath("llcallser.zip"))
+    line_df = extract_data_from_lines(lines=lines)
+    if columns is not None or filters is not None:
+        return transform_projected_data(
+            line_df=line_df,
+            layout=LL_SERIES_NAMES_LAYOUT,
+            convert=partial(convert_ll_series_names_data, as_category=as_category),
+            columns=columns,
+            filters=filters,
+        )
+    ll_series_df = parse_ll_series_names_data(line_df=line_df)
+    return convert_ll_series_names_data(ll_series_df=ll_series_df, as_category=as_category)
+
+
+STOCK_CLASS_PUNCTUATION_RULES = [
+    (" - ", " "),
+    (".", ""),
+    (",", ""),
+]
+
+# (pattern, replacement, is_regex), applied in this order after punctuation and whitespace
+# are normalized; later rules depend on the output of earlier ones.
+STOCK_CLASS_RULES = [
+    ("STOCKS", "STOCK", False),
+    ("-A", " A", False),
+    ("-B", " B", False),
+    ("-C", " C", False),
+    ("A-", "A ", False),
+    ("B-", "B ", False),
+    ("C-", "C ", False),
+    ("NO PAR", "NON-PAR", False),
+    ("COMM-", "COMMON ", False),
+    ("COMM ", "COMMON ", False),
+    ("COOM", "COMMON", False),
+    ("C0MM", "COMMON", False),
+    ("COM ", "COMMON ", False),
+    ("COMMONS", "COMMON", False),
+    ("^A COMM$", "COMMON A", True),
+    ("^B COMM$", "COMMON B", True),
+    ("A-COMMON", "COMMON A", False),
+    ("COMON", "COMMON", False),
+    ("CMMON", "COMMON", False),
+    ("COMMOM", "COMMON", False),
+    ("OCOMMON", "COMMON", False),
+    ("COMM0N", "COMMON", False),
+    ("COMMONN", "COMMON", False),
+    ("C0MMON", "COMMON", False),
+    ("^OMMON", "COMMON", True),
+    ("COMMO", "COMMON", False),
+    ("COMMM", "COMM", False),
+    ("COMMN", "COMMON", False),
+    ("COMMONN", "COMMON", False),
+    ("COM$", "COMMON", True),
+    ("COMM$", "COMMON", True),
+    ("(", "", False),
+    (")", "", False),
+    ("NON VOTING", "NON-VOTING", False),
+    ("NONVOTING", "NON-VOTING", False),
+    ("UNDESIGNATED", "UNDESIG", False),
+    ("UNDES$", "UNDESIG", True),
+    ("PREFERRED", "PREF", False),
+    ("PREFERENCE", "PREF", False),
+    ("PREFFERED", "PREF", False),
+    ("PREFERED", "PREF", False),
+    ("COMMON NON-VOTING", "NON-VOTING COMMON", False),
+    ("COMMON VOTING", "VOTING COMMON", False),
+    ("A NON-VOTING", "NON-VOTING A", False),
+    ("B NON-VOTING", "NON-VOTING B", False),
+    ("C NON-VOTING", "NON-VOTING C", False),
+    ("A VOTING", "VOTING A", False),
+    ("B VOTING", "VOTING B", False),
+    ("C VOTING", "VOTING C", False),
+    ("A COMMON", "COMMON A", False),
+    ("B COMMON", "COMMON B", False),
+    ("C COMMON", "COMMON C", False),
+    ("A PREF", "PREF A", False),
+    ("B PREF", "PREF B", False),
+    ("C PREF", "PREF C", False),
+    ("CLASS COMMON", "COMMON CLASS", False),
+    ("NO PAR$", "NON-PAR", True),
+    ("^ONE$", "1", True),
+    ("^ONE ", "1 ", True),
+    (" ONE$", " 1", True),
+    ("1 CLASS", "CLASS 1", True),
+    ("COMMON ONE", "COMMON 1", False),
+    ("COMMON VOTING A", "VOTING COMMON A", False),
+    ("COMMON VOTING B", "VOTING COMMON B", False),
+    ("COMMON VOTING C", "VOTING COMMON C", False),
+    ("COMMON NON-VOTING A", "NON-VOTING COMMON A", False),
+    ("COMMON NON-VOTING B", "NON-VOTING COMMON B", False),
+    ("COMMON NON-VOTING C", "NON-VOTING COMMON C", False),
+    ("COMMON CLASS NON-VOTING", "NON-VOTING COMMON CLASS", False),
+    ("COMMON CLASS VOTING", "VOTING COMMON CLASS", False),
+    ("CLASS NON-VOTING", "NON-VOTING CLASS", False),
+    ("CLASS VOTING", "VOTING CLASS", False),
+    ("CLASS COMMON", "COMMON CLASS", False),
+    ("COMMON-VOTING", "VOTING COMMON", False),
+    ("A-VOTING", "VOTING A", False),
+    ("COMMON-NON-VOTING", "NON-VOTING COMMON", False),
+    ("COMMONNON", "COMMON NON", False),
+    ("PREF NON-VOTING", "NON-VOTING PREF", False),
+    ("COMMON-NON-PAR", "NON-PAR COMMON", False),
+    ("COMMON NON-PAR", "NON-PAR COMMON", False),
+    ("D COMMON", "COMMON D", False),
+    ("D PREF", "PREF D", False),
+    ("E COMMON", "COMMON E", False),
+    ("F COMMON", "COMMON F", False),
+    ("COOMON", "COMMON D", False),
+    ("PREFUNDESIG", "PREF UNDESIG", False),
+    ("COMMON NON-VOTING", "NON-VOTING COMMON", False),
+    ("COMMON VOTING", "VOTING COMMON", False),
+]
+
+COMPILED_STOCK_CLASS_RULES = [
+    (re.compile(pattern) if is_regex else pattern, replacement)
+    for pattern, replacement, is_regex in STOCK_CLASS_RULES
+]
+
+
+def normalize_stock_class(stock_class: str) -> str:
+    stock_class = stock_class.upper()
+    for pattern, replacement in STOCK_CLASS_PUNCTUATION_RULES:
+        stock_class = stock_class.replace(pattern, replacement)
+    stock_class = " ".join(stock_class.split())
+    for pattern, replacement in COMPILED_STOCK_CLASS_RULES:
+        if isinstance(pattern, str):
+            stock_class = stock_class.replace(pattern, replacement)
+        else:
+            stock_class = pattern.sub(replacement, stock_class)
+    return stock_class
 
 
 def clean_stock_class(corp_stock_df: pd.DataFrame) -> pd.DataFrame:
-    temp_ser = corp_stock_df["corp_stock_class"].copy()
-    temp_ser = temp_ser.str.upper()
-    temp_ser = temp_ser.str.replace(" - ", " ", regex=False)
-    temp_ser = temp_ser.str.replace(".", "", regex=False)
-    temp_ser = temp_ser.str.replace(",", "", regex=False)
-    temp_ser = temp_ser.str.split().str.join(" ")
-    temp_ser = temp_ser.str.replace("STOCKS", "STOCK")
-    temp_ser = temp_ser.str.replace("-A", " A")
-    temp_ser = temp_ser.str.replace("-B", " B")
-    temp_ser = temp_ser.str.replace("-C", " C")
-    temp_ser = temp_ser.str.replace("A-", "A ")
-    temp_ser = temp_ser.str.replace("B-", "B ")
-    temp_ser = temp_ser.str.replace("C-", "C ")
-    temp_ser = temp_ser.str.replace("NO PAR", "NON-PAR")
-    temp_ser = temp_ser.str.replace("COMM-", "COMMON ")
-    temp_ser = temp_ser.str.replace("COMM ", "COMMON ")
-    temp_ser = temp_ser.str.replace("COOM", "COMMON")
-    temp_ser = temp_ser.str.replace("C0MM", "COMMON")
-    temp_ser = temp_ser.str.replace("COM ", "COMMON ")
-    temp_ser = temp_ser.str.replace("COMMONS", "COMMON")
-    temp_ser = temp_ser.str.replace("^A COMM$", "COMMON A", regex=True)
-    temp_ser = temp_ser.str.replace("^B COMM$", "COMMON B", regex=True)
-    temp_ser = temp_ser.str.replace("A-COMMON", "COMMON A")
-    temp_ser = temp_ser.str.replace("COMON", "COMMON")
-    temp_ser = temp_ser.str.replace("CMMON", "COMMON")
-    temp_ser = temp_ser.str.replace("COMMOM", "COMMON")
-    temp_ser = temp_ser.str.replace("OCOMMON", "COMMON")
-    temp_ser = temp_ser.str.replace("COMM0N", "COMMON")
-    temp_ser = temp_ser.str.replace("COMMONN", "COMMON")
-    temp_ser = temp_ser.str.replace("C0MMON", "COMMON")
-    temp_ser = temp_ser.str.replace("^OMMON", "COMMON", regex=True)
-    temp_ser = temp_ser.str.replace("COMMO", "COMMON")
-    temp_ser = temp_ser.str.replace("COMMM", "COMM")
-    temp_ser = temp_ser.str.replace("COMMN", "COMMON")
-    temp_ser = temp_ser.str.replace("COMMONN", "COMMON")
-    temp_ser = temp_ser.str.replace("COM$", "COMMON", regex=True)
-    temp_ser = temp_ser.str.replace("COMM$", "COMMON", regex=True)
-    temp_ser = temp_ser.str.replace("(", "", regex=False)
-    temp_ser = temp_ser.str.replace(")", "", regex=False)
-    temp_ser = temp_ser.str.replace("NON VOTING", "NON-VOTING")
-    temp_ser = temp_ser.str.replace("NONVOTING", "NON-VOTING")
-    temp_ser = temp_ser.str.replace("UNDESIGNATED", "UNDESIG")
-    temp_ser = temp_ser.str.replace("UNDES$", "UNDESIG", regex=True)
-    temp_ser = temp_ser.str.replace("PREFERRED", "PREF")
-    temp_ser = temp_ser.str.replace("PREFERENCE", "PREF")
-    temp_ser = temp_ser.str.replace("PREFFERED", "PREF")
-    temp_ser = temp_ser.str.replace("PREFERED", "PREF")
-    temp_ser = temp_ser.str.replace("COMMON NON-VOTING", "NON-VOTING COMMON")
-    temp_ser = temp_ser.str.replace("COMMON VOTING", "VOTING COMMON")
-    temp_ser = temp_ser.str.replace("A NON-VOTING", "NON-VOTING A")
-    temp_ser = temp_ser.str.replace("B NON-VOTING", "NON-VOTING B")
-    temp_ser = temp_ser.str.replace("C NON-VOTING", "NON-VOTING C")
-    temp_ser = temp_ser.str.replace("A VOTING", "VOTING A")
-    temp_ser = temp_ser.str.replace("B VOTING", "VOTING B")
-    temp_ser = temp_ser.str.replace("C VOTING", "VOTING C")
-    temp_ser = temp_ser.str.replace("A COMMON", "COMMON A")
-    temp_ser = temp_ser.str.replace("B COMMON", "COMMON B")
-    temp_ser = temp_ser.str.replace("C COMMON", "COMMON C")
-    temp_ser = temp_ser.str.replace("A PREF", "PREF A")
-    temp_ser = temp_ser.str.replace("B PREF", "PREF B")
-    temp_ser = temp_ser.str.replace("C PREF", "PREF C")
-    temp_ser = temp_ser.str.replace("CLASS COMMON", "COMMON CLASS")
-    temp_ser = temp_ser.str.replace("NO PAR$", "NON-PAR", regex=True)
-    temp_ser = temp_ser.str.replace("^ONE$", "1", regex=True)
-    temp_ser = temp_ser.str.replace("^ONE ", "1 ", regex=True)
-    temp_ser = temp_ser.str.replace(" ONE$", " 1", regex=True)
-    temp_ser = temp_ser.str.replace("1 CLASS", "CLASS 1", regex=True)
-    temp_ser = temp_ser.str.replace("COMMON ONE", "COMMON 1")
-    temp_ser = temp_ser.str.replace("COMMON VOTING A", "VOTING COMMON A")
-    temp_ser = temp_ser.str.replace("COMMON VOTING B", "VOTING COMMON B")
-    temp_ser = temp_ser.str.replace("COMMON VOTING C", "VOTING COMMON C")
-    temp_ser = temp_ser.str.replace("COMMON NON-VOTING A", "NON-VOTING COMMON A")
-    temp_ser = temp_ser.str.replace("COMMON NON-VOTING B", "NON-VOTING COMMON B")
-    temp_ser = temp_ser.str.replace("COMMON NON-VOTING C", "NON-VOTING COMMON C")
-    temp_ser = temp_ser.str.replace("COMMON CLASS NON-VOTING", "NON-VOTING COMMON CLASS")
-    temp_ser = temp_ser.str.replace("COMMON CLASS VOTING", "VOTING COMMON CLASS")
-    temp_ser = temp_ser.str.replace("CLASS NON-VOTING", "NON-VOTING CLASS")
-    temp_ser = temp_ser.str.replace("CLASS VOTING", "VOTING CLASS")
-    temp_ser = temp_ser.str.replace("CLASS COMMON", "COMMON CLASS")
-    temp_ser = temp_ser.str.replace("COMMON-VOTING", "VOTING COMMON")
-    temp_ser = temp_ser.str.replace("A-VOTING", "VOTING A")
-    temp_ser = temp_ser.str.replace("COMMON-NON-VOTING", "NON-VOTING COMMON")
-    temp_ser = temp_ser.str.replace("COMMONNON", "COMMON NON")
-    temp_ser = temp_ser.str.replace("PREF NON-VOTING", "NON-VOTING PREF")
-    temp_ser = temp_ser.str.replace("COMMON-NON-PAR", "NON-PAR COMMON")
-    temp_ser = temp_ser.str.replace("COMMON NON-PAR", "NON-PAR COMMON")
-    temp_ser = temp_ser.str.replace("D COMMON", "COMMON D")
-    temp_ser = temp_ser.str.replace("D PREF", "PREF D")
-    temp_ser = temp_ser.str.replace("E COMMON", "COMMON E")
-    temp_ser = temp_ser.str.replace("F COMMON", "COMMON F")
-    temp_ser = temp_ser.str.replace("COOMON", "COMMON D")
-    temp_ser = temp_ser.str.replace("PREFUNDESIG", "PREF UNDESIG")
-    temp_ser = temp_ser.str.replace("COMMON NON-VOTING", "NON-VOTING COMMON")
-    temp_ser = temp_ser.str.replace("COMMON VOTING", "VOTING COMMON")
-    corp_stock_df["corp_stock_class"] = temp_ser.copy()
+    # Stock classes repeat heavily, so each distinct value is normalized once and the results
+    # are broadcast back to the rows. Missing values (code -1) pick up the trailing NaN.
+    class_codes, unique_classes = pd.factorize(corp_stock_df["corp_stock_class"])
+    cleaned_classes = np.array(
+        [normalize_stock_class(stock_class) for stock_class in unique_classes] + [np.nan],
+        dtype=object,
+    )
+    corp_stock_df["corp_stock_class"] = cleaned_classes[class_codes]
     return corp_stock_df
+
+
+class TableSpec(NamedTuple):
+    file_name: str
+    layout: List[Field]
+    transform: Callable[..., pd.DataFrame]
+    convert: Optional[Callable[..., pd.DataFrame]]
+
+
+CORP_TABLES = {
+    "corp_master": TableSpec(
+        "cdxallmst.zip", CORP_MASTER_LAYOUT, transform_corp_master_data, convert_corp_master_data
+    ),
+    "corp_name": TableSpec("cdxallnam.zip", CORP_NAME_LAYOUT, transform_corp_name_data, None),
+    "corp_agent": TableSpec(
+        "cdxallagt.zip", CORP_AGENT_LAYOUT, transform_corp_agent_data, convert_corp_agent_data
+    ),
+    "corp_annual_report": TableSpec(
+        "cdxallarp.zip",
+        CORP_ANNUAL_REPORTS_LAYOUT,
+        transform_corp_annual_report_data,
+        convert_corp_annual_report_data,
+    ),
+    "corp_assumed_old_name": TableSpec(
+        "cdxallaon.zip",
+        CORP_ASSUMED_OLD_NAME_LAYOUT,
+        transform_corp_assumed_old_name_data,
+        convert_corp_assumed_old_name_data,
+    ),
+    "corp_stock": TableSpec(
+        "cdxallstk.zip", CORP_STOCK_LAYOUT, transform_corp_stock_data, convert_corp_stock_data
+    ),
+    "corp_other": TableSpec(
+        "cdxalloth.zip", CORP_OTHER_LAYOUT, transform_corp_other_data, convert_corp_other_data
+    ),
+}
+
+LL_TABLES = {
+    "ll_master": TableSpec(
+        "llcallmst.zip", LL_MASTER_LAYOUT, transform_ll_master_data, convert_ll_master_data
+    ),
+    "ll_name": TableSpec("llcallnam.zip", LL_NAME_LAYOUT, transform_ll_name_data, None),
+    "ll_annual_report": TableSpec(
+        "llcallarp.zip",
+        LL_ANNUAL_REPORTS_LAYOUT,
+        transform_ll_annual_report_data,
+        convert_ll_annual_report_data,
+    ),
+    "ll_assumed_name": TableSpec(
+        "llcallase.zip",
+        LL_ASSUMED_NAME_LAYOUT,
+        transform_ll_assumed_name_data,
+        convert_ll_assumed_name_data,
+    ),
+    "ll_old_name": TableSpec(
+        "llcallold.zip", LL_OLD_NAME_LAYOUT, transform_ll_old_name_data, convert_ll_old_name_data
+    ),
+    "ll_manager": TableSpec(
+        "llcallmgr.zip", LL_MANAGER_LAYOUT, transform_ll_manager_data, convert_ll_manager_data
+    ),
+    "ll_series_names": TableSpec(
+        "llcallser.zip",
+        LL_SERIES_NAMES_LAYOUT,
+        transform_ll_series_names_data,
+        convert_ll_series_names_data,
+    ),
+}
+
+TABLES = {**CORP_TABLES, **LL_TABLES}
+
+
+def read_table_records(
+    table_name: str, DATA_DIR: Path, use_mmap: bool = False, raw_dir: Optional[Path] = None
+) -> np.ndarray:
+    # The table's data records as a uint8 matrix (see get_data_records). use_mmap reads them
+    # from a memory-mapped, unpacked copy of the zip member (see unpack_member) rather than
+    # from the member decompressed into memory.
+    if table_name not in TABLES.keys():
+        raise Exception(f"Unknown table_name: {table_name}\n  - options: {list(TABLES)}")
+    file_path = DATA_DIR.joinpath(TABLES[table_name].file_name)
+    if use_mmap:
+        return map_data_records(raw_path=unpack_member(file_path=file_path, raw_dir=raw_dir))
+    return read_data_records(file_path=file_path)
+
+
+def transform_records(char_matrix: np.ndarray, table_name: str) -> pd.DataFrame:
+    table_spec = TABLES[table_name]
+    table_df = parse_typed_fields(char_matrix=char_matrix, layout=table_spec.layout)
+    if table_spec.convert is None:
+        return table_df
+    return table_spec.convert(table_df)
+
+
+@instrumented("transform")
+def transform_fused(
+    table_name: str, DATA_DIR: Path, use_mmap: bool = False, raw_dir: Optional[Path] = None
+) -> pd.DataFrame:
+    # Same result as TABLES[table_name].transform(DATA_DIR=DATA_DIR) in one pass from the raw
+    # bytes to the typed columns, without the per-record line objects, the line DataFrame
+    # or the str copies of the date and int fields
+    char_matrix = read_table_records(
+        table_name=table_name, DATA_DIR=DATA_DIR, use_mmap=use_mmap, raw_dir=raw_dir
+    )
+    return transform_records(char_matrix=char_matrix, table_name=table_name)
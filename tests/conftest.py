@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The modules in src/ import each other by bare name
+sys.path.insert(0, str(Path(__file__).parents[1].joinpath("src")))
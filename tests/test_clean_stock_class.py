@@ -0,0 +1,22 @@
+import json
+from pathlib import Path
+
+import pandas as pd
+
+from transformers import clean_stock_class
+
+# [input, expected] pairs, with the expected classes taken from the chain of str.replace
+# calls clean_stock_class was before its rules became STOCK_CLASS_RULES. The inputs are the
+# synthetic stock classes, every rule's pattern in a few contexts, random runs of the
+# patterns and punctuation, and blank and missing values.
+FIXTURE_PATH = Path(__file__).parent.joinpath("fixtures", "stock_classes.json")
+
+
+def test_clean_stock_class_matches_fixture():
+    stock_classes = json.loads(FIXTURE_PATH.read_text())
+    corp_stock_df = pd.DataFrame(
+        {"corp_stock_class": pd.Series([value for value, _ in stock_classes], dtype="str")}
+    )
+    cleaned_classes = clean_stock_class(corp_stock_df)["corp_stock_class"]
+    cleaned_classes = [None if pd.isna(value) else value for value in cleaned_classes]
+    assert cleaned_classes == [expected for _, expected in stock_classes]
@@ -0,0 +1,71 @@
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+from decoders import decode_int_field, decode_ints, get_int_dtype
+from extractors import lines_to_char_matrix
+
+
+def decode_values(values, **kwargs):
+    decoded_ser = decode_ints(pd.Series(values, dtype="str", name="amount"), **kwargs)
+    return [None if pd.isna(value) else value for value in decoded_ser]
+
+
+def test_decode_ints_reads_zoned_overpunch_signs():
+    assert decode_values(["12{", "12C", "12I", "12}", "12L", "12R", "000A"]) == [
+        120,
+        123,
+        129,
+        -120,
+        -123,
+        -129,
+        1,
+    ]
+
+
+def test_decode_ints_reads_leading_and_trailing_signs():
+    assert decode_values([" +12", "-12 ", "  12-", "12+ "]) == [12, -12, -12, 12]
+
+
+def test_decode_ints_makes_blank_and_invalid_values_missing():
+    assert decode_values(["    ", "", "1 2", "12X", "-12C", "+-1", "--", "0012"]) == [
+        None,
+        None,
+        None,
+        None,
+        None,
+        None,
+        None,
+        12,
+    ]
+
+
+def test_int_dtype_is_set_by_field_width():
+    assert [get_int_dtype(width=width) for width in [None, 1, 2, 3, 4, 5, 9, 10, 18, 30]] == [
+        "Int64",
+        "Int8",
+        "Int8",
+        "Int16",
+        "Int16",
+        "Int32",
+        "Int32",
+        "Int64",
+        "Int64",
+        "Int64",
+    ]
+    # the same dtype whatever the values, even when they'd all fit a smaller one
+    assert str(decode_ints(pd.Series(["1", "2"], dtype="str"), width=5).dtype) == "Int32"
+    char_matrix = lines_to_char_matrix(lines=[b"00001", b"     "]).astype(np.uint8)
+    int_ser = decode_int_field(char_matrix=char_matrix, name="amount", width=12)
+    assert str(int_ser.dtype) == "Int64"
+    assert int_ser.isna().tolist() == [False, True]
+
+
+def test_decode_ints_scales_decimals():
+    decimal_ser = decode_ints(
+        pd.Series(["12345", "00001", "1234N", "     "], dtype="str"), n_decimals=2
+    )
+    assert decimal_ser.dtype.pyarrow_dtype.scale == 2
+    assert decimal_ser.tolist()[:3] == [Decimal("123.45"), Decimal("0.01"), Decimal("-123.45")]
+    assert decimal_ser.isna().tolist() == [False, False, False, True]
@@ -0,0 +1,111 @@
+import zipfile
+
+import pandas as pd
+
+from cache import find_cached_table, read_cached_table
+from deltas import apply_delta, read_delta, update_table
+from layouts import CORP_MASTER_LAYOUT
+from transformers import TABLES
+
+
+def make_line(layout, values):
+    # A record of the layout's width with values placed at their fields' offsets
+    line = [" "] * max(end for _, _, end, _ in layout)
+    for field_name, start, end, _ in layout:
+        value = values.get(field_name, "")
+        line[start : start + len(value)] = value[: end - start]
+    return "".join(line)
+
+
+def write_corp_master_drop(DATA_DIR, records):
+    # records are (file number, incorporation date, status code) tuples
+    lines = [
+        make_line(
+            CORP_MASTER_LAYOUT,
+            {
+                "corp_file_number": file_number,
+                "corp_incorp_date": incorp_date,
+                "corp_status": status_code,
+            },
+        )
+        for file_number, incorp_date, status_code in records
+    ]
+    member = "".join(
+        ["RUN DATE=20221007   FILE:CDXALLMST DATA\r\n"]
+        + [f"{line}\r\n" for line in lines]
+        + [f"END OF FILE RECORD COUNT= {len(lines):07d}\r\n"]
+    )
+    DATA_DIR.mkdir(parents=True)
+    with zipfile.ZipFile(DATA_DIR.joinpath("cdxallmst.zip"), "w") as zf:
+        zf.writestr("cdxallmst.txt", member.encode(encoding="latin1"))
+    return DATA_DIR
+
+
+PREVIOUS_RECORDS = [
+    ("00000001", "19991231", "00"),
+    ("00000002", "20000101", "01"),
+    ("00000003", "20050505", "00"),
+    ("00000005", "20100301", "02"),
+]
+# 00000002 deleted, 00000003 updated, 00000004 and 00000006 inserted
+RECORDS = [
+    ("00000001", "19991231", "00"),
+    ("00000003", "20050505", "03"),
+    ("00000004", "20150701", "00"),
+    ("00000005", "20100301", "02"),
+    ("00000006", "20200202", "01"),
+]
+
+
+def test_update_table_matches_full_rebuild(tmp_path):
+    cache_dir = tmp_path.joinpath("cache")
+    previous_dir = write_corp_master_drop(tmp_path.joinpath("previous"), PREVIOUS_RECORDS)
+    DATA_DIR = write_corp_master_drop(tmp_path.joinpath("current"), RECORDS)
+    update_table(table_name="corp_master", DATA_DIR=previous_dir, cache_dir=cache_dir)
+    previous_cache_path = find_cached_table(table_name="corp_master", cache_dir=cache_dir)
+    delta_df = update_table(table_name="corp_master", DATA_DIR=DATA_DIR, cache_dir=cache_dir)
+    assert dict(zip(delta_df["file_number"], delta_df["change"])) == {
+        "00000002": "deleted",
+        "00000003": "updated",
+        "00000004": "inserted",
+        "00000006": "inserted",
+    }
+    cache_path = find_cached_table(table_name="corp_master", cache_dir=cache_dir)
+    pd.testing.assert_frame_equal(
+        read_delta(
+            table_name="corp_master",
+            previous_cache_name=previous_cache_path.name,
+            cache_name=cache_path.name,
+            cache_dir=cache_dir,
+        ),
+        delta_df,
+    )
+    table_df = read_cached_table(cache_path=cache_path)
+    pd.testing.assert_frame_equal(table_df, TABLES["corp_master"].transform(DATA_DIR=DATA_DIR))
+    # the same drop again changes nothing
+    delta_df = update_table(table_name="corp_master", DATA_DIR=DATA_DIR, cache_dir=cache_dir)
+    assert len(delta_df) == 0
+    pd.testing.assert_frame_equal(read_cached_table(cache_path=cache_path), table_df)
+
+
+def test_apply_delta_twice_gives_the_same_table():
+    table_df = pd.DataFrame(
+        {"corp_file_number": ["00000001", "00000002", "00000003"], "corp_status": ["a", "b", "c"]}
+    )
+    changed_df = pd.DataFrame(
+        {"corp_file_number": ["00000003", "00000004", "00000004"], "corp_status": ["C", "d", "e"]}
+    )
+    delta_df = pd.DataFrame(
+        {
+            "file_number": ["00000002", "00000003", "00000004"],
+            "change": ["deleted", "updated", "inserted"],
+        }
+    )
+    updated_df = apply_delta(table_df=table_df, changed_df=changed_df, delta_df=delta_df)
+    assert updated_df.to_dict(orient="list") == {
+        "corp_file_number": ["00000001", "00000003", "00000004", "00000004"],
+        "corp_status": ["a", "C", "d", "e"],
+    }
+    pd.testing.assert_frame_equal(
+        apply_delta(table_df=updated_df, changed_df=changed_df, delta_df=delta_df), updated_df
+    )
@@ -0,0 +1,148 @@
+import pandas as pd
+import pytest
+
+from layouts import CORP_MASTER_LAYOUT, CORP_OTHER_LAYOUT
+from transformers import (
+    convert_corp_master_data,
+    convert_corp_other_data,
+    get_filter_mask,
+    transform_projected_data,
+)
+
+
+def make_line(layout, values):
+    # A record of the layout's width with values placed at their fields' offsets
+    line = [" "] * max(end for _, _, end, _ in layout)
+    for field_name, start, end, _ in layout:
+        value = values.get(field_name, "")
+        line[start : start + len(value)] = value[: end - start]
+    return "".join(line)
+
+
+# file number, incorporation date, state code (01 Alabama, 02 Alaska), intent code, status code
+CORP_MASTER_RECORDS = [
+    ("00000001", "19991231", "01", "001", "00"),
+    ("00000002", "20000101", "01", "046", "01"),
+    ("00000003", "20200615", "02", "000", "00"),
+    ("00000004", "        ", "02", "002", "02"),
+    ("00000005", "20100301", "  ", "047", "00"),
+]
+CORP_MASTER_LINE_DF = pd.DataFrame(
+    {
+        "line": [
+            make_line(
+                CORP_MASTER_LAYOUT,
+                {
+                    "corp_file_number": file_number,
+                    "corp_incorp_date": incorp_date,
+                    "corp_state_code": state_code,
+                    "corp_corp_intent": intent_code,
+                    "corp_status": status_code,
+                },
+            )
+            for file_number, incorp_date, state_code, intent_code, status_code in (
+                CORP_MASTER_RECORDS
+            )
+        ]
+    }
+)
+
+
+def transform_corp_master(columns=None, filters=None):
+    return transform_projected_data(
+        line_df=CORP_MASTER_LINE_DF.copy(),
+        layout=CORP_MASTER_LAYOUT,
+        convert=convert_corp_master_data,
+        columns=columns,
+        filters=filters,
+    )
+
+
+@pytest.mark.parametrize(
+    "filter_, file_numbers",
+    [
+        (("corp_status", "==", "Goodstanding"), ["00000001", "00000003", "00000005"]),
+        (("corp_status", "!=", "Goodstanding"), ["00000002", "00000004"]),
+        (("corp_incorp_date", "<", "2000-01-01"), ["00000001"]),
+        (("corp_incorp_date", "<=", "2000-01-01"), ["00000001", "00000002"]),
+        (("corp_incorp_date", ">", "2010-03-01"), ["00000003"]),
+        (("corp_incorp_date", ">=", "2010-03-01"), ["00000003", "00000005"]),
+        (("corp_status", "in", {"Reinstated", "Intent to dissolve"}), ["00000002", "00000004"]),
+        (
+            ("corp_file_number", "not in", {"00000001", "00000005"}),
+            ["00000002", "00000003", "00000004"],
+        ),
+    ],
+)
+def test_filter_operators(filter_, file_numbers):
+    corp_master_df = transform_corp_master(columns=["corp_file_number"], filters=[filter_])
+    assert corp_master_df["corp_file_number"].tolist() == file_numbers
+    # the same records as filtering the fully converted table
+    full_df = transform_corp_master()
+    assert (
+        full_df.loc[
+            get_filter_mask(table_df=full_df, filters=[filter_]), "corp_file_number"
+        ].tolist()
+        == file_numbers
+    )
+
+
+def test_filters_combine_and_skip_missing_values():
+    corp_master_df = transform_corp_master(
+        columns=["corp_file_number"],
+        filters=[("corp_state_code", "==", "Alaska"), ("corp_incorp_date", ">=", "1900-01-01")],
+    )
+    assert corp_master_df["corp_file_number"].tolist() == ["00000003"]
+
+
+def test_projection_matches_full_transform():
+    columns = ["corp_status", "corp_file_number", "corp_incorp_date"]
+    corp_master_df = transform_corp_master(columns=columns)
+    assert list(corp_master_df.columns) == columns
+    pd.testing.assert_frame_equal(corp_master_df, transform_corp_master()[columns])
+
+
+def test_projection_of_derived_column():
+    corp_master_df = transform_corp_master(
+        columns=["corp_file_number", "corp_is_for_profit"],
+        filters=[("corp_is_for_profit", "==", True)],
+    )
+    assert corp_master_df["corp_file_number"].tolist() == ["00000001", "00000004"]
+    assert corp_master_df["corp_is_for_profit"].tolist() == [True, True]
+
+
+def test_projection_of_renamed_column():
+    line_df = pd.DataFrame(
+        {
+            "line": [
+                make_line(
+                    CORP_OTHER_LAYOUT,
+                    {"corp_oth_file_number": file_number, "corp_oth_total_cap": total_cap},
+                )
+                for file_number, total_cap in [("00000001", "0000000001000"), ("00000002", "")]
+            ]
+        }
+    )
+    corp_other_df = transform_projected_data(
+        line_df=line_df,
+        layout=CORP_OTHER_LAYOUT,
+        convert=convert_corp_other_data,
+        columns=["corp_file_number", "corp_oth_total_cap"],
+        filters=[("corp_file_number", "==", "00000001")],
+    )
+    assert list(corp_other_df.columns) == ["corp_file_number", "corp_oth_total_cap"]
+    assert corp_other_df.to_dict(orient="records") == [
+        {"corp_file_number": "00000001", "corp_oth_total_cap": 1000}
+    ]
+
+
+def test_unknown_columns_and_operators_raise():
+    with pytest.raises(Exception, match="Unknown column: corp_oth_file_number"):
+        transform_projected_data(
+            line_df=pd.DataFrame({"line": [make_line(CORP_OTHER_LAYOUT, {})]}),
+            layout=CORP_OTHER_LAYOUT,
+            convert=convert_corp_other_data,
+            columns=["corp_oth_file_number"],
+        )
+    with pytest.raises(Exception, match="Unknown filter operator: ~="):
+        transform_corp_master(filters=[("corp_status", "~=", "Goodstanding")])
@@ -0,0 +1,48 @@
+import zipfile
+
+import pandas as pd
+import pytest
+
+from transformers import TABLES, transform_fused
+
+# Hand-written values for every field of each record by the field's layout dtype: valid,
+# blank and invalid dates, plain, zoned, blank and invalid numbers, and codes, names with
+# latin1 characters and blanks for str fields
+FIELD_VALUES = {
+    "str": ["00000001", "01", "JOSÉ GARCÍA INC", "", "00000005"],
+    "date": ["20200131", "19991231", "", "20201301", "00000000"],
+    "int": ["000000000012", "1", "00000000012}", "", "12X"],
+}
+
+
+def make_line(layout, row):
+    line = ""
+    for _, start, end, dtype in layout:
+        value = FIELD_VALUES[dtype][row]
+        line = line.ljust(start) + (
+            value if end is None else value[: end - start].ljust(end - start)
+        )
+    return line
+
+
+@pytest.mark.parametrize("table_name", list(TABLES))
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_transform_fused_matches_transform(table_name, use_mmap, tmp_path):
+    table_spec = TABLES[table_name]
+    lines = [make_line(table_spec.layout, row) for row in range(len(FIELD_VALUES["str"]))]
+    # and a record cut short, as the SOS files have
+    lines.append(lines[0][:20])
+    member = "".join(
+        ["RUN DATE=20221007   FILE:TEST DATA\r\n"]
+        + [f"{line}\r\n" for line in lines]
+        + [f"END OF FILE RECORD COUNT= {len(lines):07d}\r\n"]
+    )
+    with zipfile.ZipFile(tmp_path.joinpath(table_spec.file_name), "w") as zf:
+        zf.writestr(table_spec.file_name.replace(".zip", ".txt"), member.encode(encoding="latin1"))
+    fused_df = transform_fused(
+        table_name=table_name,
+        DATA_DIR=tmp_path,
+        use_mmap=use_mmap,
+        raw_dir=tmp_path.joinpath("raw"),
+    )
+    pd.testing.assert_frame_equal(fused_df, table_spec.transform(DATA_DIR=tmp_path))